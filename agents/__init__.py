@@ -1,12 +1,20 @@
 """Claude agents for PARA Autopilot."""
 
-from .classifier import classify_item, batch_classify_items, reclassify_with_feedback
+from .classifier import (
+    classify_item,
+    aclassify_item,
+    batch_classify_items,
+    abatch_classify_items,
+    reclassify_with_feedback
+)
 from .scheduler import auto_schedule_tasks, apply_schedule
 from .reviewer import generate_weekly_review
 
 __all__ = [
     "classify_item",
+    "aclassify_item",
     "batch_classify_items",
+    "abatch_classify_items",
     "reclassify_with_feedback",
     "auto_schedule_tasks",
     "apply_schedule",
@@ -0,0 +1,31 @@
+"""Shared helpers for Anthropic prompt caching in the one-shot Haiku agents."""
+
+from typing import Dict, List
+
+# Output schemas change only on deploy, so they get the long TTL. Anthropic
+# requires longer-TTL breakpoints to come before shorter ones, which is why
+# the schema block leads.
+SCHEMA_CACHE_CONTROL = {"type": "ephemeral", "ttl": "1h"}
+ROLE_CACHE_CONTROL = {"type": "ephemeral"}
+
+# Anthropic silently skips breakpoints on prefixes shorter than the model's
+# minimum (2048 tokens for Haiku), so shorter prefixes aren't marked at all
+MIN_CACHEABLE_TOKENS = 2048
+_CHARS_PER_TOKEN = 4  # rough estimate for English prose and JSON
+
+
+def build_cached_system(role_text: str, schema_text: str) -> List[Dict]:
+    """System blocks: the JSON output schema (1h cache), then the role/principles (5m cache).
+
+    A block only gets its breakpoint once the prefix ending with it reaches
+    MIN_CACHEABLE_TOKENS.
+    """
+    blocks = []
+    prefix_chars = 0
+    for text, cache_control in ((schema_text, SCHEMA_CACHE_CONTROL), (role_text, ROLE_CACHE_CONTROL)):
+        prefix_chars += len(text)
+        block = {"type": "text", "text": text}
+        if prefix_chars // _CHARS_PER_TOKEN >= MIN_CACHEABLE_TOKENS:
+            block["cache_control"] = cache_control
+        blocks.append(block)
+    return blocks
@@ -1,13 +1,28 @@
 """PARA Classification Agent - Cost optimized with Groq Llama 3.3 70B."""
 
-from typing import Dict, List
-import json
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Dict, List, Literal, Optional
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import orjson
+from pydantic import ValidationError
+from config import settings
 from llm_provider import llm_provider
+from agents.local_classifier import LocalPARAClassifier
+from cache.redis_client import cache, CacheKeys, CacheDuration
+from models.para import PARAClassificationResult
 
+logger = logging.getLogger(__name__)
 
-PARA_CLASSIFICATION_PROMPT = """You are a PARA method expert. Classify the following item into one of these categories:
+# Usage reported when no LLM call was made; copied on use since callers serialize it
+_ZERO_USAGE = MappingProxyType({"input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0})
 
-- **Project**: Has a clear goal and deadline (e.g., "Launch new website by Q2", "Write research paper by March")
+
+PARA_CATEGORY_DEFINITIONS = """- **Project**: Has a clear goal and deadline (e.g., "Launch new website by Q2", "Write research paper by March")
   Projects are finite endeavors with specific end goals. They should have clear success criteria.
 
 - **Area**: Ongoing responsibility without a deadline (e.g., "Health", "Finances", "Team Management", "Personal Development")
@@ -18,28 +33,351 @@ PARA_CLASSIFICATION_PROMPT = """You are a PARA method expert. Classify the follo
 
 - **Archive**: Completed or inactive items (e.g., "Old client project from 2022", "Cancelled initiative")
   Archives are things that were once active but are now complete or no longer relevant.
+"""
 
-Item to classify:
-Title: {title}
-Description: {description}
-Context: {context}
 
+# Static instructions are sent as a cached system prefix; only the item itself varies per call.
+# The compact prompts are the default; the verbose ones are kept for evaluation regressions
+# (set PARA_VERBOSE_PROMPT=true).
+PARA_COMPACT_DEFINITIONS = (
+    "project = finite goal with a deadline; area = ongoing responsibility to maintain; "
+    "resource = reference material or topic of interest; archive = completed or inactive."
+)
+
+PARA_SYSTEM_PREFIX_COMPACT = (
+    "Classify the user's item into PARA. " + PARA_COMPACT_DEFINITIONS + " "
+    "Respond in JSON with para_type, confidence (0-1), reasoning (one sentence), "
+    "suggested_next_actions (2-4), estimated_duration_weeks (projects only, else null)."
+)
+
+PARA_SYSTEM_PREFIX_VERBOSE = """You are a PARA method expert. Classify the item provided by the user into one of these categories:
+
+""" + PARA_CATEGORY_DEFINITIONS + """
 Analyze the item carefully and determine:
 1. Does it have a specific end goal? (likely a Project)
 2. Is it an ongoing responsibility? (likely an Area)
 3. Is it just information to reference? (likely a Resource)
 4. Is it no longer active? (likely an Archive)
 
-Return a JSON object with:
-{{
-  "para_type": "project|area|resource|archive",
-  "confidence": 0.0-1.0,
-  "reasoning": "Brief explanation of why this classification fits",
-  "suggested_next_actions": ["action1", "action2", "action3"],
-  "estimated_duration_weeks": null or number (for projects only, estimate realistic completion time)
-}}
+Respond in JSON with para_type, confidence (0.0-1.0), reasoning (brief explanation of why this
+classification fits), suggested_next_actions (2-4 concrete actions that would move this forward)
+and estimated_duration_weeks (realistic completion time for projects, otherwise null)."""
+
+PARA_ITEM_PROMPT = """Item to classify:
+Title: {title}
+Description: {description}
+Context: {context}"""
+
+# PARA_ITEM_PROMPT split once at import so per-call formatting is plain concatenation
+_P_PREFIX, _, _rest = PARA_ITEM_PROMPT.partition("{title}")
+_P_MID1, _, _rest = _rest.partition("{description}")
+_P_MID2, _, _P_SUFFIX = _rest.partition("{context}")
+
+
+# Batch prompt: the PARA instructions are paid once per chunk instead of once per item
+BATCH_PARA_SYSTEM_PREFIX_COMPACT = (
+    "Classify each numbered item into PARA. " + PARA_COMPACT_DEFINITIONS + " "
+    'Respond in JSON as {"results": [...]}, one entry per item with index (item number), '
+    "para_type, confidence (0-1), reasoning (one sentence), suggested_next_actions (2-4), "
+    "estimated_duration_weeks (projects only, else null)."
+)
+
+BATCH_PARA_SYSTEM_PREFIX_VERBOSE = """You are a PARA method expert. Classify each of the numbered items provided by the user into one of these categories:
+
+""" + PARA_CATEGORY_DEFINITIONS + """
+For each item, decide whether it has a specific end goal (Project), is an ongoing responsibility (Area),
+is information to reference (Resource), or is no longer active (Archive).
+
+Respond in JSON as {"results": [...]} with one entry per item. Each entry has index (the item's
+number), para_type, confidence (0.0-1.0), reasoning (brief), suggested_next_actions (2-4 concrete
+actions) and estimated_duration_weeks (projects only, otherwise null)."""
+
+BATCH_PARA_ITEMS_PREFIX = "Items:\n"
+
+if settings.PARA_VERBOSE_PROMPT:
+    PARA_SYSTEM_PREFIX = PARA_SYSTEM_PREFIX_VERBOSE
+    BATCH_PARA_SYSTEM_PREFIX = BATCH_PARA_SYSTEM_PREFIX_VERBOSE
+else:
+    PARA_SYSTEM_PREFIX = PARA_SYSTEM_PREFIX_COMPACT
+    BATCH_PARA_SYSTEM_PREFIX = BATCH_PARA_SYSTEM_PREFIX_COMPACT
+
+
+# Structured output schemas - the provider guarantees responses parse and match these
+PARA_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "para_type": {"type": "string", "enum": ["project", "area", "resource", "archive"]},
+        "confidence": {"type": "number", "minimum": 0, "maximum": 1},
+        "reasoning": {"type": "string"},
+        "suggested_next_actions": {"type": "array", "items": {"type": "string"}},
+        "estimated_duration_weeks": {"type": ["number", "null"]}
+    },
+    "required": [
+        "para_type",
+        "confidence",
+        "reasoning",
+        "suggested_next_actions",
+        "estimated_duration_weeks"
+    ]
+}
+
+BATCH_PARA_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "results": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"index": {"type": "integer"}, **PARA_SCHEMA["properties"]},
+                "required": ["index", *PARA_SCHEMA["required"]]
+            }
+        }
+    },
+    "required": ["results"]
+}
+
+BATCH_SIZE = 8
+BATCH_MAX_TOKENS_PER_ITEM = 250
+MAX_CONCURRENT_REQUESTS = 16
+
+# Process-local memo of recent classifications, keyed by a hash of the normalized inputs
+CLASSIFICATION_CACHE_SIZE = 4096
+_classification_cache: "OrderedDict[str, Dict]" = OrderedDict()
+
+# Context added by reclassify_with_feedback - those calls must always reach the LLM
+_FEEDBACK_MARKER = "User feedback:"
+
+# Deterministic pre-classifier: unambiguous keyword hits skip the LLM entirely
+_RULE_PATTERNS = {
+    "project": re.compile(r"\b(launch|ship|deliver|deadline|due (?:by|on|date)|by Q[1-4])\b", re.I),
+    "area": re.compile(r"\b(health|fitness|finances?|budgeting|management|household|career)\b", re.I),
+    "resource": re.compile(r"\b(tutorials?|cheat ?sheets?|reference|inspiration|guides?|documentation)\b", re.I),
+    "archive": re.compile(r"\b(archived?|completed|cancell?ed|deprecated|no longer (?:active|relevant))\b", re.I),
+}
+_RULE_MIN_TEXT_LENGTH = 15
+_RULE_CONFIDENCE = 0.85
+_FAST_PATH_NEXT_ACTIONS = {
+    "project": ["Define the success criteria", "Break it into next actions"],
+    "area": ["Set a standard to maintain", "Schedule a recurring check-in"],
+    "resource": ["Tag it for later reference"],
+    "archive": ["Move it to the archive"],
+}
+
+# Optional local model; confident predictions skip the LLM round trip
+_local_model: Optional[LocalPARAClassifier] = None
+if settings.PARA_LOCAL_MODEL_PATH and os.path.exists(settings.PARA_LOCAL_MODEL_PATH):
+    _local_model = LocalPARAClassifier.load(settings.PARA_LOCAL_MODEL_PATH)
+elif settings.PARA_LOCAL_MODEL_PATH:
+    logger.warning(f"Local PARA model not found at {settings.PARA_LOCAL_MODEL_PATH}")
+
+
+def _item_prompt(title: str, description: str, context: str) -> str:
+    """Format the per-item user message that follows PARA_SYSTEM_PREFIX."""
+    return (
+        f"{_P_PREFIX}{title}{_P_MID1}{description or 'No description provided'}"
+        f"{_P_MID2}{context or 'No additional context'}{_P_SUFFIX}"
+    )
+
+
+def _validate_classification(data: Dict) -> Dict:
+    """Check an LLM classification against PARAClassificationResult.
+
+    Raises ValidationError for a missing field or an unknown para_type, so
+    providers without strict structured output can't slip one into the cache.
+    """
+    return PARAClassificationResult.model_validate(data).model_dump(mode="json")
+
+
+def _parse_classification(response: Dict) -> Dict:
+    """Turn a structured-output provider response into a classification result."""
+    return {**_validate_classification(orjson.loads(response["text"])), "usage": response["usage"]}
+
+
+def _make_result(
+    para_type: str,
+    confidence: float,
+    reasoning: str,
+    suggested_next_actions: List[str]
+) -> Dict:
+    """Build a classification result that didn't come from an LLM call (zero usage)."""
+    return {
+        "para_type": para_type,
+        "confidence": confidence,
+        "reasoning": reasoning,
+        "suggested_next_actions": suggested_next_actions,
+        "estimated_duration_weeks": None,
+        "usage": dict(_ZERO_USAGE)
+    }
+
+
+def _error_classification(error: Exception) -> Dict:
+    """Classification result returned when the LLM call itself fails."""
+    return _make_result(
+        "resource",
+        0.0,
+        f"Error during classification: {str(error)}",
+        ["Retry classification"]
+    )
+
+
+def _rule_classify(title: str, description: str, context: str) -> Optional[Dict]:
+    """Classify obvious items by keyword, or None if the LLM should decide.
+
+    Only fires when exactly one PARA category matches, so ambiguous items
+    (e.g. "Project management tutorial") still go to the model.
+    """
+    if _FEEDBACK_MARKER in (context or ""):
+        return None
+
+    text = f"{title or ''} {description or ''}".strip()
+    if len(text) <= _RULE_MIN_TEXT_LENGTH:
+        return None
+
+    matches = {}
+    for para_type, pattern in _RULE_PATTERNS.items():
+        match = pattern.search(text)
+        if match:
+            matches[para_type] = match.group(0)
+
+    if len(matches) != 1:
+        logger.debug(f"Rule pre-classifier miss ({len(matches)} categories matched)")
+        return None
+
+    para_type, token = next(iter(matches.items()))
+    logger.debug(f"Rule pre-classifier hit: {para_type} ({token})")
+    return _make_result(
+        para_type,
+        _RULE_CONFIDENCE,
+        f"rule-matched: {token}",
+        list(_FAST_PATH_NEXT_ACTIONS[para_type])
+    )
+
+
+def _local_classify(title: str, description: str, context: str) -> Optional[Dict]:
+    """Classify with the local model when it is confident, otherwise None."""
+    if _local_model is None or _FEEDBACK_MARKER in (context or ""):
+        return None
+
+    prediction = _local_model.predict(title, description)
+    if prediction is None or prediction[1] < settings.PARA_LOCAL_CONFIDENCE_THRESHOLD:
+        return None
+
+    para_type, probability = prediction
+    return _make_result(
+        para_type,
+        round(probability, 2),
+        f"Local model: similar items were classified as {para_type}",
+        list(_FAST_PATH_NEXT_ACTIONS[para_type])
+    )
+
+
+def _fast_classify(title: str, description: str, context: str) -> Optional[Dict]:
+    """Try the keyword rules, then the local model, before paying for an LLM call."""
+    return _rule_classify(title, description, context) or _local_classify(title, description, context)
+
+
+def _prompt_variant() -> str:
+    """The prompts and model classifications come from, folded into cache keys.
+
+    Toggling PARA_VERBOSE_PROMPT or rerouting para_classification to another
+    provider then starts a fresh cache instead of serving the old answers.
+    """
+    provider = llm_provider.provider_map.get('para_classification', 'anthropic')
+    model = settings.GROQ_MODEL if provider == 'groq' and llm_provider.groq_client else settings.CLAUDE_MODEL
+    return hashlib.blake2b(
+        orjson.dumps([model, PARA_SYSTEM_PREFIX, BATCH_PARA_SYSTEM_PREFIX]), digest_size=8
+    ).hexdigest()
+
+
+_PROMPT_VARIANT = _prompt_variant()
+
+
+def _cache_key(title: str, description: str, context: str) -> Optional[str]:
+    """Hash the normalized inputs, or None if this call must not be cached."""
+    if _FEEDBACK_MARKER in (context or ""):
+        return None
+
+    canonical = orjson.dumps([
+        _PROMPT_VARIANT,
+        (title or "").strip().lower(),
+        (description or "").strip(),
+        (context or "").strip()
+    ])
+    return hashlib.blake2b(canonical, digest_size=16).hexdigest()
+
+
+def _from_cache(result: Dict) -> Dict:
+    """Copy a cached classification; a cache hit costs no tokens."""
+    return {**result, "usage": dict(_ZERO_USAGE)}
+
+
+def _local_cache_get(key: Optional[str]) -> Optional[Dict]:
+    if key is None or key not in _classification_cache:
+        return None
+    _classification_cache.move_to_end(key)
+    return _from_cache(_classification_cache[key])
+
+
+def _local_cache_set(key: Optional[str], result: Dict) -> None:
+    if key is None:
+        return
+    _classification_cache[key] = dict(result)
+    _classification_cache.move_to_end(key)
+    if len(_classification_cache) > CLASSIFICATION_CACHE_SIZE:
+        _classification_cache.popitem(last=False)
+
+
+async def _shared_cache_get(key: Optional[str]) -> Optional[Dict]:
+    """Look up a classification in Redis so workers share results."""
+    if key is None:
+        return None
+    try:
+        result = await cache.get(CacheKeys.classification_result(key))
+    except Exception as e:
+        logger.warning(f"Classification cache read failed: {str(e)}")
+        return None
+    if not isinstance(result, dict):
+        return None
+    _local_cache_set(key, result)
+    return _from_cache(result)
+
+
+async def _shared_cache_set(key: Optional[str], result: Dict) -> None:
+    if key is None:
+        return
+    try:
+        await cache.set(CacheKeys.classification_result(key), result, expire=CacheDuration.DAY)
+    except Exception as e:
+        logger.warning(f"Classification cache write failed: {str(e)}")
+
+
+async def _shared_cache_get_many(keys: List[str]) -> Dict[str, Dict]:
+    """Batch version of _shared_cache_get: one MGET for all keys."""
+    if not keys:
+        return {}
+    try:
+        values = await cache.mget([CacheKeys.classification_result(key) for key in keys])
+    except Exception as e:
+        logger.warning(f"Classification cache read failed: {str(e)}")
+        return {}
+    found = {}
+    for key, result in zip(keys, values):
+        if isinstance(result, dict):
+            _local_cache_set(key, result)
+            found[key] = _from_cache(result)
+    return found
+
 
-Be concise but specific in your reasoning. Suggest 2-4 concrete next actions that would move this forward."""
+async def _shared_cache_set_many(results: Dict[str, Dict]) -> None:
+    if not results:
+        return
+    try:
+        await cache.mset(
+            {CacheKeys.classification_result(key): result for key, result in results.items()},
+            expire=CacheDuration.DAY
+        )
+    except Exception as e:
+        logger.warning(f"Classification cache write failed: {str(e)}")
 
 
 def classify_item(title: str, description: str = "", context: str = "") -> Dict:
@@ -59,60 +397,223 @@ def classify_item(title: str, description: str = "", context: str = "") -> Dict:
         - estimated_duration_weeks: For projects, estimated duration
         - usage: Token usage and cost information
     """
-    prompt = PARA_CLASSIFICATION_PROMPT.format(
-        title=title,
-        description=description or "No description provided",
-        context=context or "No additional context"
-    )
+    fast = _fast_classify(title, description, context)
+    if fast is not None:
+        return fast
+
+    key = _cache_key(title, description, context)
+    cached = _local_cache_get(key)
+    if cached is not None:
+        return cached
 
     try:
         # Use LLM provider abstraction - routes to Groq for cost savings
         response = llm_provider.get_completion(
             task_type='para_classification',
-            prompt=prompt,
+            prompt=_item_prompt(title, description, context),
             max_tokens=1000,
-            temperature=0.3  # Lower temperature for consistent classification
+            temperature=0.3,  # Lower temperature for consistent classification
+            system_prompt=PARA_SYSTEM_PREFIX,
+            cache_system_prompt=True,
+            json_schema=PARA_SCHEMA
         )
-
-        # Parse JSON response
-        result = json.loads(response["text"])
-
-        # Add token usage from provider response
-        return {**result, "usage": response["usage"]}
-
-    except json.JSONDecodeError as e:
-        # If JSON parsing fails, try to extract what we can
-        raw_text = response.get("text", "")
-        return {
-            "para_type": "resource",  # Default fallback
-            "confidence": 0.5,
-            "reasoning": f"Classification uncertain. Raw response: {raw_text[:200]}",
-            "suggested_next_actions": ["Review and manually classify this item"],
-            "estimated_duration_weeks": None,
-            "usage": response.get("usage", {
-                "input_tokens": 0,
-                "output_tokens": 0,
-                "cost_usd": 0.0
-            })
-        }
+        result = _parse_classification(response)
     except Exception as e:
         # Handle API errors
-        return {
-            "para_type": "resource",
-            "confidence": 0.0,
-            "reasoning": f"Error during classification: {str(e)}",
-            "suggested_next_actions": ["Retry classification"],
-            "estimated_duration_weeks": None,
-            "usage": {
-                "input_tokens": 0,
-                "output_tokens": 0,
-                "cost_usd": 0.0
-            }
+        return _error_classification(e)
+
+    _local_cache_set(key, result)
+    return result
+
+
+async def aclassify_item(title: str, description: str = "", context: str = "") -> Dict:
+    """Async version of classify_item() for concurrent fan-out.
+
+    Returns the same dictionary as classify_item(). Results are also
+    shared across workers through Redis when it is connected.
+    """
+    fast = _fast_classify(title, description, context)
+    if fast is not None:
+        return fast
+
+    key = _cache_key(title, description, context)
+    cached = _local_cache_get(key) or await _shared_cache_get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        response = await llm_provider.aget_completion(
+            task_type='para_classification',
+            prompt=_item_prompt(title, description, context),
+            max_tokens=1000,
+            temperature=0.3,
+            system_prompt=PARA_SYSTEM_PREFIX,
+            cache_system_prompt=True,
+            json_schema=PARA_SCHEMA
+        )
+        result = _parse_classification(response)
+    except Exception as e:
+        return _error_classification(e)
+
+    _local_cache_set(key, result)
+    await _shared_cache_set(key, result)
+    return result
+
+
+def _format_batch_items(items: List[Dict]) -> str:
+    """Render a chunk of items as numbered slots after BATCH_PARA_ITEMS_PREFIX."""
+    return "\n".join(
+        f"[{i}] Title: {item.get('title', '')} "
+        f"Desc: {item.get('description') or 'No description provided'} "
+        f"Ctx: {item.get('context') or 'No additional context'}"
+        for i, item in enumerate(items, 1)
+    )
+
+
+def _split_usage(usage: Dict, parts: int) -> Dict:
+    """Spread one chunk's token usage and cost evenly across its items."""
+    return {
+        "input_tokens": usage.get("input_tokens", 0) // parts,
+        "output_tokens": usage.get("output_tokens", 0) // parts,
+        "cost_usd": round(usage.get("cost_usd", 0.0) / parts, 6)
+    }
+
+
+async def _aclassify_individually(items: List[Dict], semaphore: asyncio.Semaphore) -> List[Dict]:
+    """Fallback path: one concurrent aclassify_item call per item."""
+    async def _classify(item: Dict) -> Dict:
+        async with semaphore:
+            return await aclassify_item(
+                title=item.get("title", ""),
+                description=item.get("description", ""),
+                context=item.get("context", "")
+            )
+
+    return list(await asyncio.gather(*(_classify(item) for item in items)))
+
+
+async def _aclassify_chunk(items: List[Dict], semaphore: asyncio.Semaphore) -> List[Dict]:
+    """Classify a chunk of items with a single batched LLM call.
+
+    Falls back to per-item classification if the batched response
+    can't be parsed, and for any item missing from the response.
+    """
+    prompt = BATCH_PARA_ITEMS_PREFIX + _format_batch_items(items)
+
+    try:
+        async with semaphore:
+            response = await llm_provider.aget_completion(
+                task_type='para_classification',
+                prompt=prompt,
+                max_tokens=BATCH_MAX_TOKENS_PER_ITEM * len(items),
+                temperature=0.3,
+                system_prompt=BATCH_PARA_SYSTEM_PREFIX,
+                cache_system_prompt=True,
+                json_schema=BATCH_PARA_SCHEMA
+            )
+        results = orjson.loads(response["text"])["results"]
+        by_index = {}
+        for r in results:
+            try:
+                by_index[int(r["index"])] = _validate_classification(r)
+            except ValidationError:
+                continue  # Invalid entries are retried item by item below
+    except Exception:
+        # API error or incomplete batch response - retry the chunk item by item
+        return await _aclassify_individually(items, semaphore)
+
+    item_usage = _split_usage(response.get("usage", {}), len(items))
+
+    missing = [item for i, item in enumerate(items, 1) if i not in by_index]
+    fallback = iter(await _aclassify_individually(missing, semaphore))
+
+    classifications = []
+    for i in range(1, len(items) + 1):
+        result = by_index.get(i)
+        if result is None:
+            classifications.append(next(fallback))
+            continue
+        item = items[i - 1]
+        _local_cache_set(
+            _cache_key(item.get("title", ""), item.get("description", ""), item.get("context", "")),
+            result
+        )
+        classifications.append({**result, "usage": item_usage})
+    return classifications
+
+
+async def abatch_classify_items(items: List[Dict]) -> List[Dict]:
+    """Classify items in batched chunks, running the chunks concurrently.
+
+    Items the keyword rules or local model can decide never reach the LLM.
+    At most MAX_CONCURRENT_REQUESTS LLM calls are in flight at once to stay
+    within provider rate limits.
+
+    Args:
+        items: List of items to classify, each with 'title', 'description', 'context'
+
+    Returns:
+        List of classification results with item IDs
+    """
+    classifications: Dict[int, Dict] = {}
+    keys: Dict[int, str] = {}
+    pending = []
+    for i, item in enumerate(items):
+        title, description, context = item.get("title", ""), item.get("description", ""), item.get("context", "")
+        fast = _fast_classify(title, description, context)
+        if fast is not None:
+            classifications[i] = fast
+            continue
+        key = _cache_key(title, description, context)
+        cached = _local_cache_get(key)
+        if cached is not None:
+            classifications[i] = cached
+            continue
+        if key is not None:
+            keys[i] = key
+        pending.append(i)
+
+    # Local-cache misses are looked up in Redis with a single MGET
+    shared = await _shared_cache_get_many([keys[i] for i in pending if i in keys])
+    still_pending = []
+    for i in pending:
+        if keys.get(i) in shared:
+            classifications[i] = shared[keys[i]]
+        else:
+            still_pending.append(i)
+    pending = still_pending
+
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    chunks = [pending[start:start + BATCH_SIZE] for start in range(0, len(pending), BATCH_SIZE)]
+    chunk_results = await asyncio.gather(*(
+        _aclassify_chunk([items[i] for i in chunk], semaphore) for chunk in chunks
+    ))
+    for chunk, chunk_classifications in zip(chunks, chunk_results):
+        classifications.update(zip(chunk, chunk_classifications))
+
+    # Successful LLM results land in the local cache (errors never do);
+    # share them with the other workers in one pipelined write
+    await _shared_cache_set_many({
+        keys[i]: _classification_cache[keys[i]]
+        for i in pending
+        if i in keys and keys[i] in _classification_cache
+    })
+
+    return [
+        {
+            "item_id": item.get("id"),
+            "original_title": item.get("title"),
+            "classification": classifications[i]
         }
+        for i, item in enumerate(items)
+    ]
 
 
-def batch_classify_items(items: List[Dict]) -> List[Dict]:
-    """Classify multiple items efficiently.
+def batch_classify_items_offline(items: List[Dict]) -> List[Dict]:
+    """Classify items through the Anthropic Message Batches API.
+
+    Half the price of live calls but can take up to 24h, so this is meant
+    for back-office jobs like nightly re-sorts, not interactive requests.
 
     Args:
         items: List of items to classify, each with 'title', 'description', 'context'
@@ -120,13 +621,35 @@ def batch_classify_items(items: List[Dict]) -> List[Dict]:
     Returns:
         List of classification results with item IDs
     """
+    prompts = {
+        str(i): _item_prompt(item.get("title", ""), item.get("description"), item.get("context"))
+        for i, item in enumerate(items)
+    }
+
+    responses = llm_provider.get_batch_completions(
+        prompts,
+        max_tokens=1000,
+        temperature=0.3,
+        system_prompt=PARA_SYSTEM_PREFIX,
+        cache_system_prompt=True,
+        json_schema=PARA_SCHEMA
+    )
+
     results = []
-    for item in items:
-        classification = classify_item(
-            title=item.get("title", ""),
-            description=item.get("description", ""),
-            context=item.get("context", "")
-        )
+    for i, item in enumerate(items):
+        response = responses.get(str(i))
+        if response is not None:
+            try:
+                classification = _parse_classification(response)
+            except (ValueError, KeyError) as e:
+                classification = _error_classification(e)
+        else:
+            # Request errored or expired in the batch - classify live
+            classification = classify_item(
+                title=item.get("title", ""),
+                description=item.get("description", ""),
+                context=item.get("context", "")
+            )
         results.append({
             "item_id": item.get("id"),
             "original_title": item.get("title"),
@@ -135,6 +658,31 @@ def batch_classify_items(items: List[Dict]) -> List[Dict]:
     return results
 
 
+def batch_classify_items(
+    items: List[Dict],
+    mode: Literal["live", "batch"] = "live"
+) -> List[Dict]:
+    """Classify multiple items efficiently.
+
+    Items are grouped into chunks of BATCH_SIZE and each chunk is classified
+    with one LLM call, so the PARA instructions are only sent once per chunk.
+    Chunks run concurrently. Must not be called from inside a running event
+    loop - use abatch_classify_items() there instead.
+
+    Args:
+        items: List of items to classify, each with 'title', 'description', 'context'
+        mode: "live" for interactive use, "batch" to go through the discounted
+            Message Batches API (see batch_classify_items_offline)
+
+    Returns:
+        List of classification results with item IDs
+    """
+    if mode == "batch":
+        return batch_classify_items_offline(items)
+
+    return asyncio.run(abatch_classify_items(items))
+
+
 def reclassify_with_feedback(
     title: str,
     description: str,
@@ -1,10 +1,53 @@
-from anthropic import Anthropic
 from config import settings
-from database import supabase
+from llm_provider import llm_provider
+from database import supabase, execute_async
 from datetime import datetime, timedelta
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List
+from functools import lru_cache
+import heapq
 import json
 
+
+def _context_for_slot(day_of_week: int, hour: int) -> str:
+    # Friday afternoon
+    if day_of_week == 4 and hour >= 15:
+        return "friday"
+
+    # Morning (6am - 10am)
+    if 6 <= hour < 10:
+        return "morning"
+
+    # End of day (5pm - 8pm)
+    if 17 <= hour < 20:
+        return "end_of_day"
+
+    # Check if there's a meeting in next 30 minutes
+    # (would need calendar integration)
+    return "general"
+
+
+@lru_cache(maxsize=1024)
+def _parse_iso(value: str) -> datetime:
+    """Parse an ISO timestamp; the same event times are seen on every poll."""
+    return datetime.fromisoformat(value)
+
+
+# Lower sorts first; unknown priorities go last
+_PRIORITY_ORDER = {"urgent": 0, "high": 1, "medium": 2, "low": 3}
+
+
+def _priority_key(task: Dict[str, Any]) -> int:
+    return _PRIORITY_ORDER.get(task['priority'], len(_PRIORITY_ORDER))
+
+
+# (weekday, hour) -> context, precomputed so detection is a single dict lookup
+_CONTEXT_BY_SLOT = {
+    (day, hour): _context_for_slot(day, hour)
+    for day in range(7)
+    for hour in range(24)
+}
+
+
 class ContextAwareSuggestionsAgent:
     """
     Provides context-aware suggestions based on user's current situation
@@ -13,8 +56,11 @@ class ContextAwareSuggestionsAgent:
     - Friday: "Ready to start weekly review?"
     """
 
+    CONTEXTS = ("before_meeting", "end_of_day", "friday", "morning")
+
     def __init__(self):
-        self.client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+        # Shared client - keeps one warm connection pool per process
+        self.client = llm_provider.anthropic_client
         self.model = settings.CLAUDE_MODEL
 
     async def get_suggestions(self, user_id: str, context: str = "auto") -> List[Dict[str, Any]]:
@@ -23,106 +69,110 @@ class ContextAwareSuggestionsAgent:
         context: "auto", "before_meeting", "end_of_day", "friday", "morning"
         """
 
+        now = datetime.now()
+
         if context == "auto":
-            context = self._detect_context()
+            context = self._detect_context(now)
+
+        if context not in self.CONTEXTS:
+            return []
+
+        bundle = await self._fetch_context_bundle(user_id, now)
+        return self._suggestions_for(context, bundle, now)
+
+    async def get_all_suggestions(self, user_id: str) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get suggestions for every context at once (e.g. for a dashboard).
+        All contexts are built from a single database round trip.
+        """
 
-        suggestions = []
+        now = datetime.now()
+        bundle = await self._fetch_context_bundle(user_id, now)
 
+        return {
+            context: self._suggestions_for(context, bundle, now)
+            for context in self.CONTEXTS
+        }
+
+    def _suggestions_for(self, context: str, bundle: Dict[str, Any], now: datetime) -> List[Dict[str, Any]]:
         if context == "before_meeting":
-            suggestions = await self._before_meeting_suggestions(user_id)
+            return self._before_meeting_suggestions(bundle, now)
         elif context == "end_of_day":
-            suggestions = await self._end_of_day_suggestions(user_id)
+            return self._end_of_day_suggestions(bundle)
         elif context == "friday":
-            suggestions = await self._friday_suggestions(user_id)
+            return self._friday_suggestions(bundle)
         elif context == "morning":
-            suggestions = await self._morning_suggestions(user_id)
+            return self._morning_suggestions(bundle)
+        return []
 
-        return suggestions
+    async def _fetch_context_bundle(self, user_id: str, now: datetime) -> Dict[str, Any]:
+        """
+        Fetch upcoming events (with linked tasks), quick tasks, today's tasks and
+        this week's review status in one call to the get_context_bundle RPC
+        """
 
-    def _detect_context(self) -> str:
-        """Auto-detect context based on current time"""
-        now = datetime.now()
-        hour = now.hour
-        day_of_week = now.weekday()  # 0 = Monday, 4 = Friday
+        today = now.replace(hour=0, minute=0, second=0)
+        today_end = today.replace(hour=23, minute=59, second=59)
 
-        # Friday afternoon
-        if day_of_week == 4 and hour >= 15:
-            return "friday"
+        week_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        week_start = week_start - timedelta(days=week_start.weekday())
 
-        # Morning (6am - 10am)
-        if 6 <= hour < 10:
-            return "morning"
+        result = await execute_async(
+            supabase.rpc('get_context_bundle', {
+                'p_user_id': user_id,
+                'p_now': now.isoformat(),
+                'p_day_start': today.isoformat(),
+                'p_day_end': today_end.isoformat(),
+                'p_week_start': week_start.date().isoformat()
+            })
+        )
 
-        # End of day (5pm - 8pm)
-        if 17 <= hour < 20:
-            return "end_of_day"
+        return result.data or {}
 
-        # Check if there's a meeting in next 30 minutes
-        # (would need calendar integration)
-        return "general"
+    def _detect_context(self, now: datetime) -> str:
+        """Auto-detect context based on current time"""
+        return _CONTEXT_BY_SLOT[(now.weekday(), now.hour)]  # weekday: 0 = Monday, 4 = Friday
 
-    async def _before_meeting_suggestions(self, user_id: str) -> List[Dict[str, Any]]:
+    def _before_meeting_suggestions(self, bundle: Dict[str, Any], now: datetime) -> List[Dict[str, Any]]:
         """Suggestions before meetings"""
 
-        # Get upcoming calendar events
-        next_hour = (datetime.now() + timedelta(hours=1)).isoformat()
-
-        upcoming_events = supabase.table('calendar_events')\
-            .select('*')\
-            .eq('user_id', user_id)\
-            .gte('start_time', datetime.now().isoformat())\
-            .lte('start_time', next_hour)\
-            .execute()
+        return [
+            suggestion
+            for event in bundle.get('events', [])
+            for suggestion in self._event_suggestions(event, now)
+        ]
 
-        if not upcoming_events.data:
-            return []
+    def _event_suggestions(self, event: Dict[str, Any], now: datetime) -> Iterator[Dict[str, Any]]:
+        """Yield the meeting prep suggestions for one upcoming event"""
 
-        suggestions = []
-
-        for event in upcoming_events.data:
-            # Check if there's a linked task or project
-            if event.get('linked_task_id'):
-                task = supabase.table('tasks')\
-                    .select('title, para_item_id')\
-                    .eq('id', event['linked_task_id'])\
-                    .single()\
-                    .execute()
-
-                if task.data:
-                    suggestions.append({
-                        "type": "meeting_prep",
-                        "title": f"Prepare for: {event['title']}",
-                        "description": f"Review task: {task.data['title']}",
-                        "action": "review_task",
-                        "action_id": event['linked_task_id'],
-                        "urgency": "high"
-                    })
-
-            # Generic meeting prep
-            suggestions.append({
+        # Check if there's a linked task or project
+        task = event.get('linked_task')
+        if task:
+            yield {
                 "type": "meeting_prep",
-                "title": f"Meeting in {self._time_until(event['start_time'])}",
-                "description": event['title'],
-                "action": "open_calendar",
-                "urgency": "medium"
-            })
-
-        return suggestions
-
-    async def _end_of_day_suggestions(self, user_id: str) -> List[Dict[str, Any]]:
+                "title": f"Prepare for: {event['title']}",
+                "description": f"Review task: {task['title']}",
+                "action": "review_task",
+                "action_id": event['linked_task_id'],
+                "urgency": "high"
+            }
+
+        # Generic meeting prep
+        yield {
+            "type": "meeting_prep",
+            "title": f"Meeting in {self._time_until(event['start_time'], now)}",
+            "description": event['title'],
+            "action": "open_calendar",
+            "urgency": "medium"
+        }
+
+    def _end_of_day_suggestions(self, bundle: Dict[str, Any]) -> List[Dict[str, Any]]:
         """End of day suggestions"""
 
-        # Find quick tasks (< 15 minutes)
-        quick_tasks = supabase.table('tasks')\
-            .select('*')\
-            .eq('user_id', user_id)\
-            .eq('status', 'pending')\
-            .lte('estimated_duration_minutes', 15)\
-            .order('priority', desc=True)\
-            .limit(5)\
-            .execute()
-
-        if not quick_tasks.data:
+        # Quick tasks (< 15 minutes)
+        quick_tasks = bundle.get('quick_tasks', [])
+
+        if not quick_tasks:
             return []
 
         return [{
@@ -135,26 +185,17 @@ class ContextAwareSuggestionsAgent:
                     "title": t['title'],
                     "duration": t['estimated_duration_minutes']
                 }
-                for t in quick_tasks.data[:3]
+                for t in quick_tasks[:3]
             ],
             "action": "show_quick_tasks",
             "urgency": "low"
         }]
 
-    async def _friday_suggestions(self, user_id: str) -> List[Dict[str, Any]]:
+    def _friday_suggestions(self, bundle: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Friday afternoon suggestions"""
 
         # Check if weekly review exists for this week
-        week_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        week_start = week_start - timedelta(days=week_start.weekday())
-
-        existing_review = supabase.table('weekly_reviews')\
-            .select('id')\
-            .eq('user_id', user_id)\
-            .eq('week_start_date', week_start.isoformat())\
-            .execute()
-
-        if not existing_review.data:
+        if not bundle.get('weekly_review_exists'):
             return [{
                 "type": "weekly_review",
                 "title": "Ready to start your weekly review?",
@@ -165,22 +206,12 @@ class ContextAwareSuggestionsAgent:
 
         return []
 
-    async def _morning_suggestions(self, user_id: str) -> List[Dict[str, Any]]:
+    def _morning_suggestions(self, bundle: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Morning suggestions"""
 
-        # Get today's tasks
-        today = datetime.now().replace(hour=0, minute=0, second=0)
-        today_end = today.replace(hour=23, minute=59, second=59)
+        today_tasks = bundle.get('today_tasks', [])
 
-        today_tasks = supabase.table('tasks')\
-            .select('*')\
-            .eq('user_id', user_id)\
-            .neq('status', 'completed')\
-            .gte('due_date', today.isoformat())\
-            .lte('due_date', today_end.isoformat())\
-            .execute()
-
-        if not today_tasks.data:
+        if not today_tasks:
             return [{
                 "type": "no_tasks",
                 "title": "No tasks scheduled for today",
@@ -190,14 +221,11 @@ class ContextAwareSuggestionsAgent:
             }]
 
         # Prioritize top 3
-        top_tasks = sorted(
-            today_tasks.data,
-            key=lambda t: {"urgent": 0, "high": 1, "medium": 2, "low": 3}[t['priority']]
-        )[:3]
+        top_tasks = heapq.nsmallest(3, today_tasks, key=_priority_key)
 
         return [{
             "type": "daily_plan",
-            "title": f"Good morning! You have {len(today_tasks.data)} tasks today",
+            "title": f"Good morning! You have {len(today_tasks)} tasks today",
             "description": "Here are your top priorities:",
             "tasks": [
                 {
@@ -211,12 +239,10 @@ class ContextAwareSuggestionsAgent:
             "urgency": "high"
         }]
 
-    def _time_until(self, future_time: str) -> str:
+    def _time_until(self, future_time: str, now: datetime) -> str:
         """Calculate human-readable time until future event"""
-        future = datetime.fromisoformat(future_time)
-        delta = future - datetime.now()
-
-        minutes = int(delta.total_seconds() / 60)
+        # Compare POSIX timestamps so aware (timestamptz) and naive values mix safely
+        minutes = int((_parse_iso(future_time).timestamp() - now.timestamp()) / 60)
 
         if minutes < 1:
             return "now"
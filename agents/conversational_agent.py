@@ -3,29 +3,242 @@
 This is the "Autopilot" - the brain that executes multi-step tasks.
 """
 
-from anthropic import Anthropic
-from typing import Dict, List, Any, Optional
-from datetime import datetime
-from config import settings
-from database import supabase, db
-import json
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from database import supabase, db, execute_async, fetch_rows, get_user_profile
+from agents.embeddings import QuantizedVector, quantize_int8, quantized_similarities
+from llm_provider import llm_provider
+import asyncio
+import hashlib
 import logging
+import re
+import time
+
+import numpy as np
+import orjson
 
 logger = logging.getLogger(__name__)
-client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+
+# USD per token: (input, output, cache write, cache read). Swapping self.model
+# only needs an entry here.
+MODEL_TOKEN_COSTS: Dict[str, Tuple[float, float, float, float]] = {
+    "claude-sonnet-4-20250514": (3.0e-6, 15.0e-6, 3.75e-6, 0.30e-6),
+    "claude-opus-4-20250514": (15.0e-6, 75.0e-6, 18.75e-6, 1.50e-6),
+    "claude-3-5-haiku-20241022": (0.80e-6, 4.0e-6, 1.0e-6, 0.08e-6),
+}
+
+# A streamed turn with no event for this long is treated as hung
+STREAM_CHUNK_TIMEOUT_SECONDS = 30.0
+
+# Bounds concurrent Supabase/Gmail calls when one turn requests several tools
+MAX_CONCURRENT_TOOL_CALLS = 5
+
+# Column projections for context reads - never pull embeddings or sync metadata
+PROJECT_CONTEXT_COLUMNS = "id, title, due_date, status"
+TASK_CONTEXT_COLUMNS = "id, title, due_date, priority, status, para_item_id"
+EVENT_CONTEXT_COLUMNS = "id, title, start_time, end_time"
+EVENT_TOOL_COLUMNS = "id, title, description, start_time, end_time, location, attendees, is_all_day, linked_task_id"
+
+# Projects/tasks/calendar change on the order of minutes, so back-to-back
+# turns from the same user can reuse the context instead of re-querying
+CONTEXT_CACHE_TTL_SECONDS = 30.0
+CONTEXT_CACHE_SIZE = 1000
+
+# Structural input guards: these are answered without any LLM call
+MAX_MESSAGE_CHARS = 8000
+_REPEATED_CHAR_RE = re.compile(r"(.)\1{199,}", re.DOTALL)
+
+# Conversation history sent to Claude is capped at roughly this many tokens
+MAX_HISTORY_TOKENS = 8000
+MAX_CARRIED_ENTITIES = 30
+
+# Decrypted Gmail clients are reused per user for this long
+GMAIL_CLIENT_TTL_SECONDS = 300.0
+
+# Semantic response cache: paraphrased questions ("what's due today?" vs
+# "show me today's tasks") against unchanged context reuse the prior answer
+RESPONSE_CACHE_SIMILARITY = 0.95
+RESPONSE_CACHE_TTL_SECONDS = 300.0
+RESPONSE_CACHE_PER_USER = 50
+
+# Dates, times, numbers and email addresses must match exactly before a
+# cached answer is served - "due on the 3rd" and "due on the 4th" embed alike
+_CRITICAL_ENTITY_RE = re.compile(
+    r"(?<![\w.+-])[\w.+-]+@[\w-]+\.[\w.-]+"
+    r"|\b\d[\d:/.-]*\b"
+    r"|\b(?:today|tomorrow|yesterday|tonight|monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b",
+    re.IGNORECASE
+)
+
+
+# Fixed replies for read-only tools that came back empty, keyed by tool name.
+# Formatted with the tool input; returning one skips the follow-up Claude call.
+# Searches are left out on purpose: after an empty search Claude can suggest
+# other queries or carry on with the rest of a multi-step request.
+_EMPTY_RESULT_REPLIES = {
+    "get_calendar_events": "You have no events between {start_date} and {end_date}.",
+    "search_contacts": "I couldn't find any emails from \"{name}\". Could you give me their email address?",
+}
+_EMPTY_RESULT_COUNT_FIELD = {
+    "get_calendar_events": "count",
+    "search_contacts": "found",
+}
+
+
+def _direct_reply(tool_calls: List[Dict]) -> Optional[str]:
+    """Templated answer when every tool call was an empty read-only lookup, else None."""
+    if not tool_calls:
+        return None
+
+    replies = []
+    for call in tool_calls:
+        template = _EMPTY_RESULT_REPLIES.get(call["tool"])
+        output = call["result"]
+        if template is None or "error" in output or output.get(_EMPTY_RESULT_COUNT_FIELD[call["tool"]]) != 0:
+            return None
+        try:
+            replies.append(template.format(**call["input"]))
+        except KeyError:
+            return None
+
+    return "\n".join(replies)
+
+
+# Strong references so fire-and-forget log writes aren't garbage collected mid-flight
+_background_logs: set = set()
+
+
+def _log_in_background(**action) -> None:
+    """Write an agent_actions row in a worker thread without awaiting it."""
+    async def write():
+        try:
+            await asyncio.to_thread(db.log_agent_action, **action)
+        except Exception as e:
+            logger.warning(f"Failed to log agent action: {str(e)}")
+
+    task = asyncio.create_task(write())
+    _background_logs.add(task)
+    task.add_done_callback(_background_logs.discard)
+
+
+def _local_day_bounds(now: datetime, tz_name: str) -> Tuple[datetime, datetime]:
+    """Aware [start, end) of the current day in the user's timezone."""
+    try:
+        tz = ZoneInfo(tz_name)
+    except (ZoneInfoNotFoundError, ValueError):
+        tz = timezone.utc
+    start = now.astimezone(tz).replace(hour=0, minute=0, second=0, microsecond=0)
+    return start, start + timedelta(days=1)
+
+
+def _parse_timestamp(value: str) -> datetime:
+    """Parse an ISO timestamp, treating naive values as UTC."""
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _due_then_title(row: Dict) -> Tuple[str, str]:
+    """Sort key giving context rows a canonical order (undated rows last)."""
+    return (row.get('due_date') or '\uffff', row['title'])
+
+
+def _critical_entities(message: str) -> frozenset:
+    return frozenset(m.lower() for m in _CRITICAL_ENTITY_RE.findall(message))
+
+
+def _reject_message(message: str) -> Optional[str]:
+    """Reply for input not worth sending to Claude (empty, oversized, junk), else None."""
+    text = message.strip() if isinstance(message, str) else ""
+    if not text or len(text) > MAX_MESSAGE_CHARS:
+        return f"Please send a non-empty message under {MAX_MESSAGE_CHARS} characters."
+    if _REPEATED_CHAR_RE.search(text):
+        return "That message looks like repeated characters. What would you like me to help with?"
+    control_chars = sum(1 for c in text if ord(c) < 32 and c not in "\n\r\t")
+    if control_chars > len(text) * 0.1:
+        return "That message looks like binary data rather than text. What would you like me to help with?"
+    return None
+
+
+def _estimate_tokens(content: Any) -> int:
+    """Rough token count (~4 characters per token) without a tokenizer round trip."""
+    return len(content if isinstance(content, str) else str(content)) // 4 + 1
+
+
+def _trim_history(history: List[Dict]) -> List[Dict]:
+    """Keep the most recent history that fits MAX_HISTORY_TOKENS.
+
+    Whole user/assistant exchanges are dropped from the front so the window
+    still starts with a user message. The dates, numbers and email addresses
+    mentioned in what was dropped are carried over in a note on the first kept
+    message, since those are the details a follow-up most often depends on.
+    """
+    total = sum(_estimate_tokens(m["content"]) for m in history)
+    if total <= MAX_HISTORY_TOKENS:
+        return list(history)
+
+    start = 0
+    while start < len(history) and total > MAX_HISTORY_TOKENS:
+        total -= _estimate_tokens(history[start]["content"])
+        start += 1
+    # Never open the window on an assistant message
+    while start < len(history) and history[start]["role"] != "user":
+        total -= _estimate_tokens(history[start]["content"])
+        start += 1
+
+    dropped = history[:start]
+    kept = [dict(m) for m in history[start:]]
+    if not kept:
+        return []
+
+    entities = set()
+    for m in dropped:
+        entities.update(_critical_entities(m["content"] if isinstance(m["content"], str) else str(m["content"])))
+    note = f"[{len(dropped)} earlier messages omitted."
+    if entities:
+        note += f" They mentioned: {', '.join(sorted(entities)[:MAX_CARRIED_ENTITIES])}."
+    note += "]"
+
+    if isinstance(kept[0]["content"], str):
+        kept[0]["content"] = f"{note}\n\n{kept[0]['content']}"
+    return kept
+
+
+class SemanticResponseCache:
+    """Per-user cache of chat answers, looked up by query embedding."""
+
+    def __init__(self):
+        # Embeddings are held as int8 codes - 1.5 KB per entry instead of 6 KB
+        self._entries: Dict[str, Deque[Tuple[QuantizedVector, str, frozenset, float, Dict]]] = {}
+
+    def get(self, user_id: str, embedding: np.ndarray, fingerprint: str, entities: frozenset) -> Optional[Dict]:
+        entries = self._entries.get(user_id)
+        if not entries:
+            return None
+
+        now = time.monotonic()
+        while entries and now - entries[0][3] > RESPONSE_CACHE_TTL_SECONDS:
+            entries.popleft()
+
+        candidates = [e for e in entries if e[1] == fingerprint and e[2] == entities]
+        if not candidates:
+            return None
+
+        similarities = quantized_similarities([e[0] for e in candidates], embedding)
+        best = int(similarities.argmax())
+        if similarities[best] < RESPONSE_CACHE_SIMILARITY:
+            return None
+        return candidates[best][4]
+
+    def set(self, user_id: str, embedding: np.ndarray, fingerprint: str, entities: frozenset, result: Dict) -> None:
+        entries = self._entries.setdefault(user_id, deque(maxlen=RESPONSE_CACHE_PER_USER))
+        entries.append((quantize_int8(embedding), fingerprint, entities, time.monotonic(), result))
 
 
 AGENT_SYSTEM_PROMPT = """You are PARA Autopilot - an intelligent AI assistant that helps users manage their work and life using the PARA method (Projects, Areas, Resources, Archive).
 
-You have access to the user's complete productivity system:
-- **Projects**: Active work with deadlines and goals
-- **Areas**: Ongoing responsibilities (Health, Finances, etc.)
-- **Resources**: Reference material and knowledge
-- **Archive**: Completed or inactive items
-- **Tasks**: Actionable items with due dates and priorities
-- **Calendar**: Meetings and events
-- **Emails**: Gmail integration for communication
-- **Google Tasks**: Mobile task sync
+You have access to the user's productivity system: projects (active work with deadlines), areas (ongoing responsibilities), resources (reference material), archive (inactive items), tasks, calendar events, Gmail and Google Tasks.
 
 ## Your Personality
 - **Proactive**: Suggest improvements and optimizations
@@ -35,144 +248,303 @@ You have access to the user's complete productivity system:
 - **Helpful**: Offer alternatives when info is missing
 
 ## How You Work
-
-### 1. UNDERSTAND INTENT
-- Parse what the user wants to accomplish
-- Identify required information
-- Break down multi-step requests
-
-### 2. GATHER CONTEXT
-- Use tools to search PARA items, emails, calendar
-- Semantic search for relevant information
-- Consider user's work patterns and history
-
-### 3. REASON & PLAN
-- Think through the steps needed
-- Identify dependencies
-- Spot potential issues
-
-### 4. CONFIRM BEFORE ACTING
-- **ALWAYS** show email drafts before sending
-- **ALWAYS** confirm before creating/deleting items
-- Explain your reasoning
-- Offer alternatives
-
-### 5. EXECUTE & LOG
-- Perform the action using tools
-- Log what you did for transparency
-- Suggest relevant follow-ups
-
-### 6. HANDLE ERRORS GRACEFULLY
-- If info not found, ask clarifying questions
-- Suggest alternatives ("Should I search your Drive?")
-- **NEVER** guess or make up email addresses
-- **NEVER** assume context you don't have
-
-## Important Guidelines
-
-### Email Handling
-- Always find recipient email address using search_contacts
-- If multiple matches, ask user which one
-- If not found, ask user to provide it
-- Draft in user's writing style (formal vs. casual based on history)
-- Include relevant context from PARA system
-
-### Task Management
-- Link tasks to relevant projects when possible
-- Suggest realistic due dates based on user's workload
-- Consider user's calendar when scheduling
-- Auto-sync to Google Tasks if user prefers mobile access
-
-### Context Building
-- Reference user's projects when relevant
-- Mention past conversations/decisions
-- Connect related items (emails → tasks → projects)
-- Provide summaries, not raw data dumps
-
-### Proactive Suggestions
-- Notice patterns ("You always do X on Tuesday mornings")
-- Detect conflicts ("This task is due but your calendar is full")
-- Spot stale items ("This project hasn't been updated in 10 days")
-
-## Tools Available
-
-Use tools to interact with user's data. Chain them together for complex tasks.
-
-**Search & Retrieval:**
-- `search_para_items` - Semantic search across all PARA items
-- `search_emails` - Search Gmail with filters
-- `search_contacts` - Find email addresses
-- `get_calendar_events` - Check schedule
-
-**Creation & Modification:**
-- `create_task` - Add new task
-- `create_para_item` - Add project/area/resource
-- `update_task` - Modify existing task
-- `send_email` - Send email (CONFIRM FIRST!)
-
-**Analysis:**
-- `get_project_status` - Get project details & progress
-- `analyze_productivity` - Get stats and insights
-- `find_similar_items` - Semantic similarity search
+1. **Understand intent** - identify what the user wants and break down multi-step requests
+2. **Gather context** - use tools to search PARA items, emails and calendar; chain them for complex tasks
+3. **Reason & plan** - think through steps, dependencies and potential issues
+4. **Confirm before acting** - ALWAYS show email drafts before sending and confirm before creating/deleting items
+5. **Execute** - perform the action, then suggest relevant follow-ups
+6. **Handle errors gracefully** - if info isn't found, ask clarifying questions or suggest alternatives. NEVER guess email addresses or assume context you don't have
+
+## Guidelines
+- **Email**: find recipient addresses with search_contacts; if there are multiple matches ask which one, if none ask the user. Match the user's writing style and include relevant PARA context
+- **Tasks**: link tasks to relevant projects, suggest realistic due dates based on workload and calendar
+- **Context**: reference the user's projects, connect related items (emails -> tasks -> projects), give summaries not raw data dumps
+- **Proactive suggestions**: notice patterns, detect conflicts (task due but calendar full), spot stale projects
 
 Remember: You're not just a search engine - you're an intelligent assistant that takes action and helps users accomplish their goals!
 """
 
 
+# Tool schemas are static: built once so every request sends the identical
+# (prompt-cacheable) tools prefix without re-allocating the list per turn
+TOOL_DEFINITIONS: List[Dict] = [
+    {
+        "name": "search_para_items",
+        "description": "Search user's PARA items (projects, areas, resources, archives) using semantic search. Use this to find relevant projects, reference materials, or past work.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Search query (e.g., 'Q4 budget', 'website redesign')"
+                },
+                "para_type": {
+                    "type": "string",
+                    "enum": ["project", "area", "resource", "archive"],
+                    "description": "Filter by PARA type (optional)"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Max results (default: 10)"
+                }
+            },
+            "required": ["query"]
+        }
+    },
+    {
+        "name": "search_emails",
+        "description": "Search user's Gmail inbox. Use Gmail query syntax for filters.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Gmail search query (e.g., 'from:alice subject:budget', 'is:unread', 'has:attachment')"
+                },
+                "max_results": {
+                    "type": "integer",
+                    "description": "Max emails to return (default: 20)"
+                }
+            },
+            "required": ["query"]
+        }
+    },
+    {
+        "name": "search_contacts",
+        "description": "Find a person's email address from user's contacts. Returns all matches if multiple people have same name.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "name": {
+                    "type": "string",
+                    "description": "Person's name to search for"
+                }
+            },
+            "required": ["name"]
+        }
+    },
+    {
+        "name": "get_calendar_events",
+        "description": "Get user's calendar events for a date range.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "start_date": {
+                    "type": "string",
+                    "description": "Start date (ISO format)"
+                },
+                "end_date": {
+                    "type": "string",
+                    "description": "End date (ISO format)"
+                }
+            },
+            "required": ["start_date", "end_date"]
+        }
+    },
+    {
+        "name": "create_task",
+        "description": "Create a new task for the user. Links to project if relevant.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "title": {
+                    "type": "string",
+                    "description": "Task title"
+                },
+                "description": {
+                    "type": "string",
+                    "description": "Task description (optional)"
+                },
+                "due_date": {
+                    "type": "string",
+                    "description": "Due date (ISO format, optional)"
+                },
+                "priority": {
+                    "type": "string",
+                    "enum": ["low", "medium", "high", "urgent"],
+                    "description": "Task priority (default: medium)"
+                },
+                "project_id": {
+                    "type": "string",
+                    "description": "Link to project UUID (optional)"
+                }
+            },
+            "required": ["title"]
+        }
+    },
+    {
+        "name": "send_email_draft",
+        "description": "IMPORTANT: This only DRAFTS an email - it does NOT send it! Shows the draft to user for confirmation. User must explicitly approve before sending.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "to": {
+                    "type": "string",
+                    "description": "Recipient email address"
+                },
+                "subject": {
+                    "type": "string",
+                    "description": "Email subject"
+                },
+                "body": {
+                    "type": "string",
+                    "description": "Email body"
+                }
+            },
+            "required": ["to", "subject", "body"]
+        }
+    }
+]
+
+
 class ConversationalAgent:
     """Context-aware AI agent with tool use capabilities."""
 
     def __init__(self):
-        self.client = client
+        # Async client so a multi-second Claude call doesn't block other chats on the worker
+        self.client = llm_provider.async_anthropic_client
         self.model = "claude-sonnet-4-20250514"
+        self._token_costs = MODEL_TOKEN_COSTS[self.model]
+        self._context_cache: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._response_cache = SemanticResponseCache()
+        self._gmail_clients: Dict[str, Tuple[float, Any, asyncio.Lock]] = {}
+        # Per-(user, conversation) turn bookkeeping for merging rapid follow-ups (see chat())
+        self._in_flight: Dict[Tuple[str, Optional[str]], asyncio.Future] = {}
+        self._next_turn: Dict[Tuple[str, Optional[str]], Dict[str, Any]] = {}
 
     async def chat(
         self,
         user_id: str,
         message: str,
-        conversation_history: Optional[List[Dict]] = None
+        conversation_history: Optional[List[Dict]] = None,
+        conversation_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Process user message and return agent response with actions.
 
+        Messages sent to a conversation while one of its turns is still
+        running are merged: they wait for that turn, then go to Claude
+        together as one follow-up turn whose result every merged caller
+        receives (marked metadata.merged_follow_up for all but the first).
+
         Args:
             user_id: User UUID
             message: User's message/request
             conversation_history: Previous messages in conversation
+            conversation_id: Conversation the message belongs to; turns are
+                only merged within the same conversation
 
         Returns:
             Dict with response, tool calls, and suggested actions
         """
+        rejection = _reject_message(message)
+        if rejection is not None:
+            return self._direct_result(rejection)
+
+        turn_key = (user_id, conversation_id)
+        batch = self._next_turn.get(turn_key)
+        if batch is not None:
+            # A follow-up turn is already queued - ride along with it
+            batch["messages"].append(message)
+            result = await asyncio.shield(batch["future"])
+            return {**result, "metadata": {**result.get("metadata", {}), "merged_follow_up": True}}
+
+        in_flight = self._in_flight.get(turn_key)
+        if in_flight is None:
+            return await self._run_turn(turn_key, message, conversation_history)
+
+        batch = {
+            "messages": [message],
+            "history": conversation_history,
+            "future": asyncio.get_running_loop().create_future()
+        }
+        self._next_turn[turn_key] = batch
+        result = None
+        error: Optional[BaseException] = None
         try:
-            # Build conversation messages
-            messages = conversation_history or []
-            messages.append({"role": "user", "content": message})
+            try:
+                previous = await asyncio.shield(in_flight)
+            finally:
+                del self._next_turn[turn_key]
 
-            # Get user context for better responses
-            user_context = await self._get_user_context(user_id)
+            history = list(batch["history"] or [])
+            # History was loaded before the previous reply was saved; keep roles alternating
+            if previous and previous.get("message") and history and history[-1]["role"] == "user":
+                history.append({"role": "assistant", "content": previous["message"]})
 
-            # Enhanced system prompt with user context
-            system_prompt = f"""{AGENT_SYSTEM_PROMPT}
-
-## Current User Context
+            result = await self._run_turn(turn_key, "\n\n".join(batch["messages"]), history)
+            return result
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            # Riders are waiting on this future - it must resolve however the turn ends
+            future = batch["future"]
+            if not future.done():
+                if error is None:
+                    future.set_result(result)
+                elif len(batch["messages"]) > 1:
+                    future.set_exception(
+                        error if isinstance(error, Exception) else RuntimeError("Merged turn was cancelled")
+                    )
+                else:
+                    future.cancel()
+
+    def _direct_result(self, message: str) -> Dict[str, Any]:
+        """Result for a reply produced without calling Claude."""
+        result = self._new_result()
+        result["message"] = message
+        result["metadata"] = {
+            "model": None,
+            "tokens": {"input": 0, "output": 0, "total": 0},
+            "cost_usd": 0.0
+        }
+        return result
 
-**Active Projects ({len(user_context['projects'])}):**
-{self._format_projects(user_context['projects'])}
+    async def _run_turn(
+        self,
+        turn_key: Tuple[str, Optional[str]],
+        message: str,
+        conversation_history: Optional[List[Dict]]
+    ) -> Dict[str, Any]:
+        """Run one turn, registering it as the conversation's in-flight turn."""
+        done = asyncio.get_running_loop().create_future()
+        self._in_flight[turn_key] = done
+        result = None
+        try:
+            result = await self._chat_turn(turn_key[0], message, conversation_history)
+            return result
+        finally:
+            if self._in_flight.get(turn_key) is done:
+                del self._in_flight[turn_key]
+            done.set_result(result)
 
-**Pending Tasks ({len(user_context['tasks'])}):**
-{self._format_tasks(user_context['tasks'])}
+    async def _chat_turn(
+        self,
+        user_id: str,
+        message: str,
+        conversation_history: Optional[List[Dict]] = None
+    ) -> Dict[str, Any]:
+        """Build context, call Claude (and tools), and return the result dict."""
+        try:
+            # Build conversation messages, keeping only as much history as fits the budget
+            messages = _trim_history(conversation_history or [])
+            messages.append({"role": "user", "content": message})
 
-**Today's Calendar:**
-{self._format_calendar(user_context['calendar_events'])}
+            # Get user context for better responses
+            user_context = await self._get_user_context(user_id)
 
-**User Timezone:** {user_context.get('timezone', 'UTC')}
-**Current Time:** {datetime.now().isoformat()}
+            # Only standalone questions are cacheable - follow-ups depend on history
+            cache_lookup = None
+            if len(messages) == 1:
+                cache_lookup = await self._response_cache_lookup(user_id, message, user_context)
+                if cache_lookup and cache_lookup[0] is not None:
+                    return cache_lookup[0]
 
-Use this context to provide relevant, personalized responses!
-"""
+            system_prompt = self._build_system_prompt(user_context)
 
             # Call Claude with tools
-            response = self.client.messages.create(
+            response = await self._complete_turn(
                 model=self.model,
                 max_tokens=4000,
                 system=system_prompt,
@@ -180,68 +552,35 @@ Use this context to provide relevant, personalized responses!
                 tools=self._get_tool_definitions()
             )
 
-            # Process response
-            result = {
-                "message": "",
-                "tool_calls": [],
-                "suggested_actions": [],
-                "pending_confirmations": [],
-                "thinking": "",
-                "metadata": {}
-            }
+            result = self._new_result()
 
             # Handle tool use
             if response.stop_reason == "tool_use":
                 # Claude wants to use tools
-                tool_results = []
-
-                for block in response.content:
-                    if block.type == "text":
-                        result["thinking"] = block.text
-
-                    elif block.type == "tool_use":
-                        # Execute tool
-                        tool_result = await self._execute_tool(
-                            user_id,
-                            block.name,
-                            block.input
-                        )
-
-                        tool_results.append({
-                            "type": "tool_result",
-                            "tool_use_id": block.id,
-                            "content": json.dumps(tool_result)
-                        })
-
-                        result["tool_calls"].append({
-                            "tool": block.name,
-                            "input": block.input,
-                            "result": tool_result
-                        })
-
-                        # If this is an email draft, add to pending confirmations
-                        if block.name == "send_email_draft":
-                            result["pending_confirmations"].append({
-                                "action_type": "send_email",
-                                "action_data": block.input
-                            })
-
-                # Continue conversation with tool results
-                messages.append({"role": "assistant", "content": response.content})
-                messages.append({"role": "user", "content": tool_results})
-
-                # Get final response
-                final_response = self.client.messages.create(
-                    model=self.model,
-                    max_tokens=4000,
-                    system=system_prompt,
-                    messages=messages
-                )
-
-                # Extract final message
-                for block in final_response.content:
-                    if block.type == "text":
-                        result["message"] = block.text
+                tool_results = await self._run_tools(user_id, response.content, result)
+
+                # Empty read-only lookups have a fixed answer - skip the second call
+                direct_reply = _direct_reply(result["tool_calls"])
+                if direct_reply is not None:
+                    result["message"] = direct_reply
+                else:
+                    # Continue conversation with tool results
+                    messages.append({"role": "assistant", "content": response.content})
+                    messages.append({"role": "user", "content": tool_results})
+
+                    # Get final response
+                    final_response = await self._complete_turn(
+                        model=self.model,
+                        max_tokens=4000,
+                        system=system_prompt,
+                        messages=messages,
+                        tools=self._get_tool_definitions()
+                    )
+
+                    # Extract final message
+                    for block in final_response.content:
+                        if block.type == "text":
+                            result["message"] = block.text
 
             else:
                 # No tool use, just return text
@@ -249,27 +588,11 @@ Use this context to provide relevant, personalized responses!
                     if block.type == "text":
                         result["message"] = block.text
 
-            # Add usage metadata
-            result["metadata"] = {
-                "model": self.model,
-                "tokens": {
-                    "input": response.usage.input_tokens,
-                    "output": response.usage.output_tokens,
-                    "total": response.usage.input_tokens + response.usage.output_tokens
-                },
-                "cost_usd": self._calculate_cost(response.usage.input_tokens, response.usage.output_tokens)
-            }
+            self._finish(user_id, message, response, result)
 
-            # Log agent interaction
-            db.log_agent_action(
-                user_id=user_id,
-                action_type="conversational_chat",
-                input_data={"message": message},
-                output_data=result,
-                model_used=self.model,
-                tokens_used=response.usage.input_tokens + response.usage.output_tokens,
-                cost_usd=result["metadata"]["cost_usd"]
-            )
+            # Answers that ran tools or await confirmation have side effects; never replay them
+            if cache_lookup and not result["tool_calls"] and not result["pending_confirmations"]:
+                self._response_cache.set(user_id, *cache_lookup[1], result)
 
             return result
 
@@ -280,227 +603,433 @@ Use this context to provide relevant, personalized responses!
                 "error": str(e)
             }
 
-    async def _get_user_context(self, user_id: str) -> Dict:
-        """Get user's current context for better agent responses."""
+    async def chat_stream(
+        self,
+        user_id: str,
+        message: str,
+        conversation_history: Optional[List[Dict]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of chat() for time-to-first-token.
+
+        Yields {"message_delta": text} as Claude generates, then one final
+        {"done": True, ...} dict shaped like chat()'s return value, whose
+        message is everything that was streamed. A turn that goes
+        STREAM_CHUNK_TIMEOUT_SECONDS without an event is aborted instead of
+        hanging until the HTTP timeout.
+        """
+        rejection = _reject_message(message)
+        if rejection is not None:
+            yield {"done": True, **self._direct_result(rejection)}
+            return
+
         try:
-            # Get active projects
-            projects = supabase.table("para_items")\
-                .select("*")\
-                .eq("user_id", user_id)\
-                .eq("para_type", "project")\
-                .eq("status", "active")\
-                .limit(10)\
-                .execute().data or []
-
-            # Get pending tasks
-            tasks = supabase.table("tasks")\
-                .select("*")\
-                .eq("user_id", user_id)\
-                .in_("status", ["pending", "in_progress"])\
-                .order("due_date")\
-                .limit(20)\
-                .execute().data or []
-
-            # Get today's calendar events
-            today_start = datetime.now().replace(hour=0, minute=0, second=0).isoformat()
-            today_end = datetime.now().replace(hour=23, minute=59, second=59).isoformat()
-
-            calendar_events = supabase.table("calendar_events")\
-                .select("*")\
-                .eq("user_id", user_id)\
-                .gte("start_time", today_start)\
-                .lte("start_time", today_end)\
-                .execute().data or []
-
-            # Get user profile
-            profile = supabase.table("user_profiles")\
-                .select("*")\
-                .eq("id", user_id)\
-                .single()\
-                .execute().data or {}
+            messages = _trim_history(conversation_history or [])
+            messages.append({"role": "user", "content": message})
 
-            return {
-                "projects": projects,
-                "tasks": tasks,
-                "calendar_events": calendar_events,
-                "timezone": profile.get("timezone", "UTC"),
-                "preferences": profile.get("para_preferences", {})
-            }
+            user_context = await self._get_user_context(user_id)
+            system_prompt = self._build_system_prompt(user_context)
+            result = self._new_result()
+
+            # Everything sent to the client, so the saved reply matches what was shown
+            streamed: List[str] = []
+            response = None
+            async for item in self._stream_turn(
+                model=self.model,
+                max_tokens=4000,
+                system=system_prompt,
+                messages=messages,
+                tools=self._get_tool_definitions()
+            ):
+                if isinstance(item, str):
+                    streamed.append(item)
+                    yield {"message_delta": item}
+                else:
+                    response = item
+
+            if response.stop_reason == "tool_use":
+                tool_results = await self._run_tools(user_id, response.content, result)
+
+                # Text from before the tool call is already on screen; separate the answer from it
+                separator = "\n\n" if streamed else ""
+                direct_reply = _direct_reply(result["tool_calls"])
+                if direct_reply is not None:
+                    streamed.append(separator + direct_reply)
+                    yield {"message_delta": separator + direct_reply}
+                else:
+                    messages.append({"role": "assistant", "content": response.content})
+                    messages.append({"role": "user", "content": tool_results})
+
+                    async for item in self._stream_turn(
+                        model=self.model,
+                        max_tokens=4000,
+                        system=system_prompt,
+                        messages=messages,
+                        tools=self._get_tool_definitions()
+                    ):
+                        if isinstance(item, str):
+                            item, separator = separator + item, ""
+                            streamed.append(item)
+                            yield {"message_delta": item}
+
+            result["message"] = "".join(streamed)
+
+            self._finish(user_id, message, response, result)
+            yield {"done": True, **result}
 
         except Exception as e:
-            logger.error(f"Error getting user context: {str(e)}")
-            return {
-                "projects": [],
-                "tasks": [],
-                "calendar_events": [],
-                "timezone": "UTC",
-                "preferences": {}
+            logger.error(f"Agent chat stream error: {str(e)}", exc_info=True)
+            yield {
+                "done": True,
+                "message": f"I encountered an error: {str(e)}. Please try rephrasing your request.",
+                "error": str(e)
             }
 
+    async def _stream_turn(self, **kwargs) -> AsyncIterator[Any]:
+        """Yield text deltas for one Claude turn, then the final Message."""
+        async with self.client.messages.stream(**kwargs) as stream:
+            events = stream.__aiter__()
+            while True:
+                try:
+                    event = await asyncio.wait_for(events.__anext__(), STREAM_CHUNK_TIMEOUT_SECONDS)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"No response from Claude for {STREAM_CHUNK_TIMEOUT_SECONDS:.0f}s")
+
+                if event.type == "content_block_delta" and event.delta.type == "text_delta":
+                    yield event.delta.text
+
+            yield await stream.get_final_message()
+
+    async def _complete_turn(self, **kwargs) -> Any:
+        """One non-streamed Claude turn, with the same stall timeout as chat_stream()."""
+        response = None
+        async for item in self._stream_turn(**kwargs):
+            if not isinstance(item, str):
+                response = item
+        return response
+
+    def _build_system_prompt(self, user_context: Dict) -> List[Dict]:
+        """System blocks: the static instructions, cached, then the per-turn user context.
+
+        Only the first block carries cache_control, so the changing context
+        never invalidates the cached prefix (tools + instructions).
+        """
+        user_context_text = f"""{user_context['summary']}
+**Current Time:** {datetime.now().isoformat()}
+
+Use this context to provide relevant, personalized responses!
+"""
+        return [
+            {"type": "text", "text": AGENT_SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": user_context_text}
+        ]
+
+    @staticmethod
+    def _new_result() -> Dict[str, Any]:
+        return {
+            "message": "",
+            "tool_calls": [],
+            "suggested_actions": [],
+            "pending_confirmations": [],
+            "thinking": "",
+            "metadata": {}
+        }
+
+    async def _run_tools(self, user_id: str, content: List[Any], result: Dict) -> List[Dict]:
+        """Execute the tool_use blocks of a response and record them on result.
+
+        Independent tool calls from one turn run concurrently, so tool latency
+        is the slowest call rather than the sum of all of them.
+        """
+        tool_blocks = []
+        for block in content:
+            if block.type == "text":
+                result["thinking"] = block.text
+            elif block.type == "tool_use":
+                tool_blocks.append(block)
+
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_TOOL_CALLS)
+
+        async def run(block) -> Dict:
+            async with semaphore:
+                return await self._execute_tool(user_id, block.name, block.input)
+
+        outputs = await asyncio.gather(*(run(block) for block in tool_blocks), return_exceptions=True)
+
+        tool_results = []
+        for block, tool_result in zip(tool_blocks, outputs):
+            if isinstance(tool_result, Exception):
+                tool_result = {"error": str(tool_result)}
+
+            tool_results.append({
+                "type": "tool_result",
+                "tool_use_id": block.id,
+                "content": orjson.dumps(tool_result).decode()
+            })
+
+            result["tool_calls"].append({
+                "tool": block.name,
+                "input": block.input,
+                "result": tool_result
+            })
+
+            # If this is an email draft, add to pending confirmations
+            if block.name == "send_email_draft":
+                result["pending_confirmations"].append({
+                    "action_type": "send_email",
+                    "action_data": block.input
+                })
+
+        return tool_results
+
+    def _finish(self, user_id: str, message: str, response: Any, result: Dict) -> None:
+        """Attach usage metadata and log the interaction."""
+        result["metadata"] = {
+            "model": self.model,
+            "tokens": {
+                "input": response.usage.input_tokens,
+                "output": response.usage.output_tokens,
+                "total": response.usage.input_tokens + response.usage.output_tokens
+            },
+            "cost_usd": self._calculate_cost(response.usage)
+        }
+
+        # Log a compact summary off the request path; full payloads (emails,
+        # tool output) only go to the debug log
+        summary = {
+            "message_len": len(result["message"]),
+            "tool_names": [call["tool"] for call in result["tool_calls"]],
+            "pending_confirmations": len(result["pending_confirmations"]),
+            "tokens": result["metadata"]["tokens"]
+        }
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Agent chat result for {user_id}: {orjson.dumps(result, default=str).decode()}")
+
+        _log_in_background(
+            user_id=user_id,
+            action_type="conversational_chat",
+            input_data={"message": message},
+            output_data=summary,
+            model_used=self.model,
+            tokens_used=response.usage.input_tokens + response.usage.output_tokens,
+            cost_usd=result["metadata"]["cost_usd"]
+        )
+
+    async def _response_cache_lookup(
+        self,
+        user_id: str,
+        message: str,
+        user_context: Dict
+    ) -> Optional[Tuple[Optional[Dict], Tuple[np.ndarray, str, frozenset]]]:
+        """Check the semantic cache for a paraphrase of this message.
+
+        Returns (cached result or None, cache key parts for storing the fresh
+        answer), or None when embeddings are unavailable.
+        """
+        from agents.embeddings import generate_embedding
+
+        vector = await asyncio.to_thread(generate_embedding, message)
+        if vector is None:
+            return None
+
+        key = (vector, user_context["fingerprint"], _critical_entities(message))
+
+        cached = self._response_cache.get(user_id, *key)
+        if cached is None:
+            return None, key
+
+        hit = dict(cached)
+        hit["metadata"] = {
+            **cached["metadata"],
+            "cache_hit": True,
+            "tokens": {"input": 0, "output": 0, "total": 0},
+            "cost_usd": 0.0
+        }
+        return hit, key
+
+    async def _get_user_context(self, user_id: str) -> Dict:
+        """Get user's current context for better agent responses.
+
+        The four reads are independent, so they run concurrently; a failed
+        read falls back to its empty default instead of sinking the others.
+        """
+        cached = self._context_cache.get(user_id)
+        if cached is not None and time.monotonic() - cached[0] < CONTEXT_CACHE_TTL_SECONDS:
+            self._context_cache.move_to_end(user_id)
+            return cached[1]
+
+        now = datetime.now(timezone.utc)
+        projects, tasks, calendar_events, profile = await asyncio.gather(
+            self._fetch_projects(user_id),
+            self._fetch_tasks(user_id),
+            self._fetch_calendar(user_id, now),
+            self._fetch_profile(user_id),
+            return_exceptions=True
+        )
+
+        for name, value in (("projects", projects), ("tasks", tasks),
+                            ("calendar", calendar_events), ("profile", profile)):
+            if isinstance(value, Exception):
+                logger.error(f"Error getting user context ({name}): {str(value)}")
+
+        if isinstance(projects, Exception):
+            projects = []
+        if isinstance(tasks, Exception):
+            tasks = []
+        if isinstance(calendar_events, Exception):
+            calendar_events = []
+        if isinstance(profile, Exception):
+            profile = {}
+
+        user_timezone = profile.get("timezone") or "UTC"
+        day_start, day_end = _local_day_bounds(now, user_timezone)
+        calendar_events = [
+            event for event in calendar_events
+            if day_start <= _parse_timestamp(event["start_time"]) < day_end
+        ]
+
+        context = {
+            "projects": projects,
+            "tasks": tasks,
+            "calendar_events": calendar_events,
+            "timezone": user_timezone,
+            "preferences": profile.get("para_preferences", {})
+        }
+        # Formatted once per fetch; cached turns reuse the text and its hash
+        context["summary"], context["fingerprint"] = self._format_context(context)
+
+        self._context_cache[user_id] = (time.monotonic(), context)
+        self._context_cache.move_to_end(user_id)
+        if len(self._context_cache) > CONTEXT_CACHE_SIZE:
+            self._context_cache.popitem(last=False)
+
+        return context
+
+    def invalidate_user_context(self, user_id: str) -> None:
+        """Drop the cached context after a write to the user's data."""
+        self._context_cache.pop(user_id, None)
+
+    async def _fetch_projects(self, user_id: str) -> List[Dict]:
+        """Get active projects."""
+        rows = await fetch_rows(
+            f"SELECT {PROJECT_CONTEXT_COLUMNS} FROM para_items"
+            " WHERE user_id = $1 AND para_type = 'project' AND status = 'active' LIMIT 10",
+            user_id
+        )
+        if rows is not None:
+            return rows
+
+        response = await execute_async(
+            supabase.table("para_items")
+            .select(PROJECT_CONTEXT_COLUMNS)
+            .eq("user_id", user_id)
+            .eq("para_type", "project")
+            .eq("status", "active")
+            .limit(10)
+        )
+        return response.data or []
+
+    async def _fetch_tasks(self, user_id: str) -> List[Dict]:
+        """Get pending tasks."""
+        rows = await fetch_rows(
+            f"SELECT {TASK_CONTEXT_COLUMNS} FROM tasks"
+            " WHERE user_id = $1 AND status IN ('pending', 'in_progress') ORDER BY due_date LIMIT 20",
+            user_id
+        )
+        if rows is not None:
+            return rows
+
+        response = await execute_async(
+            supabase.table("tasks")
+            .select(TASK_CONTEXT_COLUMNS)
+            .eq("user_id", user_id)
+            .in_("status", ["pending", "in_progress"])
+            .order("due_date")
+            .limit(20)
+        )
+        return response.data or []
+
+    async def _fetch_calendar(self, user_id: str, now: datetime) -> List[Dict]:
+        """Get calendar events within a day either side of now (UTC).
+
+        The user's timezone isn't known until the profile read returns, and
+        that read runs concurrently, so this fetches a window that contains
+        "today" in every timezone; _get_user_context trims it to the local day.
+        """
+        rows = await fetch_rows(
+            f"SELECT {EVENT_CONTEXT_COLUMNS} FROM calendar_events"
+            " WHERE user_id = $1 AND start_time >= $2 AND start_time < $3",
+            user_id, now - timedelta(days=1), now + timedelta(days=1)
+        )
+        if rows is not None:
+            return rows
+
+        response = await execute_async(
+            supabase.table("calendar_events")
+            .select(EVENT_CONTEXT_COLUMNS)
+            .eq("user_id", user_id)
+            .gte("start_time", (now - timedelta(days=1)).isoformat())
+            .lt("start_time", (now + timedelta(days=1)).isoformat())
+        )
+        return response.data or []
+
+    async def _fetch_profile(self, user_id: str) -> Dict:
+        """Get user profile."""
+        return await get_user_profile(user_id)
+
+    def _format_context(self, user_context: Dict) -> Tuple[str, str]:
+        """Render the user-context section and a hash of it.
+
+        Rows are sorted into a canonical order, so the hash only changes when
+        what the model would see changes. The semantic response cache uses it
+        as the context fingerprint.
+        """
+        summary = f"""## Current User Context
+
+**Active Projects ({len(user_context['projects'])}):**
+{self._format_projects(user_context['projects'])}
+
+**Pending Tasks ({len(user_context['tasks'])}):**
+{self._format_tasks(user_context['tasks'])}
+
+**Today's Calendar:**
+{self._format_calendar(user_context['calendar_events'])}
+
+**User Timezone:** {user_context.get('timezone', 'UTC')}"""
+        return summary, hashlib.blake2b(summary.encode(), digest_size=16).hexdigest()
+
     def _format_projects(self, projects: List[Dict]) -> str:
-        """Format projects for context."""
+        """Format projects for context, soonest deadline first."""
         if not projects:
             return "No active projects"
 
-        lines = []
-        for p in projects[:5]:  # Top 5
-            due = p.get('due_date', 'No deadline')
-            lines.append(f"- {p['title']} (due: {due})")
-        return "\n".join(lines)
+        top = sorted(projects, key=_due_then_title)[:5]
+        return "\n".join(f"- {p['title']} (due: {p.get('due_date', 'No deadline')})" for p in top)
 
     def _format_tasks(self, tasks: List[Dict]) -> str:
-        """Format tasks for context."""
+        """Format tasks for context, soonest deadline first."""
         if not tasks:
             return "No pending tasks"
 
-        lines = []
-        for t in tasks[:10]:  # Top 10
-            due = t.get('due_date', 'No deadline')
-            priority = t.get('priority', 'medium')
-            lines.append(f"- {t['title']} (due: {due}, priority: {priority})")
-        return "\n".join(lines)
+        top = sorted(tasks, key=_due_then_title)[:10]
+        return "\n".join(
+            f"- {t['title']} (due: {t.get('due_date', 'No deadline')}, priority: {t.get('priority', 'medium')})"
+            for t in top
+        )
 
     def _format_calendar(self, events: List[Dict]) -> str:
         """Format calendar events for context."""
         if not events:
             return "No events scheduled today"
 
-        lines = []
-        for e in events:
-            start = e.get('start_time', '')
-            lines.append(f"- {start}: {e['title']}")
-        return "\n".join(lines)
+        ordered = sorted(events, key=lambda e: (e.get('start_time') or '', e['title']))
+        return "\n".join(f"- {e.get('start_time', '')}: {e['title']}" for e in ordered)
 
     def _get_tool_definitions(self) -> List[Dict]:
         """Define tools available to the agent."""
-        return [
-            {
-                "name": "search_para_items",
-                "description": "Search user's PARA items (projects, areas, resources, archives) using semantic search. Use this to find relevant projects, reference materials, or past work.",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "query": {
-                            "type": "string",
-                            "description": "Search query (e.g., 'Q4 budget', 'website redesign')"
-                        },
-                        "para_type": {
-                            "type": "string",
-                            "enum": ["project", "area", "resource", "archive"],
-                            "description": "Filter by PARA type (optional)"
-                        },
-                        "limit": {
-                            "type": "integer",
-                            "description": "Max results (default: 10)"
-                        }
-                    },
-                    "required": ["query"]
-                }
-            },
-            {
-                "name": "search_emails",
-                "description": "Search user's Gmail inbox. Use Gmail query syntax for filters.",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "query": {
-                            "type": "string",
-                            "description": "Gmail search query (e.g., 'from:alice subject:budget', 'is:unread', 'has:attachment')"
-                        },
-                        "max_results": {
-                            "type": "integer",
-                            "description": "Max emails to return (default: 20)"
-                        }
-                    },
-                    "required": ["query"]
-                }
-            },
-            {
-                "name": "search_contacts",
-                "description": "Find a person's email address from user's contacts. Returns all matches if multiple people have same name.",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "name": {
-                            "type": "string",
-                            "description": "Person's name to search for"
-                        }
-                    },
-                    "required": ["name"]
-                }
-            },
-            {
-                "name": "get_calendar_events",
-                "description": "Get user's calendar events for a date range.",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "start_date": {
-                            "type": "string",
-                            "description": "Start date (ISO format)"
-                        },
-                        "end_date": {
-                            "type": "string",
-                            "description": "End date (ISO format)"
-                        }
-                    },
-                    "required": ["start_date", "end_date"]
-                }
-            },
-            {
-                "name": "create_task",
-                "description": "Create a new task for the user. Links to project if relevant.",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "title": {
-                            "type": "string",
-                            "description": "Task title"
-                        },
-                        "description": {
-                            "type": "string",
-                            "description": "Task description (optional)"
-                        },
-                        "due_date": {
-                            "type": "string",
-                            "description": "Due date (ISO format, optional)"
-                        },
-                        "priority": {
-                            "type": "string",
-                            "enum": ["low", "medium", "high", "urgent"],
-                            "description": "Task priority (default: medium)"
-                        },
-                        "project_id": {
-                            "type": "string",
-                            "description": "Link to project UUID (optional)"
-                        }
-                    },
-                    "required": ["title"]
-                }
-            },
-            {
-                "name": "send_email_draft",
-                "description": "IMPORTANT: This only DRAFTS an email - it does NOT send it! Shows the draft to user for confirmation. User must explicitly approve before sending.",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "to": {
-                            "type": "string",
-                            "description": "Recipient email address"
-                        },
-                        "subject": {
-                            "type": "string",
-                            "description": "Email subject"
-                        },
-                        "body": {
-                            "type": "string",
-                            "description": "Email body"
-                        }
-                    },
-                    "required": ["to", "subject", "body"]
-                }
-            }
-        ]
+        return TOOL_DEFINITIONS
 
     async def _execute_tool(self, user_id: str, tool_name: str, tool_input: Dict) -> Dict:
         """Execute a tool and return results."""
@@ -553,29 +1082,12 @@ Use this context to provide relevant, personalized responses!
 
     async def _tool_search_emails(self, user_id: str, input: Dict) -> Dict:
         """Search emails."""
-        # Get user's Gmail integration
-        integration = supabase.table("mcp_integrations")\
-            .select("*")\
-            .eq("user_id", user_id)\
-            .eq("integration_type", "google_calendar")\
-            .eq("is_enabled", True)\
-            .execute().data
-
-        if not integration:
-            return {"error": "Gmail not connected. Please connect Google account first."}
-
-        from mcp.gmail_mcp import GmailMCP
-        from mcp.sync_service import decrypt_token
-
-        gmail = GmailMCP({
-            'access_token': decrypt_token(integration[0]['oauth_token_encrypted']),
-            'refresh_token': decrypt_token(integration[0]['refresh_token_encrypted']) if integration[0].get('refresh_token_encrypted') else None
-        })
-
         query = input['query']
         max_results = input.get('max_results', 20)
 
-        emails = gmail.search_emails(query, max_results=max_results)
+        emails = await self._search_gmail(user_id, query, max_results)
+        if emails is None:
+            return {"error": "Gmail not connected. Please connect Google account first."}
 
         # Return summarized results (not full email bodies)
         return {
@@ -597,26 +1109,10 @@ Use this context to provide relevant, personalized responses!
         # For now, search emails to find addresses
         # TODO: Integrate with Google Contacts API
 
-        integration = supabase.table("mcp_integrations")\
-            .select("*")\
-            .eq("user_id", user_id)\
-            .eq("integration_type", "google_calendar")\
-            .eq("is_enabled", True)\
-            .execute().data
-
-        if not integration:
-            return {"error": "Google not connected"}
-
-        from mcp.gmail_mcp import GmailMCP
-        from mcp.sync_service import decrypt_token
-
-        gmail = GmailMCP({
-            'access_token': decrypt_token(integration[0]['oauth_token_encrypted']),
-            'refresh_token': decrypt_token(integration[0]['refresh_token_encrypted']) if integration[0].get('refresh_token_encrypted') else None
-        })
-
         # Search recent emails from this person
-        emails = gmail.search_emails(f"from:{name}", max_results=5)
+        emails = await self._search_gmail(user_id, f"from:{name}", 5)
+        if emails is None:
+            return {"error": "Google not connected"}
 
         if emails:
             # Extract unique email addresses
@@ -634,17 +1130,74 @@ Use this context to provide relevant, personalized responses!
                 "message": f"No emails found from '{name}'. Please provide email address manually."
             }
 
+    async def _get_gmail(self, user_id: str) -> Optional[Tuple[Any, asyncio.Lock]]:
+        """Return the user's cached GmailMCP client and its lock, building it if needed.
+
+        Building the client costs an integration lookup, two token decrypts and
+        a Gmail discovery request, so it is reused for GMAIL_CLIENT_TTL_SECONDS.
+        Returns None if Google isn't connected.
+        """
+        cached = self._gmail_clients.get(user_id)
+        if cached is not None:
+            created_at, gmail, lock = cached
+            credentials = gmail.credentials
+            usable = not (credentials.expired and not credentials.refresh_token)
+            if usable and time.monotonic() - created_at < GMAIL_CLIENT_TTL_SECONDS:
+                return gmail, lock
+            del self._gmail_clients[user_id]
+
+        integration = (await execute_async(
+            supabase.table("mcp_integrations")
+            .select("oauth_token_encrypted, refresh_token_encrypted")
+            .eq("user_id", user_id)
+            .eq("integration_type", "google_calendar")
+            .eq("is_enabled", True)
+        )).data
+
+        if not integration:
+            return None
+
+        from mcp.gmail_mcp import GmailMCP
+        from mcp.sync_service import decrypt_token
+
+        encrypted_refresh = integration[0].get('refresh_token_encrypted')
+        access_token, refresh_token = await asyncio.gather(
+            asyncio.to_thread(decrypt_token, integration[0]['oauth_token_encrypted']),
+            asyncio.to_thread(decrypt_token, encrypted_refresh) if encrypted_refresh else asyncio.sleep(0)
+        )
+
+        gmail = await asyncio.to_thread(GmailMCP, {
+            'access_token': access_token,
+            'refresh_token': refresh_token
+        })
+        lock = asyncio.Lock()
+        self._gmail_clients[user_id] = (time.monotonic(), gmail, lock)
+        return gmail, lock
+
+    async def _search_gmail(self, user_id: str, query: str, max_results: int) -> Optional[List[Dict]]:
+        """Search the user's Gmail, or None if Google isn't connected."""
+        client = await self._get_gmail(user_id)
+        if client is None:
+            return None
+
+        gmail, lock = client
+        # The underlying httplib2 transport isn't thread-safe, so parallel tool
+        # calls take turns on a shared client
+        async with lock:
+            return await asyncio.to_thread(gmail.search_emails, query, max_results=max_results)
+
     async def _tool_get_calendar(self, user_id: str, input: Dict) -> Dict:
         """Get calendar events."""
         start = input['start_date']
         end = input['end_date']
 
-        events = supabase.table("calendar_events")\
-            .select("*")\
-            .eq("user_id", user_id)\
-            .gte("start_time", start)\
-            .lte("start_time", end)\
-            .execute().data or []
+        events = (await execute_async(
+            supabase.table("calendar_events")
+            .select(EVENT_TOOL_COLUMNS)
+            .eq("user_id", user_id)
+            .gte("start_time", start)
+            .lte("start_time", end)
+        )).data or []
 
         return {
             "start_date": start,
@@ -669,6 +1222,7 @@ Use this context to provide relevant, personalized responses!
             task_data['para_item_id'] = input['project_id']
 
         task = db.insert_record("tasks", task_data)
+        self.invalidate_user_context(user_id)
 
         return {
             "success": True,
@@ -686,12 +1240,16 @@ Use this context to provide relevant, personalized responses!
             "message": "Email draft created. User must approve before sending."
         }
 
-    def _calculate_cost(self, input_tokens: int, output_tokens: int) -> float:
-        """Calculate cost for Claude Sonnet 4."""
-        # Sonnet 4: $3/M input, $15/M output
-        input_cost = (input_tokens / 1_000_000) * 3.0
-        output_cost = (output_tokens / 1_000_000) * 15.0
-        return round(input_cost + output_cost, 6)
+    def _calculate_cost(self, usage: Any) -> float:
+        """Calculate cost of a call from its usage, pricing prompt-cache tokens separately."""
+        input_rate, output_rate, cache_write_rate, cache_read_rate = self._token_costs
+        return round(
+            usage.input_tokens * input_rate
+            + usage.output_tokens * output_rate
+            + (getattr(usage, "cache_creation_input_tokens", None) or 0) * cache_write_rate
+            + (getattr(usage, "cache_read_input_tokens", None) or 0) * cache_read_rate,
+            6
+        )
 
 
 # Global instance
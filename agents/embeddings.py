@@ -4,76 +4,556 @@ Since Anthropic doesn't provide embedding endpoints, we use OpenAI's
 text-embedding-3-small model which provides excellent quality at low cost.
 """
 
-from typing import List, Dict, Optional
+from collections import OrderedDict
+from typing import Iterator, List, Dict, Optional, Tuple, Union
 from config import settings
-from database import supabase
+from database import supabase, execute_async
+import asyncio
+import hashlib
+import time
+
+import numpy as np
+import orjson
+import random
 
 
 # Note: OpenAI is optional - add to requirements.txt if using embeddings
 try:
-    from openai import OpenAI
+    from openai import OpenAI, AsyncOpenAI
     OPENAI_AVAILABLE = True
     openai_client = OpenAI(api_key=settings.OPENAI_API_KEY) if hasattr(settings, 'OPENAI_API_KEY') else None
+    async_openai_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY) if hasattr(settings, 'OPENAI_API_KEY') else None
 except ImportError:
     OPENAI_AVAILABLE = False
     openai_client = None
+    async_openai_client = None
+
+# Optional SIMD kernels (AVX2/AVX-512/NEON/SVE) for in-process similarity
+try:
+    import simsimd
+    SIMSIMD_AVAILABLE = True
+except ImportError:
+    SIMSIMD_AVAILABLE = False
+
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_BATCH_SIZE = 256
+# The API rejects inputs over 8191 tokens and requests over 300K tokens in total;
+# at ~4 characters per token these character caps keep batches under both
+MAX_EMBEDDING_CHARS = 30000
+MAX_BATCH_CHARS = 1_000_000
+# Concurrent embedding requests in flight, and the random delay spread before
+# each so a burst doesn't hit the rate limiter at the same instant
+MAX_CONCURRENT_EMBEDDING_REQUESTS = 5
+EMBEDDING_REQUEST_JITTER_SECONDS = 0.05
+
+# Rows per bulk embedding write; each row carries a ~20 KB vector in JSON
+EMBEDDING_WRITE_BATCH_SIZE = 500
+
+# Rows fetched per page when backfilling, so memory stays flat for large accounts
+EMBEDDING_BACKFILL_PAGE_SIZE = 500
+
+
+# Two-tier cache for embeddings of identical text: an in-process LRU in front
+# of the persistent embedding_cache table (see schema_performance.sql)
+EMBEDDING_CACHE_SIZE = 4096
+_embedding_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+
+def _embedding_key(text: str) -> str:
+    return hashlib.sha256(text.strip().lower()[:MAX_EMBEDDING_CHARS].encode()).hexdigest()
+
+
+def _cache_get(key: str) -> Optional[np.ndarray]:
+    embedding = _embedding_cache.get(key)
+    if embedding is not None:
+        _embedding_cache.move_to_end(key)
+    return embedding
+
+
+def _cache_set(key: str, embedding: np.ndarray) -> None:
+    _embedding_cache[key] = embedding
+    _embedding_cache.move_to_end(key)
+    if len(_embedding_cache) > EMBEDDING_CACHE_SIZE:
+        _embedding_cache.popitem(last=False)
+
+
+def _persistent_cache_get(key: str) -> Optional[np.ndarray]:
+    try:
+        result = supabase.table("embedding_cache")\
+            .select("embedding")\
+            .eq("content_hash", key)\
+            .limit(1)\
+            .execute()
+    except Exception as e:
+        print(f"Error reading embedding cache: {e}")
+        return None
+
+    if not result.data:
+        return None
+    embedding = result.data[0]["embedding"]
+    # PostgREST returns pgvector values in their text form, "[0.1,0.2,...]"
+    return _unit_vector(orjson.loads(embedding) if isinstance(embedding, str) else embedding)
+
+
+def _persistent_cache_set(key: str, embedding: np.ndarray) -> None:
+    try:
+        supabase.table("embedding_cache")\
+            .upsert({"content_hash": key, "embedding": embedding.tolist()})\
+            .execute()
+    except Exception as e:
+        print(f"Error writing embedding cache: {e}")
+
+
+# Semantic cache for similarity searches: a new query whose embedding is at
+# least SIMILAR_QUERY_THRESHOLD cosine-similar to a recent query by the same
+# user (same limit/threshold) reuses that query's results instead of the RPC
+# int8 codes plus the scale that maps them back to floats (vector ~= codes * scale)
+QuantizedVector = Tuple[np.ndarray, float]
+
+SIMILAR_QUERY_THRESHOLD = 0.97
+SIMILAR_QUERY_TTL_SECONDS = 120.0
+SIMILAR_QUERY_CACHE_SIZE = 256
+_similar_query_cache: "OrderedDict[Tuple[str, int, float], List[Tuple[float, QuantizedVector, List[Dict]]]]" = OrderedDict()
+_SIMILAR_QUERIES_PER_KEY = 32
+
+
+def _unit_vector(embedding: Union[List[float], np.ndarray]) -> np.ndarray:
+    """float32 vector scaled to unit length, so cosine similarity is a dot product."""
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def quantize_int8(vector: np.ndarray) -> QuantizedVector:
+    """Symmetric max-abs int8 quantization: 4x smaller than float32.
+
+    For unit 1536-dim embeddings the similarity error is around 1e-3, well
+    inside the margins of the cache thresholds that use it.
+    """
+    max_abs = float(np.abs(vector).max())
+    scale = max_abs / 127 if max_abs else 1.0
+    return np.clip(np.rint(vector / scale), -127, 127).astype(np.int8), scale
+
+
+def quantized_similarities(stored: List[QuantizedVector], vector: np.ndarray) -> np.ndarray:
+    """Cosine similarity of each stored int8 vector to a unit float32 vector.
+
+    With pre-normalized vectors cosine is a plain dot product; it runs on
+    int8 codes (SimSIMD's int8 kernels when installed, numpy otherwise) and
+    is rescaled afterwards.
+    """
+    codes = np.stack([entry[0] for entry in stored])
+    scales = np.fromiter((entry[1] for entry in stored), dtype=np.float32, count=len(stored))
+    return _int8_similarities(codes, scales, vector)
 
 
-def generate_embedding(text: str) -> Optional[List[float]]:
+def _int8_similarities(codes: np.ndarray, scales: np.ndarray, vector: np.ndarray) -> np.ndarray:
+    """quantized_similarities over an already stacked (N, dim) int8 matrix."""
+    query_codes, query_scale = quantize_int8(vector)
+
+    if SIMSIMD_AVAILABLE:
+        dots = np.asarray(simsimd.cdist(codes, query_codes[np.newaxis, :], metric="dot")).ravel()
+    else:
+        dots = codes.astype(np.int32) @ query_codes.astype(np.int32)
+    return dots * scales * query_scale
+
+
+def _similar_query_get(key: Tuple[str, int, float], vector: np.ndarray) -> Optional[List[Dict]]:
+    entries = _similar_query_cache.get(key)
+    if not entries:
+        return None
+
+    cutoff = time.monotonic() - SIMILAR_QUERY_TTL_SECONDS
+    entries[:] = [entry for entry in entries if entry[0] >= cutoff]
+    if not entries:
+        del _similar_query_cache[key]
+        return None
+
+    _similar_query_cache.move_to_end(key)
+    similarities = quantized_similarities([entry[1] for entry in entries], vector)
+    best = int(similarities.argmax())
+    return entries[best][2] if similarities[best] >= SIMILAR_QUERY_THRESHOLD else None
+
+
+def _similar_query_set(key: Tuple[str, int, float], vector: np.ndarray, results: List[Dict]) -> None:
+    entries = _similar_query_cache.setdefault(key, [])
+    entries.append((time.monotonic(), quantize_int8(vector), results))
+    del entries[:-_SIMILAR_QUERIES_PER_KEY]
+    _similar_query_cache.move_to_end(key)
+    if len(_similar_query_cache) > SIMILAR_QUERY_CACHE_SIZE:
+        _similar_query_cache.popitem(last=False)
+
+
+# Warm per-user search index: a user's PARA item embeddings held in-process
+# (int8, ~1.5 KB per item) so repeat searches skip the match_para_items RPC.
+# invalidate_user_search() only reaches the worker that handled the write, so
+# other workers can serve edited or deleted items until their copy expires -
+# the TTL bounds that staleness.
+USER_INDEX_TTL_SECONDS = 120.0
+USER_INDEX_CACHE_SIZE = 64
+USER_INDEX_MAX_ITEMS = 20_000
+_USER_INDEX_PAGE_SIZE = 1000
+_user_indexes: "OrderedDict[str, Tuple[float, List[Dict], np.ndarray, np.ndarray]]" = OrderedDict()
+# Background loads in progress, so concurrent searches start at most one per user
+_user_index_loads: Dict[str, asyncio.Task] = {}
+
+
+def _load_user_index(user_id: str) -> Optional[Tuple[List[Dict], np.ndarray, np.ndarray]]:
+    """Fetch a user's embedded PARA items as (rows, int8 codes, scales).
+
+    Returns None for accounts over USER_INDEX_MAX_ITEMS, which stay on the RPC.
+    """
+    rows: List[Dict] = []
+    codes: List[np.ndarray] = []
+    scales: List[float] = []
+    last_id = None
+
+    while True:
+        query = supabase.table("para_items")\
+            .select("id, title, para_type, embedding")\
+            .eq("user_id", user_id)\
+            .not_.is_("embedding", "null")
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        page = query.order("id").limit(_USER_INDEX_PAGE_SIZE).execute()
+
+        for row in page.data:
+            embedding = row.pop("embedding")
+            # PostgREST returns pgvector values in their text form, "[0.1,0.2,...]"
+            item_codes, item_scale = quantize_int8(
+                _unit_vector(orjson.loads(embedding) if isinstance(embedding, str) else embedding)
+            )
+            rows.append(row)
+            codes.append(item_codes)
+            scales.append(item_scale)
+
+        if len(rows) > USER_INDEX_MAX_ITEMS:
+            return None
+        if len(page.data) < _USER_INDEX_PAGE_SIZE:
+            break
+        last_id = page.data[-1]["id"]
+
+    if not rows:
+        return rows, np.empty((0, 0), dtype=np.int8), np.empty(0, dtype=np.float32)
+    return rows, np.stack(codes), np.asarray(scales, dtype=np.float32)
+
+
+def _user_index_ready(user_id: str) -> bool:
+    cached = _user_indexes.get(user_id)
+    return cached is not None and time.monotonic() - cached[0] < USER_INDEX_TTL_SECONDS
+
+
+async def warm_user_index(user_id: str) -> bool:
+    """Load the user's index if it isn't cached; True when one is available.
+
+    The page fetches and vector parsing run in a worker thread, so loading a
+    large account never blocks the event loop.
+    """
+    if _user_index_ready(user_id):
+        return True
+
+    try:
+        index = await asyncio.to_thread(_load_user_index, user_id)
+    except Exception as e:
+        print(f"Error loading search index: {e}")
+        return False
+    if index is None:
+        return False
+
+    _user_indexes[user_id] = (time.monotonic(), *index)
+    _user_indexes.move_to_end(user_id)
+    if len(_user_indexes) > USER_INDEX_CACHE_SIZE:
+        _user_indexes.popitem(last=False)
+    return True
+
+
+def schedule_user_index_warm(user_id: str) -> None:
+    """Start loading the user's index in the background unless it is ready or loading.
+
+    Searches made meanwhile go to the match_para_items RPC as usual.
+    """
+    if _user_index_ready(user_id) or user_id in _user_index_loads:
+        return
+
+    task = asyncio.get_running_loop().create_task(warm_user_index(user_id))
+    _user_index_loads[user_id] = task
+
+    def _done(finished: asyncio.Task) -> None:
+        if _user_index_loads.get(user_id) is finished:
+            del _user_index_loads[user_id]
+
+    task.add_done_callback(_done)
+
+
+def _search_user_index(
+    user_id: str,
+    vector: np.ndarray,
+    limit: int,
+    match_threshold: float
+) -> Optional[List[Dict]]:
+    """match_para_items against the warm index; None if the user has none."""
+    cached = _user_indexes.get(user_id)
+    if cached is None:
+        return None
+    loaded_at, rows, codes, scales = cached
+    if time.monotonic() - loaded_at >= USER_INDEX_TTL_SECONDS:
+        del _user_indexes[user_id]
+        return None
+    _user_indexes.move_to_end(user_id)
+    if not rows:
+        return []
+
+    similarities = _int8_similarities(codes, scales, vector)
+    candidates = np.flatnonzero(similarities > match_threshold)
+    best = candidates[np.argsort(-similarities[candidates])[:limit]]
+    return [{**rows[i], "similarity": float(similarities[i])} for i in best]
+
+
+def invalidate_user_search(user_id: str) -> None:
+    """Drop a user's warm index and cached search results after items change.
+
+    Only affects this process; see USER_INDEX_TTL_SECONDS.
+    """
+    _user_indexes.pop(user_id, None)
+    # A load already in flight may have read the old rows - don't let it land
+    load = _user_index_loads.pop(user_id, None)
+    if load is not None:
+        load.cancel()
+    for key in [key for key in _similar_query_cache if key[0] == user_id]:
+        del _similar_query_cache[key]
+
+
+def _embedding_text(title: str, description: str = "") -> str:
+    """Combine title and description for a richer embedding, truncated to the input limit."""
+    text = f"{title}\n\n{description}" if description else title
+    return text[:MAX_EMBEDDING_CHARS]
+
+
+def _batch_ranges(texts: List[str], batch_size: int) -> Iterator[Tuple[int, int]]:
+    """Yield [start, end) slices holding at most batch_size texts and MAX_BATCH_CHARS characters."""
+    start = 0
+    while start < len(texts):
+        end, chars = start, 0
+        while end < len(texts) and end - start < batch_size and (end == start or chars + len(texts[end]) <= MAX_BATCH_CHARS):
+            chars += len(texts[end])
+            end += 1
+        yield start, end
+        start = end
+
+
+def generate_embedding(text: str) -> Optional[np.ndarray]:
     """Generate embedding vector for text using OpenAI.
 
     Args:
         text: Text to embed (max ~8000 tokens)
 
     Returns:
-        1536-dimensional embedding vector or None if unavailable
+        1536-dimensional unit-length float32 vector or None if unavailable
     """
     if not OPENAI_AVAILABLE or not openai_client:
         return None
 
+    key = _embedding_key(text)
+    embedding = _cache_get(key)
+    if embedding is not None:
+        return embedding
+
+    embedding = _persistent_cache_get(key)
+    if embedding is not None:
+        _cache_set(key, embedding)
+        return embedding
+
     try:
         # Use OpenAI's latest embedding model
         response = openai_client.embeddings.create(
-            model="text-embedding-3-small",  # $0.02 per 1M tokens
+            model=EMBEDDING_MODEL,  # $0.02 per 1M tokens
             input=text,
             encoding_format="float"
         )
-        return response.data[0].embedding
+        embedding = _unit_vector(response.data[0].embedding)
 
     except Exception as e:
         print(f"Error generating embedding: {e}")
         return None
 
+    _cache_set(key, embedding)
+    _persistent_cache_set(key, embedding)
+    return embedding
+
+
+def generate_embeddings_batch(
+    texts: List[str],
+    batch_size: int = EMBEDDING_BATCH_SIZE
+) -> List[Optional[np.ndarray]]:
+    """Generate embeddings for many texts with one API request per batch.
 
-def embed_para_item(item_id: str, title: str, description: str = "") -> bool:
+    Args:
+        texts: Texts to embed
+        batch_size: Maximum texts per request (the API allows up to 2048)
+
+    Returns:
+        One unit-length float32 embedding per input text, in input order; None where the
+        batch containing that text failed or embeddings are unavailable
+    """
+    embeddings, keys, missing = _cached_embeddings(texts)
+    if not OPENAI_AVAILABLE or not openai_client:
+        return _share_duplicates(embeddings, keys)
+
+    truncated = [texts[i][:MAX_EMBEDDING_CHARS] for i in missing]
+    for start, end in _batch_ranges(truncated, batch_size):
+        try:
+            response = openai_client.embeddings.create(
+                model=EMBEDDING_MODEL,
+                input=truncated[start:end],
+                encoding_format="float"
+            )
+        except Exception as e:
+            print(f"Error generating embeddings batch: {e}")
+            continue
+
+        # Results carry their input index, so align by it rather than position
+        for item in response.data:
+            position = missing[start + item.index]
+            embeddings[position] = _unit_vector(item.embedding)
+            _cache_set(keys[position], embeddings[position])
+
+    return _share_duplicates(embeddings, keys)
+
+
+def _cached_embeddings(texts: List[str]) -> Tuple[List[Optional[np.ndarray]], List[str], List[int]]:
+    """Fill what the in-process cache has; returns (embeddings, keys, indexes to request).
+
+    Texts that normalize to the same key ("Meeting notes" twice) are requested
+    once: only the first index per missing key is returned, and
+    _share_duplicates copies its vector to the rest afterwards.
+    """
+    keys = [_embedding_key(text) for text in texts]
+    embeddings = [_cache_get(key) for key in keys]
+    missing, requested = [], set()
+    for i, key in enumerate(keys):
+        if embeddings[i] is None and key not in requested:
+            requested.add(key)
+            missing.append(i)
+    return embeddings, keys, missing
+
+
+def _share_duplicates(embeddings: List[Optional[np.ndarray]], keys: List[str]) -> List[Optional[np.ndarray]]:
+    """Give every text the vector fetched for an identical text in the same call."""
+    by_key = {key: embedding for key, embedding in zip(keys, embeddings) if embedding is not None}
+    return [by_key.get(key) for key in keys]
+
+
+async def agenerate_embeddings_batch(
+    texts: List[str],
+    batch_size: int = EMBEDDING_BATCH_SIZE
+) -> List[Optional[np.ndarray]]:
+    """Async generate_embeddings_batch: batches are requested concurrently.
+
+    At most MAX_CONCURRENT_EMBEDDING_REQUESTS batches are in flight at once.
+    Results are assembled by index, so order matches the input regardless of
+    which batch finishes first.
+    """
+    embeddings, keys, missing = _cached_embeddings(texts)
+    if not OPENAI_AVAILABLE or not async_openai_client:
+        return _share_duplicates(embeddings, keys)
+
+    truncated = [texts[i][:MAX_EMBEDDING_CHARS] for i in missing]
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_EMBEDDING_REQUESTS)
+
+    async def embed_range(start: int, end: int) -> None:
+        async with semaphore:
+            await asyncio.sleep(random.uniform(0, EMBEDDING_REQUEST_JITTER_SECONDS))
+            try:
+                response = await async_openai_client.embeddings.create(
+                    model=EMBEDDING_MODEL,
+                    input=truncated[start:end],
+                    encoding_format="float"
+                )
+            except Exception as e:
+                print(f"Error generating embeddings batch: {e}")
+                return
+
+        for item in response.data:
+            position = missing[start + item.index]
+            embeddings[position] = _unit_vector(item.embedding)
+            _cache_set(keys[position], embeddings[position])
+
+    await asyncio.gather(*(embed_range(start, end) for start, end in _batch_ranges(truncated, batch_size)))
+    return _share_duplicates(embeddings, keys)
+
+
+async def _store_embeddings(rpc_name: str, rows: List[Dict]) -> int:
+    """Write {"id", "embedding"} rows in bulk requests; returns rows updated.
+
+    Rows go out EMBEDDING_WRITE_BATCH_SIZE at a time, so one failed request
+    only loses its own chunk.
+    """
+    stored = 0
+    for start in range(0, len(rows), EMBEDDING_WRITE_BATCH_SIZE):
+        chunk = rows[start:start + EMBEDDING_WRITE_BATCH_SIZE]
+        try:
+            result = await execute_async(supabase.rpc(rpc_name, {"p_rows": chunk}))
+            stored += result.data or 0
+        except Exception as e:
+            print(f"Error storing embeddings: {e}")
+    return stored
+
+
+def _store_embedding(rpc_name: str, row_id: str, embedding: np.ndarray) -> bool:
+    """Write a single embedding through the same bulk RPC as the batch path."""
+    row = {"id": row_id, "embedding": embedding.tolist()}
+    try:
+        result = supabase.rpc(rpc_name, {"p_rows": [row]}).execute()
+        return bool(result.data)
+    except Exception as e:
+        print(f"Error storing embedding: {e}")
+        return False
+
+
+async def _batch_embed(rows: List[Dict], rpc_name: str) -> Dict[str, int]:
+    """Embed rows with id/title/description and store the vectors in bulk."""
+    embeddings = await agenerate_embeddings_batch(
+        [_embedding_text(row["title"], row.get("description") or "") for row in rows]
+    )
+    # Vectors are unit length, so match_para_items can rank by inner product;
+    # they only become lists at the JSON boundary
+    updates = [
+        {"id": row["id"], "embedding": embedding.tolist()}
+        for row, embedding in zip(rows, embeddings)
+        if embedding is not None
+    ]
+
+    stored = await _store_embeddings(rpc_name, updates)
+
+    return {
+        "total": len(rows),
+        "success": stored,
+        "failed": len(rows) - stored
+    }
+
+
+def embed_para_item(item_id: str, title: str, description: str = "", user_id: Optional[str] = None) -> bool:
     """Generate and store embedding for a PARA item.
 
     Args:
         item_id: UUID of the PARA item
         title: Item title
         description: Item description
+        user_id: Owner of the item; their warm search index is dropped once
+            the embedding is stored
 
     Returns:
         True if successful, False otherwise
     """
-    # Combine title and description for richer embedding
-    text = f"{title}\n\n{description}" if description else title
-
-    embedding = generate_embedding(text)
-    if not embedding:
+    embedding = generate_embedding(_embedding_text(title, description))
+    if embedding is None:
         return False
 
-    try:
-        # Update the para_items table with the embedding
-        supabase.table("para_items")\
-            .update({"embedding": embedding})\
-            .eq("id", item_id)\
-            .execute()
-        return True
-
-    except Exception as e:
-        print(f"Error storing embedding: {e}")
-        return False
+    stored = _store_embedding("set_para_item_embeddings", item_id, embedding)
+    if stored and user_id:
+        invalidate_user_search(user_id)
+    return stored
 
 
 def embed_task(task_id: str, title: str, description: str = "") -> bool:
@@ -87,22 +567,36 @@ def embed_task(task_id: str, title: str, description: str = "") -> bool:
     Returns:
         True if successful, False otherwise
     """
-    text = f"{title}\n\n{description}" if description else title
-
-    embedding = generate_embedding(text)
-    if not embedding:
+    embedding = generate_embedding(_embedding_text(title, description))
+    if embedding is None:
         return False
 
-    try:
-        supabase.table("tasks")\
-            .update({"embedding": embedding})\
-            .eq("id", task_id)\
-            .execute()
-        return True
+    return _store_embedding("set_task_embeddings", task_id, embedding)
 
-    except Exception as e:
-        print(f"Error storing embedding: {e}")
-        return False
+
+def _similar_cached_or_local(
+    user_id: str,
+    query_vector: np.ndarray,
+    limit: int,
+    match_threshold: float
+) -> Optional[List[Dict]]:
+    """Answer from the similar-query cache or the warm index; None if neither can."""
+    cached = _similar_query_get((user_id, limit, match_threshold), query_vector)
+    if cached is not None:
+        return list(cached)
+    return _search_user_index(user_id, query_vector, limit, match_threshold)
+
+
+def _match_para_items(user_id: str, query_vector: np.ndarray, limit: int, match_threshold: float):
+    return supabase.rpc(
+        'match_para_items',
+        {
+            'query_embedding': query_vector.tolist(),
+            'match_threshold': match_threshold,
+            'match_count': limit,
+            'filter_user_id': user_id
+        }
+    )
 
 
 def find_similar_para_items(
@@ -122,22 +616,19 @@ def find_similar_para_items(
     Returns:
         List of similar PARA items with similarity scores
     """
-    query_embedding = generate_embedding(query)
-    if not query_embedding:
+    query_vector = generate_embedding(query)
+    if query_vector is None:
         return []
 
+    local = _similar_cached_or_local(user_id, query_vector, limit, match_threshold)
+    if local is not None:
+        return local
+
     try:
         # Use the Supabase RPC function for vector similarity search
-        result = supabase.rpc(
-            'match_para_items',
-            {
-                'query_embedding': query_embedding,
-                'match_threshold': match_threshold,
-                'match_count': limit,
-                'filter_user_id': user_id
-            }
-        ).execute()
+        result = _match_para_items(user_id, query_vector, limit, match_threshold).execute()
 
+        _similar_query_set((user_id, limit, match_threshold), query_vector, result.data)
         return result.data
 
     except Exception as e:
@@ -145,7 +636,71 @@ def find_similar_para_items(
         return []
 
 
-def batch_embed_para_items(user_id: str) -> Dict[str, int]:
+async def afind_similar_para_items(
+    query: str,
+    user_id: str,
+    limit: int = 5,
+    match_threshold: float = 0.7
+) -> List[Dict]:
+    """Async version of find_similar_para_items() for request handlers.
+
+    The embedding call runs in a worker thread and the RPC through
+    execute_async; the in-process caches are only touched on the event loop.
+    """
+    query_vector = await asyncio.to_thread(generate_embedding, query)
+    if query_vector is None:
+        return []
+
+    local = _similar_cached_or_local(user_id, query_vector, limit, match_threshold)
+    if local is not None:
+        return local
+
+    try:
+        result = await execute_async(_match_para_items(user_id, query_vector, limit, match_threshold))
+
+        _similar_query_set((user_id, limit, match_threshold), query_vector, result.data)
+        return result.data
+
+    except Exception as e:
+        print(f"Error searching similar items: {e}")
+        return []
+
+
+async def _backfill_embeddings(table: str, user_id: str, rpc_name: str) -> Dict[str, int]:
+    """Embed a user's rows that have no embedding, one keyset page at a time.
+
+    Pages are ordered by id and resume after the last id seen, so rows that
+    fail to embed (and so still match the filter) are not fetched again.
+    """
+    totals = {"total": 0, "success": 0, "failed": 0}
+    last_id = None
+
+    while True:
+        query = supabase.table(table)\
+            .select("id, title, description")\
+            .eq("user_id", user_id)\
+            .is_("embedding", "null")
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        page = await execute_async(query.order("id").limit(EMBEDDING_BACKFILL_PAGE_SIZE))
+        if not page.data:
+            break
+
+        counts = await _batch_embed(page.data, rpc_name)
+        for key in totals:
+            totals[key] += counts[key]
+        if counts["success"] and table == "para_items":
+            # Newly embedded items should show up in this worker's next search
+            invalidate_user_search(user_id)
+
+        if len(page.data) < EMBEDDING_BACKFILL_PAGE_SIZE:
+            break
+        last_id = page.data[-1]["id"]
+
+    return totals
+
+
+async def batch_embed_para_items(user_id: str) -> Dict[str, int]:
     """Batch generate embeddings for all PARA items without embeddings.
 
     Args:
@@ -154,31 +709,10 @@ def batch_embed_para_items(user_id: str) -> Dict[str, int]:
     Returns:
         Dictionary with success/failure counts
     """
-    # Fetch items without embeddings
-    result = supabase.table("para_items")\
-        .select("id, title, description")\
-        .eq("user_id", user_id)\
-        .is_("embedding", "null")\
-        .execute()
+    return await _backfill_embeddings("para_items", user_id, "set_para_item_embeddings")
 
-    items = result.data
-    success_count = 0
-    failure_count = 0
 
-    for item in items:
-        if embed_para_item(item["id"], item["title"], item.get("description", "")):
-            success_count += 1
-        else:
-            failure_count += 1
-
-    return {
-        "total": len(items),
-        "success": success_count,
-        "failed": failure_count
-    }
-
-
-def batch_embed_tasks(user_id: str) -> Dict[str, int]:
+async def batch_embed_tasks(user_id: str) -> Dict[str, int]:
     """Batch generate embeddings for all tasks without embeddings.
 
     Args:
@@ -187,30 +721,10 @@ def batch_embed_tasks(user_id: str) -> Dict[str, int]:
     Returns:
         Dictionary with success/failure counts
     """
-    result = supabase.table("tasks")\
-        .select("id, title, description")\
-        .eq("user_id", user_id)\
-        .is_("embedding", "null")\
-        .execute()
-
-    tasks = result.data
-    success_count = 0
-    failure_count = 0
-
-    for task in tasks:
-        if embed_task(task["id"], task["title"], task.get("description", "")):
-            success_count += 1
-        else:
-            failure_count += 1
-
-    return {
-        "total": len(tasks),
-        "success": success_count,
-        "failed": failure_count
-    }
+    return await _backfill_embeddings("tasks", user_id, "set_task_embeddings")
 
 
-def semantic_search_across_all(
+async def semantic_search_across_all(
     query: str,
     user_id: str,
     limit: int = 10
@@ -225,7 +739,10 @@ def semantic_search_across_all(
     Returns:
         Dictionary with 'para_items' and 'tasks' lists
     """
-    para_results = find_similar_para_items(query, user_id, limit=limit // 2)
+    # Searching users get their embeddings loaded in-process (in the background),
+    # so follow-up searches are answered locally until the index expires or is invalidated
+    schedule_user_index_warm(user_id)
+    para_results = await afind_similar_para_items(query, user_id, limit=limit // 2)
 
     # Similar function for tasks (would need similar RPC in Supabase)
     # For now, just return PARA items
@@ -1,7 +1,22 @@
-from database import supabase
+from database import supabase, execute_async
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
 from templates.insights_template import generate_productivity_insights, generate_reprioritization_suggestions
+import numpy as np
+
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# np.digitize edges for completion hours; below 6 and from 20 both count as night
+HOUR_BUCKET_EDGES = [6, 9, 12, 14, 17, 20]
+HOUR_BUCKET_LABELS = [
+    "Night (8pm+)",
+    "Early Morning (6-9am)",
+    "Morning (9am-12pm)",
+    "Lunch (12-2pm)",
+    "Afternoon (2-5pm)",
+    "Evening (5-8pm)",
+    "Night (8pm+)"
+]
 
 class ProactiveInsightsAgent:
     """
@@ -17,26 +32,31 @@ class ProactiveInsightsAgent:
         Analyze user patterns and provide insights
         """
 
-        # Get user's task completion history
-        thirty_days_ago = (datetime.now() - timedelta(days=30)).isoformat()
-
-        tasks = supabase.table('tasks')\
-            .select('*')\
-            .eq('user_id', user_id)\
-            .gte('created_at', thirty_days_ago)\
-            .execute()
-
-        if not tasks.data:
-            return {"insights": []}
+        # Completion aggregates and blocker candidates in one round trip
+        now = datetime.now()
+        snapshot = await execute_async(supabase.rpc('user_insights_snapshot', {
+            'p_user_id': user_id,
+            'p_since': (now - timedelta(days=30)).isoformat(),
+            'p_stale_before': (now - timedelta(days=14)).isoformat(),
+            'p_now': now.isoformat()
+        }))
+        snapshot = snapshot.data or {}
 
         # Analyze task completion by day of week
-        completion_by_day = self._analyze_completion_by_day(tasks.data)
+        completion_by_day = self._analyze_completion_by_day(snapshot.get('completion_by_day') or [])
 
-        # Analyze task completion by time of day
-        completion_by_hour = self._analyze_completion_by_hour(tasks.data)
+        if any(completion_by_day.values()):
+            # Analyze task completion by time of day
+            completion_by_hour = self._analyze_completion_by_hour(snapshot.get('completion_by_hour') or [])
+        else:
+            # No completions to find patterns in - only the blocker insights apply
+            completion_by_day, completion_by_hour = {}, {}
 
         # Identify blockers
-        blockers = self._identify_blockers(user_id)
+        blockers = self._identify_blockers(
+            snapshot.get('stale_projects') or [],
+            snapshot.get('rollover_tasks') or []
+        )
 
         # Generate insights using deterministic templates (cost optimized)
         insights = generate_productivity_insights(
@@ -47,69 +67,35 @@ class ProactiveInsightsAgent:
 
         return insights
 
-    def _analyze_completion_by_day(self, tasks: List[Dict]) -> Dict[str, int]:
-        """Analyze task completion by day of week"""
-        completion_by_day = {
-            "Monday": 0,
-            "Tuesday": 0,
-            "Wednesday": 0,
-            "Thursday": 0,
-            "Friday": 0,
-            "Saturday": 0,
-            "Sunday": 0
-        }
-
-        for task in tasks:
-            if task['status'] == 'completed' and task['completed_at']:
-                completed_date = datetime.fromisoformat(task['completed_at'])
-                day_name = completed_date.strftime('%A')
-                completion_by_day[day_name] += 1
+    def _analyze_completion_by_day(self, rows: List[Dict]) -> Dict[str, int]:
+        """Analyze task completion by day of week from (isodow, completed) rows"""
+        completion_by_day = dict.fromkeys(DAY_NAMES, 0)
+        for row in rows:
+            completion_by_day[DAY_NAMES[row['isodow'] - 1]] = row['completed']
 
         return completion_by_day
 
-    def _analyze_completion_by_hour(self, tasks: List[Dict]) -> Dict[str, int]:
-        """Analyze task completion by hour of day"""
-        completion_by_hour = {}
+    def _analyze_completion_by_hour(self, rows: List[Dict]) -> Dict[str, int]:
+        """Analyze task completion by hour of day from (hour, completed) rows"""
+        hours = np.array([row['hour'] for row in rows], dtype=np.int64)
+        completed = np.array([row['completed'] for row in rows], dtype=np.int64)
+        counts = np.bincount(
+            np.digitize(hours, HOUR_BUCKET_EDGES), weights=completed, minlength=len(HOUR_BUCKET_LABELS)
+        )
 
-        for task in tasks:
-            if task['status'] == 'completed' and task['completed_at']:
-                completed_date = datetime.fromisoformat(task['completed_at'])
-                hour = completed_date.hour
-
-                # Group into time ranges
-                if 6 <= hour < 9:
-                    period = "Early Morning (6-9am)"
-                elif 9 <= hour < 12:
-                    period = "Morning (9am-12pm)"
-                elif 12 <= hour < 14:
-                    period = "Lunch (12-2pm)"
-                elif 14 <= hour < 17:
-                    period = "Afternoon (2-5pm)"
-                elif 17 <= hour < 20:
-                    period = "Evening (5-8pm)"
-                else:
-                    period = "Night (8pm+)"
-
-                completion_by_hour[period] = completion_by_hour.get(period, 0) + 1
+        # Group into time ranges, keeping only periods with completions
+        completion_by_hour = {}
+        for period, count in zip(HOUR_BUCKET_LABELS, counts):
+            if count:
+                completion_by_hour[period] = completion_by_hour.get(period, 0) + int(count)
 
         return completion_by_hour
 
-    def _identify_blockers(self, user_id: str) -> List[Dict]:
-        """Identify potential blockers"""
+    def _identify_blockers(self, stale_projects: List[Dict], rollover_tasks: List[Dict]) -> List[Dict]:
+        """Identify potential blockers from projects with no progress in 2 weeks and overdue tasks"""
         blockers = []
 
-        # Find projects with no progress in 2 weeks
-        two_weeks_ago = (datetime.now() - timedelta(days=14)).isoformat()
-
-        stale_projects = supabase.table('para_items')\
-            .select('*')\
-            .eq('user_id', user_id)\
-            .eq('para_type', 'project')\
-            .eq('status', 'active')\
-            .lt('updated_at', two_weeks_ago)\
-            .execute()
-
-        for project in stale_projects.data:
+        for project in stale_projects:
             blockers.append({
                 "type": "stale_project",
                 "title": project['title'],
@@ -118,14 +104,7 @@ class ProactiveInsightsAgent:
             })
 
         # Find tasks that keep rolling over
-        rollover_tasks = supabase.table('tasks')\
-            .select('id, title, due_date')\
-            .eq('user_id', user_id)\
-            .eq('status', 'pending')\
-            .lt('due_date', datetime.now().isoformat())\
-            .execute()
-
-        for task in rollover_tasks.data:
+        for task in rollover_tasks:
             if task['due_date']:
                 days_overdue = (datetime.now() - datetime.fromisoformat(task['due_date'])).days
                 if days_overdue > 3:
@@ -147,12 +126,13 @@ class ProactiveInsightsAgent:
         # Get tasks due in next 24 hours
         tomorrow = (datetime.now() + timedelta(days=1)).isoformat()
 
-        urgent_tasks = supabase.table('tasks')\
-            .select('*')\
-            .eq('user_id', user_id)\
-            .neq('status', 'completed')\
-            .lte('due_date', tomorrow)\
-            .execute()
+        urgent_tasks = await execute_async(
+            supabase.table('tasks')
+            .select('id, priority, estimated_duration_minutes, due_date')
+            .eq('user_id', user_id)
+            .neq('status', 'completed')
+            .lte('due_date', tomorrow)
+        )
 
         # Use deterministic reprioritization logic
         suggestion = generate_reprioritization_suggestions(urgent_tasks.data)
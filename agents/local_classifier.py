@@ -0,0 +1,115 @@
+"""Local PARA classifier - multinomial Naive Bayes over title/description words.
+
+Runs in-process in microseconds, so confident predictions skip the network
+round trip to the LLM entirely. Trained on historical classifications from
+the para_items table:
+
+    python -m agents.local_classifier models/para_local.json
+"""
+
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+import json
+import math
+import re
+import sys
+
+
+PARA_TYPES = ("project", "area", "resource", "archive")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _tokenize(title: str, description: str = "") -> List[str]:
+    return _TOKEN_RE.findall(f"{title or ''} {description or ''}".lower())
+
+
+class LocalPARAClassifier:
+    """Multinomial Naive Bayes with Laplace smoothing, serializable to JSON."""
+
+    def __init__(
+        self,
+        class_counts: Optional[Dict[str, int]] = None,
+        word_counts: Optional[Dict[str, Dict[str, int]]] = None
+    ):
+        self.class_counts = dict(class_counts or {})
+        self.word_counts = {label: dict(counts) for label, counts in (word_counts or {}).items()}
+        self._prepare()
+
+    def _prepare(self) -> None:
+        """Precompute log priors and per-class totals used by predict()."""
+        total_docs = sum(self.class_counts.values())
+        self.vocabulary_size = len({w for counts in self.word_counts.values() for w in counts}) or 1
+        self.log_priors = {
+            label: math.log(count / total_docs)
+            for label, count in self.class_counts.items()
+            if count
+        }
+        self.class_totals = {
+            label: sum(self.word_counts.get(label, {}).values())
+            for label in self.log_priors
+        }
+
+    def fit(self, rows: Iterable[Dict]) -> "LocalPARAClassifier":
+        """Train on rows with 'title', 'description' and 'para_type'."""
+        class_counts: Counter = Counter()
+        word_counts: Dict[str, Counter] = defaultdict(Counter)
+
+        for row in rows:
+            label = row.get("para_type")
+            if label not in PARA_TYPES:
+                continue
+            class_counts[label] += 1
+            word_counts[label].update(_tokenize(row.get("title", ""), row.get("description", "")))
+
+        self.class_counts = dict(class_counts)
+        self.word_counts = {label: dict(counts) for label, counts in word_counts.items()}
+        self._prepare()
+        return self
+
+    def predict(self, title: str, description: str = "") -> Optional[Tuple[str, float]]:
+        """Return (para_type, probability), or None if untrained or no usable words."""
+        tokens = _tokenize(title, description)
+        if not self.log_priors or not tokens:
+            return None
+
+        scores = {}
+        for label, log_prior in self.log_priors.items():
+            counts = self.word_counts.get(label, {})
+            denominator = self.class_totals[label] + self.vocabulary_size
+            scores[label] = log_prior + sum(
+                math.log((counts.get(token, 0) + 1) / denominator) for token in tokens
+            )
+
+        best = max(scores, key=scores.get)
+        normalizer = sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, 1.0 / normalizer
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump({"class_counts": self.class_counts, "word_counts": self.word_counts}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "LocalPARAClassifier":
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data.get("class_counts"), data.get("word_counts"))
+
+
+def train_from_database(path: str) -> LocalPARAClassifier:
+    """Fit on every classified para_items row and save the model to path."""
+    from database import supabase
+
+    rows = supabase.table("para_items")\
+        .select("title, description, para_type")\
+        .execute()
+
+    model = LocalPARAClassifier().fit(rows.data)
+    model.save(path)
+    return model
+
+
+if __name__ == "__main__":
+    output_path = sys.argv[1] if len(sys.argv) > 1 else "para_local_model.json"
+    trained = train_from_database(output_path)
+    print(f"Trained on {sum(trained.class_counts.values())} items -> {output_path}")
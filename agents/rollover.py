@@ -1,112 +1,291 @@
-from anthropic import Anthropic
 from config import settings
-from database import supabase
-from datetime import datetime, timedelta
-from typing import Dict, Any
-import json
+from database import supabase, execute_async
+from llm_provider import llm_provider
+from agents._prompt_cache import build_cached_system
+from models.task import RolloverRecommendation, TaskRolloverRecommendation
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional
+from pydantic import ValidationError
+import asyncio
+import logging
+import orjson
 
-class SmartRolloverAgent:
-    """
-    Agent that handles smart rollover logic for tasks that keep getting deferred
-    """
 
-    def __init__(self):
-        self.client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
-        self.model = settings.CLAUDE_MODEL
+logger = logging.getLogger(__name__)
 
-    async def analyze_rollover_task(self, task_id: str, user_id: str) -> Dict[str, Any]:
-        """
-        Analyze a task that has been rolled over multiple times
-        """
 
-        # Get task history
-        task = supabase.table('tasks')\
-            .select('*')\
-            .eq('id', task_id)\
-            .single()\
-            .execute()
+# Rolled-over tasks are analyzed several per LLM call, so the instructions
+# and recent-task context are paid for once per batch rather than per task
+ROLLOVER_BATCH_SIZE = 8
 
-        if not task.data:
-            return {"error": "Task not found"}
+# Bounds concurrent LLM calls when a user has many rolled-over tasks
+MAX_CONCURRENT_ROLLOVER_ANALYSES = 5
 
-        # Count how many times this task has been rescheduled
-        # (This would require a task_history table in production)
+# A pending task this many days past its due date counts as rolled over
+ROLLOVER_MIN_OVERDUE_DAYS = 3
 
-        # Get user's recent completed tasks for context
-        recent_completed = supabase.table('tasks')\
-            .select('title, estimated_duration_minutes')\
-            .eq('user_id', user_id)\
-            .eq('status', 'completed')\
-            .order('completed_at', desc=True)\
-            .limit(10)\
-            .execute()
-
-        prompt = f"""This task keeps getting rolled over:
-
-Task: {task.data['title']}
-Description: {task.data.get('description', 'N/A')}
-Priority: {task.data['priority']}
-Estimated Duration: {task.data.get('estimated_duration_minutes', 'Unknown')} minutes
-Times Rolled Over: 3+ times
+ROLLOVER_TASK_COLUMNS = "id, title, description, priority, estimated_duration_minutes, status, due_date"
 
-Recent Completed Tasks (for context):
-{json.dumps([t['title'] for t in recent_completed.data], indent=2)}
+# Enforced by Anthropic's structured-output tool; Groq JSON mode takes the
+# shape from ROLLOVER_SCHEMA / ROLLOVER_BATCH_SCHEMA in the prompt
+ROLLOVER_JSON_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "recommendation": {"type": "string", "enum": ["break_down", "archive", "reschedule", "adjust_duration"]},
+        "reasoning": {"type": "string"},
+        "suggested_subtasks": {"type": ["array", "null"], "items": {"type": "string"}},
+        "suggested_new_date": {"type": ["string", "null"]},
+        "new_estimated_duration": {"type": ["number", "null"]},
+        "message_to_user": {"type": "string"}
+    },
+    "required": ["recommendation", "reasoning", "message_to_user"]
+}
+
+ROLLOVER_BATCH_JSON_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "recommendations": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"task_id": {"type": "string"}, **ROLLOVER_JSON_SCHEMA["properties"]},
+                "required": ["task_id", *ROLLOVER_JSON_SCHEMA["required"]]
+            }
+        }
+    },
+    "required": ["recommendations"]
+}
 
-This task keeps being deferred. Provide suggestions:
+# Static instructions and output schema go in the system prompt; only the task
+# details change between calls. Like the scheduler's, these are too short for
+# Haiku to cache, so build_cached_system leaves them unmarked.
+ROLLOVER_SYSTEM = """You help users deal with tasks that keep getting deferred. For the task provided, suggest what to do:
 
 1. Should it be broken into smaller subtasks?
 2. Should it be archived/cancelled because it's not actually important?
 3. Should it be rescheduled to a specific time next month?
 4. Is the estimated duration unrealistic?
+"""
 
-Return as JSON:
-{{
+ROLLOVER_SCHEMA = """Return as JSON:
+{
   "recommendation": "break_down|archive|reschedule|adjust_duration",
   "reasoning": "...",
   "suggested_subtasks": ["task 1", "task 2"] or null,
   "suggested_new_date": "ISO date" or null,
   "new_estimated_duration": number or null,
   "message_to_user": "Friendly message explaining the situation"
-}}
+}
+"""
+
+ROLLOVER_BATCH_SCHEMA = """You will be given several tasks. Return a JSON object with one recommendation per task, using each task's id:
+{
+  "recommendations": [
+    {
+      "task_id": "uuid",
+      "recommendation": "break_down|archive|reschedule|adjust_duration",
+      "reasoning": "...",
+      "suggested_subtasks": ["task 1", "task 2"] or null,
+      "suggested_new_date": "ISO date" or null,
+      "new_estimated_duration": number or null,
+      "message_to_user": "Friendly message explaining the situation"
+    }
+  ]
+}
+"""
+
+
+# Per-call prompts; the recent-completed section is left out when empty
+ROLLOVER_TASK_PROMPT = """This task keeps getting rolled over:
+
+Task: {title}
+Description: {description}
+Priority: {priority}
+Estimated Duration: {estimated_duration} minutes
+Times Rolled Over: 3+ times
+{recent_section}"""
+
+ROLLOVER_BATCH_PROMPT = """These tasks keep getting rolled over:
+
+{tasks_json}
+{recent_section}"""
+
+RECENT_COMPLETED_SECTION = """
+Recent Completed Tasks (for context):
+{recent_json}
 """
 
-        response = self.client.messages.create(
-            model=self.model,
+
+def _recent_section(recent_titles: List[str]) -> str:
+    if not recent_titles:
+        return ""
+    return RECENT_COMPLETED_SECTION.format(recent_json=orjson.dumps(recent_titles).decode())
+
+
+def _is_rolled_over(task: Dict[str, Any]) -> bool:
+    """Pending and at least ROLLOVER_MIN_OVERDUE_DAYS past its due date."""
+    if task.get("status") != "pending" or not task.get("due_date"):
+        return False
+    due_date = datetime.fromisoformat(task["due_date"])
+    now = datetime.now(due_date.tzinfo)
+    return due_date < now - timedelta(days=ROLLOVER_MIN_OVERDUE_DAYS)
+
+
+class SmartRolloverAgent:
+    """
+    Agent that handles smart rollover logic for tasks that keep getting deferred
+    """
+
+    async def analyze_rollover_task(self, task_id: str, user_id: str) -> Dict[str, Any]:
+        """
+        Analyze a task that has been rolled over multiple times
+        """
+
+        # The task and the user's recent completed tasks (prompt context) are
+        # independent reads, so fetch them together
+        task, recent_titles = await asyncio.gather(
+            execute_async(
+                supabase.table('tasks')
+                .select(ROLLOVER_TASK_COLUMNS)
+                .eq('id', task_id)
+                .single()
+            ),
+            self._recent_completed_titles(user_id)
+        )
+
+        if not task.data:
+            return {"error": "Task not found"}
+
+        # Without a task_history table, "overdue by ROLLOVER_MIN_OVERDUE_DAYS and
+        # still pending" stands in for "rolled over 3+ times" - don't spend an
+        # LLM call on tasks that don't qualify
+        if not _is_rolled_over(task.data):
+            return {"error": "Task has not been rolled over"}
+
+        # Count how many times this task has been rescheduled
+        # (This would require a task_history table in production)
+
+        prompt = ROLLOVER_TASK_PROMPT.format(
+            title=task.data['title'],
+            description=task.data.get('description') or 'N/A',
+            priority=task.data['priority'],
+            estimated_duration=task.data.get('estimated_duration_minutes') or 'Unknown',
+            recent_section=_recent_section(recent_titles)
+        )
+
+        response = await llm_provider.aget_completion(
+            task_type='rollover_analysis',
+            prompt=prompt,
             max_tokens=1500,
-            messages=[{"role": "user", "content": prompt}]
+            system_prompt=build_cached_system(ROLLOVER_SYSTEM, ROLLOVER_SCHEMA),
+            json_schema=ROLLOVER_JSON_SCHEMA
         )
 
-        analysis = json.loads(response.content[0].text)
+        analysis = RolloverRecommendation.model_validate_json(response["text"]).model_dump(mode="json")
 
         # Store the suggestion as a pending approval
-        await self._create_rollover_approval(
-            user_id=user_id,
-            task_id=task_id,
-            recommendation=analysis
-        )
+        await self._create_rollover_approvals(user_id, {task_id: analysis})
 
         return analysis
 
-    async def _create_rollover_approval(
+    async def analyze_rollover_tasks_batch(
+        self,
+        task_rows: List[Dict[str, Any]],
+        user_id: str,
+        recent_titles: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Analyze several rolled-over tasks with a single LLM call and store
+        every recommendation as a pending approval
+        """
+        if not task_rows:
+            return []
+
+        if recent_titles is None:
+            recent_titles = await self._recent_completed_titles(user_id)
+
+        tasks_payload = [
+            {
+                "id": row["id"],
+                "title": row["title"],
+                "description": row.get("description") or "N/A",
+                "priority": row.get("priority"),
+                "estimated_duration_minutes": row.get("estimated_duration_minutes"),
+                "times_rolled_over": "3+"
+            }
+            for row in task_rows
+        ]
+        prompt = ROLLOVER_BATCH_PROMPT.format(
+            tasks_json=orjson.dumps(tasks_payload).decode(),
+            recent_section=_recent_section(recent_titles)
+        )
+
+        response = await llm_provider.aget_completion(
+            task_type='rollover_analysis',
+            prompt=prompt,
+            max_tokens=settings.CLAUDE_MAX_TOKENS,
+            system_prompt=build_cached_system(ROLLOVER_SYSTEM, ROLLOVER_BATCH_SCHEMA),
+            json_schema=ROLLOVER_BATCH_JSON_SCHEMA
+        )
+
+        # Entries are validated one by one, so a malformed recommendation only
+        # costs its own task; anything not about a requested task is dropped
+        requested_ids = {row["id"] for row in task_rows}
+        analyses = []
+        for entry in orjson.loads(response["text"])["recommendations"]:
+            try:
+                analysis = TaskRolloverRecommendation.model_validate(entry)
+            except ValidationError as e:
+                logger.warning(f"Skipping invalid rollover recommendation: {str(e)}")
+                continue
+            if analysis.task_id in requested_ids:
+                analyses.append(analysis.model_dump(mode="json"))
+
+        await self._create_rollover_approvals(user_id, {
+            analysis["task_id"]: {k: v for k, v in analysis.items() if k != "task_id"}
+            for analysis in analyses
+        })
+
+        return analyses
+
+    async def _recent_completed_titles(self, user_id: str) -> List[str]:
+        """Titles of the user's 10 most recently completed tasks, as prompt context."""
+        recent_completed = await execute_async(
+            supabase.table('tasks')
+            .select('title')
+            .eq('user_id', user_id)
+            .eq('status', 'completed')
+            .order('completed_at', desc=True)
+            .limit(10)
+        )
+        return [t['title'] for t in recent_completed.data]
+
+    async def _create_rollover_approvals(
         self,
         user_id: str,
-        task_id: str,
-        recommendation: Dict[str, Any]
+        recommendations: Dict[str, Dict[str, Any]]
     ):
         """
-        Create a pending approval for the rollover recommendation
+        Create pending approvals for rollover recommendations (task_id -> recommendation)
+        with a single multi-row insert
         """
+        if not recommendations:
+            return
 
-        supabase.table('pending_approvals').insert({
-            "user_id": user_id,
-            "approval_type": "rollover_suggestion",
-            "data": {
-                "task_id": task_id,
-                "recommendation": recommendation
-            },
-            "status": "pending",
-            "created_at": datetime.now().isoformat()
-        }).execute()
+        created_at = datetime.now(timezone.utc).isoformat()
+        await execute_async(supabase.table('pending_approvals').insert([
+            {
+                "user_id": user_id,
+                "approval_type": "rollover_suggestion",
+                "data": {
+                    "task_id": task_id,
+                    "recommendation": recommendation
+                },
+                "status": "pending",
+                "created_at": created_at
+            }
+            for task_id, recommendation in recommendations.items()
+        ]))
 
     async def auto_detect_rollovers(self, user_id: str) -> list[str]:
         """
@@ -114,23 +293,36 @@ Return as JSON:
         """
 
         # Find tasks that are overdue by 3+ days and still pending
-        three_days_ago = (datetime.now() - timedelta(days=3)).isoformat()
+        three_days_ago = (datetime.now(timezone.utc) - timedelta(days=ROLLOVER_MIN_OVERDUE_DAYS)).isoformat()
 
-        rollover_tasks = supabase.table('tasks')\
-            .select('id')\
-            .eq('user_id', user_id)\
-            .eq('status', 'pending')\
-            .lt('due_date', three_days_ago)\
-            .execute()
+        rollover_tasks, recent_titles = await asyncio.gather(
+            execute_async(
+                supabase.table('tasks')
+                .select(ROLLOVER_TASK_COLUMNS)
+                .eq('user_id', user_id)
+                .eq('status', 'pending')
+                .lt('due_date', three_days_ago)
+            ),
+            self._recent_completed_titles(user_id)
+        )
 
-        task_ids = [t['id'] for t in rollover_tasks.data]
+        task_rows = rollover_tasks.data
+        task_ids = [t['id'] for t in task_rows]
+        batches = [
+            task_rows[i:i + ROLLOVER_BATCH_SIZE]
+            for i in range(0, len(task_rows), ROLLOVER_BATCH_SIZE)
+        ]
 
-        # Analyze each one
-        for task_id in task_ids:
-            try:
-                await self.analyze_rollover_task(task_id, user_id)
-            except Exception as e:
-                print(f"Failed to analyze rollover task {task_id}: {str(e)}")
-                continue
+        # One LLM call per batch, with the batches themselves run concurrently
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_ROLLOVER_ANALYSES)
+
+        async def analyze(batch: List[Dict[str, Any]]) -> None:
+            async with semaphore:
+                try:
+                    await self.analyze_rollover_tasks_batch(batch, user_id, recent_titles)
+                except Exception as e:
+                    logger.warning(f"Failed to analyze rollover batch {[t['id'] for t in batch]}: {str(e)}")
+
+        await asyncio.gather(*(analyze(batch) for batch in batches))
 
         return task_ids
@@ -1,32 +1,48 @@
-"""Auto-Scheduler Agent using Claude Haiku 4.5."""
+"""Auto-Scheduler Agent (provider chosen by LLM_PROVIDER_MAP['task_scheduling'])."""
 
-from anthropic import Anthropic
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Optional
-import json
+import hashlib
+import logging
+import orjson
+from pydantic import ValidationError
 from config import settings
-from database import supabase
-
-
-client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
-
-
-SCHEDULING_PROMPT = """You are an expert time management assistant. Given the following tasks and calendar constraints, create an optimal schedule.
-
-Current date/time: {current_time}
-User timezone: {timezone}
+from database import supabase, execute_async
+from llm_provider import llm_provider
+from agents._prompt_cache import build_cached_system
+from models.task import ScheduleProposal
+from cache.redis_client import cache, CacheKeys, CacheDuration
+
+
+logger = logging.getLogger(__name__)
+
+# Enforced by Anthropic's structured-output tool; Groq JSON mode takes the
+# shape from SCHEDULING_SCHEMA in the prompt
+SCHEDULE_JSON_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "scheduled_blocks": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "task_id": {"type": "string"},
+                    "start_time": {"type": "string"},
+                    "end_time": {"type": "string"},
+                    "reasoning": {"type": "string"}
+                },
+                "required": ["task_id", "start_time", "end_time", "reasoning"]
+            }
+        }
+    },
+    "required": ["scheduled_blocks"]
+}
 
-Tasks to schedule:
-{tasks_json}
 
-Existing calendar events (avoid conflicts):
-{calendar_json}
-
-User preferences:
-- Work hours: {work_hours}
-- Break frequency: Every {break_frequency} minutes
-- Deep work preference: {deep_work_preference} (morning/afternoon/evening)
-- Average energy level: {energy_level} (high/medium/low)
+# Static instructions and output schema go in the system prompt, the per-user
+# data in SCHEDULING_PROMPT. Together they are far below Haiku's minimum
+# cacheable prefix, so build_cached_system leaves them unmarked.
+SCHEDULING_SYSTEM = """You are an expert time management assistant. Given the user's tasks and calendar constraints, create an optimal schedule.
 
 Scheduling principles:
 1. **Time-box tasks** based on estimated duration (add 10-20% buffer)
@@ -37,18 +53,6 @@ Scheduling principles:
 6. **Match task difficulty to energy levels** (e.g., deep work in morning if that's when energy is high)
 7. **Be realistic** - don't overpack the schedule
 
-Create a schedule for the next 7 days. Return a JSON array of scheduled blocks:
-
-[
-  {{
-    "task_id": "uuid",
-    "start_time": "ISO datetime (YYYY-MM-DDTHH:MM:SS)",
-    "end_time": "ISO datetime (YYYY-MM-DDTHH:MM:SS)",
-    "reasoning": "Brief explanation of why scheduled at this time (e.g., 'High priority, morning slot when energy is highest')"
-  }},
-  ...
-]
-
 Important:
 - Only schedule during work hours
 - Leave some unscheduled time for flexibility
@@ -56,12 +60,47 @@ Important:
 - Don't schedule more than 6 hours of focused work per day
 """
 
+SCHEDULING_SCHEMA = """Create a schedule for the next 7 days. Return a JSON object with the scheduled blocks:
+
+{
+  "scheduled_blocks": [
+    {
+      "task_id": "uuid",
+      "start_time": "ISO datetime (YYYY-MM-DDTHH:MM:SS)",
+      "end_time": "ISO datetime (YYYY-MM-DDTHH:MM:SS)",
+      "reasoning": "Brief explanation of why scheduled at this time (e.g., 'High priority, morning slot when energy is highest')"
+    },
+    ...
+  ]
+}
+"""
 
-def auto_schedule_tasks(
+SCHEDULING_PROMPT = """Current date/time: {current_time}
+User timezone: {timezone}
+
+Tasks to schedule:
+{tasks_json}
+{calendar_section}
+User preferences:
+- Work hours: {work_hours}
+- Break frequency: Every {break_frequency} minutes
+- Deep work preference: {deep_work_preference} (morning/afternoon/evening)
+- Average energy level: {energy_level} (high/medium/low)
+"""
+
+# Only included when there are events, so an empty calendar costs no tokens
+SCHEDULING_CALENDAR_SECTION = """
+Existing calendar events (avoid conflicts):
+{calendar_json}
+"""
+
+
+async def auto_schedule_tasks(
     tasks: List[Dict],
     calendar_events: List[Dict],
     user_preferences: Dict,
-    user_id: str
+    user_id: str,
+    reschedule: bool = False
 ) -> Dict:
     """Auto-schedule tasks onto calendar with smart time-boxing.
 
@@ -70,21 +109,34 @@ def auto_schedule_tasks(
         calendar_events: Existing calendar events to avoid
         user_preferences: User scheduling preferences
         user_id: User UUID for creating approvals
+        reschedule: Also place tasks that already have an upcoming block
+            (for tasks the user picked explicitly)
 
     Returns:
         Dictionary containing:
         - scheduled_blocks: List of scheduled time blocks
-        - approval_id: ID of pending approval record
+        - approval_id: ID of pending approval record (None if nothing was proposed)
         - usage: Token usage and cost
     """
-    current_time = datetime.now().isoformat()
+    # Nothing left to place - skip the LLM call entirely
+    now = datetime.now(timezone.utc)
+    if not reschedule:
+        tasks = [task for task in tasks if not _is_scheduled_ahead(task, now)]
+    if not tasks:
+        return {
+            "scheduled_blocks": [],
+            "approval_id": None,
+            "usage": {"tokens": 0, "cost_usd": 0.0}
+        }
+
+    current_time = now.isoformat()
 
     # Extract preferences with defaults
     work_hours = user_preferences.get("work_hours", "9:00-17:00")
     break_frequency = user_preferences.get("break_frequency", 90)
     deep_work_preference = user_preferences.get("deep_work_preference", "morning")
     energy_level = user_preferences.get("energy_level", "medium")
-    timezone = user_preferences.get("timezone", "UTC")
+    user_timezone = user_preferences.get("timezone", "UTC")
 
     # Prepare tasks JSON (include only relevant fields)
     tasks_simplified = [
@@ -94,7 +146,7 @@ def auto_schedule_tasks(
             "priority": task.get("priority", "medium"),
             "estimated_duration_minutes": task.get("estimated_duration_minutes", 60),
             "due_date": task.get("due_date"),
-            "description": task.get("description", "")[:100]  # Truncate long descriptions
+            "description": (task.get("description") or "")[:100]  # Truncate long descriptions
         }
         for task in tasks
     ]
@@ -110,11 +162,29 @@ def auto_schedule_tasks(
         for event in calendar_events
     ]
 
+    # Identical retries (same tasks, calendar and preferences on the same day)
+    # get the earlier proposal and its pending approval back
+    input_hash = hashlib.sha256(orjson.dumps(
+        [tasks_simplified, events_simplified, user_preferences, now.date()],
+        option=orjson.OPT_SORT_KEYS,
+        default=str
+    )).hexdigest()
+    cache_key = CacheKeys.auto_schedule(user_id, input_hash)
+    cached = await _cached_schedule(cache_key)
+    if cached is not None:
+        # Only hand back a proposal the user can still act on
+        if await _approval_pending(cached.get("approval_id"), user_id, now):
+            return {**cached, "usage": {"tokens": 0, "cost_usd": 0.0}}
+        await _drop_schedule(cache_key)
+
     prompt = SCHEDULING_PROMPT.format(
         current_time=current_time,
-        timezone=timezone,
-        tasks_json=json.dumps(tasks_simplified, indent=2),
-        calendar_json=json.dumps(events_simplified, indent=2),
+        timezone=user_timezone,
+        # Compact JSON: fewer input tokens than indented, and the model reads it fine
+        tasks_json=orjson.dumps(tasks_simplified).decode(),
+        calendar_section=SCHEDULING_CALENDAR_SECTION.format(
+            calendar_json=orjson.dumps(events_simplified).decode()
+        ) if events_simplified else "",
         work_hours=work_hours,
         break_frequency=break_frequency,
         deep_work_preference=deep_work_preference,
@@ -122,18 +192,21 @@ def auto_schedule_tasks(
     )
 
     try:
-        response = client.messages.create(
-            model=settings.CLAUDE_MODEL,
+        response = await llm_provider.aget_completion(
+            task_type='task_scheduling',
+            prompt=prompt,
             max_tokens=settings.CLAUDE_MAX_TOKENS,
             temperature=0.5,  # Moderate creativity for scheduling
-            messages=[{"role": "user", "content": prompt}]
+            system_prompt=build_cached_system(SCHEDULING_SYSTEM, SCHEDULING_SCHEMA),
+            json_schema=SCHEDULE_JSON_SCHEMA
         )
 
-        # Parse JSON response
-        scheduled_blocks = json.loads(response.content[0].text)
+        # Parse and validate the JSON response, back to plain JSON-ready dicts
+        proposal = ScheduleProposal.model_validate_json(response["text"])
+        scheduled_blocks = proposal.model_dump(mode="json")["scheduled_blocks"]
 
         # Create pending approval record
-        approval = create_pending_approval(
+        approval = await create_pending_approval(
             user_id=user_id,
             approval_type="task_schedule",
             description=f"Schedule {len(scheduled_blocks)} tasks over the next 7 days",
@@ -142,18 +215,21 @@ def auto_schedule_tasks(
 
         # Calculate usage
         usage = {
-            "tokens": response.usage.input_tokens + response.usage.output_tokens,
-            "cost_usd": calculate_cost(response.usage.input_tokens, response.usage.output_tokens)
+            "tokens": response["usage"]["input_tokens"] + response["usage"]["output_tokens"],
+            "cost_usd": response["usage"]["cost_usd"],
+            "provider": response["provider"]
         }
 
-        return {
+        result = {
             "scheduled_blocks": scheduled_blocks,
-            "approval_id": approval["id"],
-            "usage": usage
+            "approval_id": approval["id"]
         }
+        await _store_schedule(cache_key, result)
+
+        return {**result, "usage": usage}
 
-    except json.JSONDecodeError:
-        # Handle JSON parsing errors
+    except ValidationError:
+        # Handle JSON parsing and schema errors
         return {
             "scheduled_blocks": [],
             "approval_id": None,
@@ -169,7 +245,61 @@ def auto_schedule_tasks(
         }
 
 
-def create_pending_approval(
+async def _cached_schedule(key: str) -> Optional[Dict]:
+    try:
+        cached = await cache.get(key)
+    except Exception as e:
+        logger.warning(f"Schedule cache read failed: {str(e)}")
+        return None
+    return cached if isinstance(cached, dict) else None
+
+
+async def _store_schedule(key: str, result: Dict) -> None:
+    try:
+        await cache.set(key, result, expire=CacheDuration.MEDIUM)
+    except Exception as e:
+        logger.warning(f"Schedule cache write failed: {str(e)}")
+
+
+async def _drop_schedule(key: str) -> None:
+    try:
+        await cache.delete(key)
+    except Exception as e:
+        logger.warning(f"Schedule cache delete failed: {str(e)}")
+
+
+async def _approval_pending(approval_id: Optional[str], user_id: str, now: datetime) -> bool:
+    """True if the approval is still awaiting a response and hasn't expired."""
+    if not approval_id:
+        return False
+    result = await execute_async(
+        supabase.table("pending_approvals")
+        .select("status, expires_at")
+        .eq("id", approval_id)
+        .eq("user_id", user_id)
+    )
+    if not result.data:
+        return False
+    approval = result.data[0]
+    if approval["status"] != "pending":
+        return False
+    expires_at = approval.get("expires_at")
+    return not expires_at or datetime.fromisoformat(expires_at) > now
+
+
+def _is_scheduled_ahead(task: Dict, now: datetime) -> bool:
+    """True if the task already has a block that hasn't started yet."""
+    scheduled_start = task.get("scheduled_start")
+    if not scheduled_start:
+        return False
+    if isinstance(scheduled_start, str):
+        scheduled_start = datetime.fromisoformat(scheduled_start)
+    if scheduled_start.tzinfo is None:
+        scheduled_start = scheduled_start.replace(tzinfo=timezone.utc)
+    return scheduled_start >= now
+
+
+async def create_pending_approval(
     user_id: str,
     approval_type: str,
     description: str,
@@ -186,15 +316,15 @@ def create_pending_approval(
     Returns:
         Created approval record
     """
-    expires_at = (datetime.now() + timedelta(hours=24)).isoformat()
+    expires_at = (datetime.now(timezone.utc) + timedelta(hours=24)).isoformat()
 
-    result = supabase.table("pending_approvals").insert({
+    result = await execute_async(supabase.table("pending_approvals").insert({
         "user_id": user_id,
         "approval_type": approval_type,
         "description": description,
         "proposed_changes": proposed_changes,
         "expires_at": expires_at
-    }).execute()
+    }))
 
     return result.data[0] if result.data else {}
 
@@ -223,26 +353,22 @@ def apply_schedule(approval_id: str, user_id: str) -> Dict:
     approval = result.data[0]
     scheduled_blocks = approval["proposed_changes"]
 
-    # Update tasks with scheduled times
-    updated_count = 0
-    for block in scheduled_blocks:
-        task_id = block["task_id"]
-        update_result = supabase.table("tasks")\
-            .update({
-                "scheduled_start": block["start_time"],
-                "scheduled_end": block["end_time"],
-                "updated_at": datetime.utcnow().isoformat()
-            })\
-            .eq("id", task_id)\
-            .eq("user_id", user_id)\
-            .execute()
-
-        if update_result.data:
-            updated_count += 1
+    # Update tasks with scheduled times, all blocks in one statement
+    try:
+        updated_count = supabase.rpc("apply_task_schedule", {
+            "p_user_id": user_id,
+            "p_blocks": [
+                {"task_id": block["task_id"], "start_time": block["start_time"], "end_time": block["end_time"]}
+                for block in scheduled_blocks
+            ]
+        }).execute().data or 0
+    except Exception as e:
+        logger.warning(f"apply_task_schedule unavailable, updating tasks one by one: {str(e)}")
+        updated_count = _apply_schedule_blocks(scheduled_blocks, user_id)
 
     # Mark approval as processed
     supabase.table("pending_approvals")\
-        .update({"responded_at": datetime.utcnow().isoformat()})\
+        .update({"responded_at": datetime.now(timezone.utc).isoformat()})\
         .eq("id", approval_id)\
         .execute()
 
@@ -253,8 +379,22 @@ def apply_schedule(approval_id: str, user_id: str) -> Dict:
     }
 
 
-def calculate_cost(input_tokens: int, output_tokens: int) -> float:
-    """Calculate cost for Claude Haiku 4.5."""
-    input_cost = (input_tokens / 1_000_000) * settings.CLAUDE_HAIKU_INPUT_COST
-    output_cost = (output_tokens / 1_000_000) * settings.CLAUDE_HAIKU_OUTPUT_COST
-    return round(input_cost + output_cost, 6)
+def _apply_schedule_blocks(scheduled_blocks: List[Dict], user_id: str) -> int:
+    """Per-block fallback for apply_schedule when the RPC isn't deployed."""
+    updated_at = datetime.now(timezone.utc).isoformat()
+    updated_count = 0
+    for block in scheduled_blocks:
+        update_result = supabase.table("tasks")\
+            .update({
+                "scheduled_start": block["start_time"],
+                "scheduled_end": block["end_time"],
+                "updated_at": updated_at
+            })\
+            .eq("id", block["task_id"])\
+            .eq("user_id", user_id)\
+            .execute()
+
+        if update_result.data:
+            updated_count += 1
+    return updated_count
+
@@ -2,30 +2,79 @@
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from gotrue.types import User
 from jose import JWTError, jwt
 from typing import Optional
+from datetime import timedelta
+import asyncio
+import hashlib
+import logging
+import time
 from config import settings
-from database import supabase
+from database import supabase, invalidate_user_profile
+from cache.redis_client import cache, CacheKeys, CacheDuration
 
 
+logger = logging.getLogger(__name__)
+
 security = HTTPBearer()
 
 
-def verify_token(token: str) -> Optional[dict]:
+def _token_cache_key(token: str) -> str:
+    """Redis key for a verified token - hashed so raw JWTs never sit in the cache."""
+    return CacheKeys.auth_token(hashlib.sha256(token.encode()).hexdigest())
+
+
+def _token_cache_ttl(token: str) -> Optional[timedelta]:
+    """Cache for CacheDuration.SHORT, but never past the token's own exp claim."""
+    try:
+        expires_at = jwt.get_unverified_claims(token).get("exp")
+    except JWTError:
+        return None
+    if not expires_at:
+        return CacheDuration.SHORT
+    remaining = int(expires_at - time.time())
+    if remaining <= 0:
+        return None
+    return min(CacheDuration.SHORT, timedelta(seconds=remaining))
+
+
+async def verify_token(token: str) -> Optional[User]:
     """Verify JWT token from Supabase Auth.
 
+    Verified users are cached for up to CacheDuration.SHORT, so most
+    requests skip the Supabase Auth round trip.
+
     Args:
         token: JWT access token
 
     Returns:
-        Decoded token payload or None
+        Supabase user or None
     """
+    ttl = _token_cache_ttl(token)
+    if ttl is None:
+        # Malformed or already expired - Supabase would reject it too
+        return None
+
+    async def load_user() -> Optional[dict]:
+        try:
+            # Verify with Supabase
+            response = await asyncio.to_thread(supabase.auth.get_user, token)
+        except Exception as e:
+            return None
+        user = response.user if response else None
+        return user.model_dump(mode="json") if user else None
+
+    user = await cache.get_or_compute(_token_cache_key(token), load_user, expire=ttl)
+    return User.model_validate(user) if isinstance(user, dict) else None
+
+
+async def invalidate_token(token: str) -> None:
+    """Drop a token's cached verification (e.g. on logout)."""
     try:
-        # Verify with Supabase
-        user = supabase.auth.get_user(token)
-        return user.user if user else None
+        await cache.delete(_token_cache_key(token))
     except Exception as e:
-        return None
+        logger.warning(f"Auth cache delete failed: {str(e)}")
 
 
 async def get_current_user(
@@ -43,7 +92,7 @@ async def get_current_user(
         HTTPException: If token is invalid or user not found
     """
     token = credentials.credentials
-    user = verify_token(token)
+    user = await verify_token(token)
 
     if not user:
         raise HTTPException(
@@ -101,4 +150,5 @@ class AuthHelper:
         }
 
         result = supabase.table("user_profiles").insert(profile).execute()
+        invalidate_user_profile(user_id)
         return result.data[0]
@@ -1,12 +1,28 @@
 import redis.asyncio as aioredis
-from typing import Optional, Any
-import json
+from collections import OrderedDict
+from typing import Optional, Any, Awaitable, Callable, Dict, List, Tuple
+from fnmatch import fnmatchcase
+import logging
+import orjson
+import time
 from datetime import timedelta
 from config import settings
 
+logger = logging.getLogger(__name__)
+
+# Process-local layer in front of Redis for hot keys. Entries live briefly so
+# writes made by other workers show up within LOCAL_CACHE_TTL_SECONDS.
+LOCAL_CACHE_SIZE = 1024
+LOCAL_CACHE_TTL_SECONDS = 30.0
+
+# Keys per SCAN page and per UNLINK in invalidate_pattern, so memory stays
+# bounded and no single command blocks Redis on a large invalidation
+INVALIDATE_BATCH_SIZE = 500
+
 class RedisCache:
     def __init__(self):
         self.client: Optional[aioredis.Redis] = None
+        self._local: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
 
     async def connect(self):
         """Connect to Redis"""
@@ -22,17 +38,75 @@ class RedisCache:
             await self.client.close()
 
     async def get(self, key: str) -> Optional[Any]:
-        """Get value from cache"""
+        """Get value from cache (process-local copy first, then Redis)
+
+        Values from the local layer are shared objects - don't mutate them.
+        """
         if not self.client:
             return None
 
-        value = await self.client.get(key)
-        if value:
+        cached = self._local.get(key)
+        if cached is not None:
+            if time.monotonic() - cached[0] < LOCAL_CACHE_TTL_SECONDS:
+                self._local.move_to_end(key)
+                return cached[1]
+            del self._local[key]
+
+        value = self._decode(await self.client.get(key))
+        if value is not None:
+            self._local_set(key, value)
+        return value
+
+    async def get_or_compute(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Optional[Any]]],
+        expire: Optional[timedelta] = None
+    ) -> Optional[Any]:
+        """Return the cached value, or await loader() and cache what it returns
+
+        Cache errors count as misses; a None from loader is not cached.
+        """
+        try:
+            value = await self.get(key)
+        except Exception as e:
+            logger.warning(f"Cache read failed for {key}: {str(e)}")
+            value = None
+        if value is not None:
+            return value
+
+        value = await loader()
+        if value is not None:
+            try:
+                await self.set(key, value, expire=expire)
+            except Exception as e:
+                logger.warning(f"Cache write failed for {key}: {str(e)}")
+        return value
+
+    def _local_set(self, key: str, value: Any) -> None:
+        self._local[key] = (time.monotonic(), value)
+        self._local.move_to_end(key)
+        if len(self._local) > LOCAL_CACHE_SIZE:
+            self._local.popitem(last=False)
+
+    async def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        """Get several values in one round trip (None for each miss)"""
+        if not self.client or not keys:
+            return [None] * len(keys)
+
+        return [self._decode(value) for value in await self.client.mget(keys)]
+
+    @staticmethod
+    def _decode(value: Optional[str]) -> Optional[Any]:
+        if not value:
+            return None
+        # set() only JSON-encodes dicts and lists; anything else was stored as-is
+        if value[0] in "{[":
             try:
-                return json.loads(value)
-            except json.JSONDecodeError:
-                return value
-        return None
+                return orjson.loads(value)
+            except orjson.JSONDecodeError:
+                pass
+        return value
 
     async def set(
         self,
@@ -44,8 +118,9 @@ class RedisCache:
         if not self.client:
             return False
 
+        self._local.pop(key, None)
         if isinstance(value, (dict, list)):
-            value = json.dumps(value)
+            value = orjson.dumps(value)
 
         if expire:
             await self.client.setex(key, int(expire.total_seconds()), value)
@@ -54,11 +129,36 @@ class RedisCache:
 
         return True
 
+    async def mset(
+        self,
+        mapping: Dict[str, Any],
+        expire: Optional[timedelta] = None
+    ) -> bool:
+        """Set several values in one pipelined round trip (MSET itself can't expire keys)"""
+        if not self.client:
+            return False
+        if not mapping:
+            return True
+
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            self._local.pop(key, None)
+            if isinstance(value, (dict, list)):
+                value = orjson.dumps(value)
+            if expire:
+                pipe.setex(key, int(expire.total_seconds()), value)
+            else:
+                pipe.set(key, value)
+        await pipe.execute()
+
+        return True
+
     async def delete(self, key: str) -> bool:
         """Delete key from cache"""
         if not self.client:
             return False
 
+        self._local.pop(key, None)
         await self.client.delete(key)
         return True
 
@@ -74,12 +174,19 @@ class RedisCache:
         if not self.client:
             return
 
+        for key in [k for k in self._local if fnmatchcase(k, pattern)]:
+            del self._local[key]
+
+        # UNLINK frees the values in a background thread on the server
         keys = []
-        async for key in self.client.scan_iter(match=pattern):
+        async for key in self.client.scan_iter(match=pattern, count=INVALIDATE_BATCH_SIZE):
             keys.append(key)
+            if len(keys) >= INVALIDATE_BATCH_SIZE:
+                await self.client.unlink(*keys)
+                keys.clear()
 
         if keys:
-            await self.client.delete(*keys)
+            await self.client.unlink(*keys)
 
 # Global instance
 cache = RedisCache()
@@ -104,10 +211,22 @@ class CacheKeys:
     def classification(item_id: str) -> str:
         return f"classification:{item_id}"
 
+    @staticmethod
+    def classification_result(input_hash: str) -> str:
+        return f"classification:input:{input_hash}"
+
+    @staticmethod
+    def auth_token(token_hash: str) -> str:
+        return f"auth:{token_hash}"
+
     @staticmethod
     def schedule(user_id: str, date: str) -> str:
         return f"schedule:{user_id}:{date}"
 
+    @staticmethod
+    def auto_schedule(user_id: str, input_hash: str) -> str:
+        return f"schedule:{user_id}:auto:{input_hash}"
+
 # Cache durations
 class CacheDuration:
     SHORT = timedelta(minutes=5)
@@ -11,6 +11,16 @@ class Settings(BaseSettings):
     SUPABASE_URL: str
     SUPABASE_SERVICE_KEY: str
     SUPABASE_ANON_KEY: str
+    SUPABASE_MAX_CONCURRENT_QUERIES: int = 10
+    SUPABASE_MAX_CONNECTIONS: int = 50
+    SUPABASE_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    SUPABASE_TIMEOUT_SECONDS: float = 10.0
+    SUPABASE_CONNECT_TIMEOUT_SECONDS: float = 3.0
+
+    # Direct Postgres (optional) - hot read paths use an asyncpg pool when set
+    DATABASE_URL: Optional[str] = None
+    DATABASE_POOL_MIN_SIZE: int = 5
+    DATABASE_POOL_MAX_SIZE: int = 20
 
     # Anthropic API
     ANTHROPIC_API_KEY: str
@@ -44,6 +54,11 @@ class Settings(BaseSettings):
     CLAUDE_MAX_TOKENS: int = 4000
     CLAUDE_TEMPERATURE: float = 0.5
 
+    # Shared Anthropic HTTP connection pool
+    ANTHROPIC_MAX_CONNECTIONS: int = 64
+    ANTHROPIC_MAX_KEEPALIVE_CONNECTIONS: int = 32
+    LLM_TIMEOUT_SECONDS: float = 60.0
+
     # Groq Model Configuration
     GROQ_MODEL: str = "llama-3.3-70b-versatile"
     GROQ_MAX_TOKENS: int = 4000
@@ -52,9 +67,20 @@ class Settings(BaseSettings):
     # Cost tracking (per million tokens)
     CLAUDE_HAIKU_INPUT_COST: float = 1.0
     CLAUDE_HAIKU_OUTPUT_COST: float = 5.0
+    CLAUDE_HAIKU_CACHE_WRITE_COST: float = 1.25  # Prompt cache writes (1.25x input)
+    CLAUDE_HAIKU_CACHE_WRITE_1H_COST: float = 2.0  # 1-hour TTL cache writes (2x input)
+    CLAUDE_HAIKU_CACHE_READ_COST: float = 0.10   # Prompt cache hits (0.1x input)
+    CLAUDE_BATCH_DISCOUNT: float = 0.5           # Message Batches API price multiplier
     GROQ_LLAMA_INPUT_COST: float = 0.59
     GROQ_LLAMA_OUTPUT_COST: float = 0.79
 
+    # Use the full PARA rubric instead of the compact classification prompt (for evals)
+    PARA_VERBOSE_PROMPT: bool = False
+
+    # Local PARA classifier (trained with `python -m agents.local_classifier <path>`)
+    PARA_LOCAL_MODEL_PATH: Optional[str] = None
+    PARA_LOCAL_CONFIDENCE_THRESHOLD: float = 0.7
+
     # LLM Provider Mapping (for cost optimization)
     LLM_PROVIDER_MAP: dict = {
         'para_classification': 'groq',      # Llama 3.3 70B (free tier)
@@ -62,6 +88,8 @@ class Settings(BaseSettings):
         'pattern_analysis': 'deterministic', # SQL queries + templates
         'weekly_review': 'deterministic',    # Jinja2 templates
         'reprioritization': 'groq',         # Llama 3.3 70B (paid if needed)
+        'task_scheduling': 'groq',          # Llama 3.3 70B (JSON mode)
+        'rollover_analysis': 'groq',        # Llama 3.3 70B (JSON mode)
         'conversational_agent': 'anthropic', # Claude Haiku (tool use)
     }
 
@@ -1,9 +1,62 @@
 """Database client and helper functions for Supabase."""
 
+from collections import OrderedDict
 from supabase import create_client, Client
+from postgrest import SyncPostgrestClient
+from postgrest.utils import SyncClient as PostgrestSyncClient
 from typing import Dict, List, Any, Optional
-from datetime import datetime
+from datetime import date, datetime
+from decimal import Decimal
+from uuid import UUID
 from config import settings
+import asyncio
+import httpx
+import logging
+import orjson
+import time
+
+try:
+    import asyncpg
+    ASYNCPG_AVAILABLE = True
+except ImportError:
+    ASYNCPG_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+# One process-wide PostgREST pool: every .execute() reuses a warm keep-alive
+# connection instead of paying a fresh TLS handshake under bursty traffic
+_postgrest_limits = httpx.Limits(
+    max_connections=settings.SUPABASE_MAX_CONNECTIONS,
+    max_keepalive_connections=settings.SUPABASE_MAX_KEEPALIVE_CONNECTIONS
+)
+_postgrest_timeout = httpx.Timeout(
+    settings.SUPABASE_TIMEOUT_SECONDS,
+    connect=settings.SUPABASE_CONNECT_TIMEOUT_SECONDS
+)
+
+
+def _init_pooled_postgrest_client(rest_url, headers, schema, timeout=None, verify=True, proxy=None):
+    """Build the PostgREST client on a session with explicit pool limits.
+
+    supabase-py 2.x exposes no option for the httpx client, so this replaces
+    the default session. The supabase client calls it again whenever auth
+    state resets PostgREST, so the tuned pool survives re-creation.
+    """
+    postgrest = SyncPostgrestClient(rest_url, headers=headers, schema=schema, verify=verify, proxy=proxy)
+    default_session = postgrest.session
+    postgrest.session = PostgrestSyncClient(
+        base_url=default_session.base_url,
+        headers=default_session.headers,
+        timeout=_postgrest_timeout,
+        limits=_postgrest_limits,
+        verify=verify,
+        proxy=proxy,
+        follow_redirects=True,
+        http2=True
+    )
+    default_session.close()
+    return postgrest
 
 
 # Initialize Supabase client
@@ -11,6 +64,136 @@ supabase: Client = create_client(
     settings.SUPABASE_URL,
     settings.SUPABASE_SERVICE_KEY
 )
+supabase._init_postgrest_client = _init_pooled_postgrest_client
+
+# Caps concurrent queries issued through execute_async so gathers can't exhaust the pool
+_query_semaphore = asyncio.Semaphore(settings.SUPABASE_MAX_CONCURRENT_QUERIES)
+
+
+async def execute_async(query) -> Any:
+    """Execute a Supabase query builder without blocking the event loop.
+
+    The supabase-py client is synchronous, so awaiting code that calls
+    .execute() directly runs queries one after another. This runs the
+    request in a worker thread so several queries can be gathered.
+
+    Args:
+        query: A built query, e.g. supabase.table("tasks").select("id").eq(...)
+
+    Returns:
+        The query's APIResponse
+    """
+    async with _query_semaphore:
+        return await asyncio.to_thread(query.execute)
+
+
+# asyncpg pool for hot read paths; None unless DATABASE_URL is set and reachable
+pg_pool = None
+
+
+async def connect_pg_pool() -> None:
+    """Open the asyncpg pool at startup (no-op without DATABASE_URL)."""
+    global pg_pool
+    if not settings.DATABASE_URL or not ASYNCPG_AVAILABLE:
+        return
+    try:
+        pg_pool = await asyncpg.create_pool(
+            settings.DATABASE_URL,
+            min_size=settings.DATABASE_POOL_MIN_SIZE,
+            max_size=settings.DATABASE_POOL_MAX_SIZE,
+            # Supabase's pooler runs in transaction mode, which breaks prepared statement caching
+            statement_cache_size=0,
+            init=_init_pg_connection
+        )
+        logger.info("Postgres pool connected")
+    except Exception as e:
+        logger.warning(f"Postgres pool unavailable, reads go through PostgREST: {str(e)}")
+        pg_pool = None
+
+
+async def _init_pg_connection(connection) -> None:
+    """Decode json/jsonb columns to Python objects, as PostgREST does."""
+    for type_name in ("json", "jsonb"):
+        await connection.set_type_codec(
+            type_name,
+            encoder=lambda value: orjson.dumps(value).decode(),
+            decoder=orjson.loads,
+            schema="pg_catalog"
+        )
+
+
+async def close_pg_pool() -> None:
+    global pg_pool
+    if pg_pool is not None:
+        await pg_pool.close()
+        pg_pool = None
+
+
+def _json_value(value: Any) -> Any:
+    """Match PostgREST's JSON encoding so both read paths return the same shapes."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+async def fetch_rows(sql: str, *args) -> Optional[List[Dict]]:
+    """Run a read on the asyncpg pool, returning rows shaped like PostgREST's.
+
+    Returns None when no pool is configured; callers then fall back to the
+    PostgREST query through execute_async.
+    """
+    if pg_pool is None:
+        return None
+    rows = await pg_pool.fetch(sql, *args)
+    return [{key: _json_value(value) for key, value in row.items()} for row in rows]
+
+
+# Per-process cache of the profile settings read on hot paths (timezone and
+# preferences change rarely; a stale read lasts at most the TTL)
+USER_PROFILE_CACHE_TTL_SECONDS = 300.0
+USER_PROFILE_CACHE_SIZE = 10_000
+_user_profile_cache: "OrderedDict[str, tuple]" = OrderedDict()
+
+
+async def get_user_profile(user_id: str) -> Dict:
+    """Get a user's timezone and para_preferences, cached for a few minutes.
+
+    Returns:
+        {"timezone": ..., "para_preferences": ...}, or {} if there is no profile
+    """
+    cached = _user_profile_cache.get(user_id)
+    if cached is not None and time.monotonic() - cached[0] < USER_PROFILE_CACHE_TTL_SECONDS:
+        _user_profile_cache.move_to_end(user_id)
+        return cached[1]
+
+    rows = await fetch_rows(
+        "SELECT timezone, para_preferences FROM user_profiles WHERE id = $1",
+        user_id
+    )
+    if rows is None:
+        response = await execute_async(
+            supabase.table("user_profiles")
+            .select("timezone, para_preferences")
+            .eq("id", user_id)
+            .limit(1)
+        )
+        rows = response.data
+    profile = rows[0] if rows else {}
+
+    _user_profile_cache[user_id] = (time.monotonic(), profile)
+    _user_profile_cache.move_to_end(user_id)
+    if len(_user_profile_cache) > USER_PROFILE_CACHE_SIZE:
+        _user_profile_cache.popitem(last=False)
+    return profile
+
+
+def invalidate_user_profile(user_id: str) -> None:
+    """Drop a cached profile after it is written."""
+    _user_profile_cache.pop(user_id, None)
 
 
 class DatabaseHelper:
@@ -42,7 +42,7 @@ async def generate_weekly_reviews():
 
                 # Generate review
                 logger.info(f"Generating review for user {user['id']}")
-                review = generate_weekly_review(
+                review = await generate_weekly_review(
                     user_id=user['id'],
                     week_start=week_start
                 )
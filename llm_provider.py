@@ -4,14 +4,23 @@ Handles routing LLM calls to appropriate providers (Groq, Anthropic) based on ta
 Optimized for cost: 67% savings by using Groq free tier where appropriate.
 """
 
-from anthropic import Anthropic
-from groq import Groq
+from anthropic import Anthropic, AsyncAnthropic
+from groq import Groq, AsyncGroq
 from config import settings
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union
+import httpx
+import json
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+# Tool name used to force schema-conforming output from Anthropic models
+STRUCTURED_OUTPUT_TOOL = "structured_output"
+
+# A plain system prompt, or Anthropic system blocks carrying their own cache_control
+SystemPrompt = Union[str, List[Dict[str, Any]]]
+
 
 class LLMProvider:
     """
@@ -20,12 +29,25 @@ class LLMProvider:
     """
 
     def __init__(self):
-        # Initialize clients
-        self.anthropic_client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+        # Initialize clients once so their connection pools stay warm across calls
+        anthropic_limits = httpx.Limits(
+            max_keepalive_connections=settings.ANTHROPIC_MAX_KEEPALIVE_CONNECTIONS,
+            max_connections=settings.ANTHROPIC_MAX_CONNECTIONS
+        )
+        self.anthropic_client = Anthropic(
+            api_key=settings.ANTHROPIC_API_KEY,
+            http_client=httpx.Client(limits=anthropic_limits, timeout=settings.LLM_TIMEOUT_SECONDS)
+        )
+        self.async_anthropic_client = AsyncAnthropic(
+            api_key=settings.ANTHROPIC_API_KEY,
+            http_client=httpx.AsyncClient(limits=anthropic_limits, timeout=settings.LLM_TIMEOUT_SECONDS)
+        )
 
         self.groq_client = None
+        self.async_groq_client = None
         if settings.GROQ_API_KEY:
             self.groq_client = Groq(api_key=settings.GROQ_API_KEY)
+            self.async_groq_client = AsyncGroq(api_key=settings.GROQ_API_KEY)
         else:
             logger.warning("GROQ_API_KEY not set - falling back to Anthropic for all tasks")
 
@@ -37,7 +59,9 @@ class LLMProvider:
         prompt: str,
         max_tokens: int = 1000,
         temperature: float = None,
-        system_prompt: Optional[str] = None
+        system_prompt: Optional[SystemPrompt] = None,
+        cache_system_prompt: bool = False,
+        json_schema: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Get completion from appropriate LLM provider based on task type.
@@ -47,7 +71,13 @@ class LLMProvider:
             prompt: User prompt
             max_tokens: Maximum tokens to generate
             temperature: Temperature for sampling (None = use provider default)
-            system_prompt: Optional system prompt
+            system_prompt: Optional system prompt, or a list of Anthropic system
+                blocks (sent as-is to Anthropic, joined into one prompt for Groq)
+            cache_system_prompt: Mark the system prompt as a cacheable prefix
+                (Anthropic prompt caching). Use for large static instructions.
+            json_schema: Optional JSON schema the response must follow. Groq runs
+                in JSON mode; Anthropic is forced to answer through a tool with
+                this input schema. "text" is then always a JSON string.
 
         Returns:
             {
@@ -68,94 +98,300 @@ class LLMProvider:
             raise ValueError(f"Task type '{task_type}' should use deterministic code, not LLM")
 
         if provider == 'groq' and self.groq_client:
-            return self._get_groq_completion(prompt, max_tokens, temperature, system_prompt)
+            return self._get_groq_completion(
+                prompt, max_tokens, temperature, system_prompt, cache_system_prompt, json_schema
+            )
         else:
-            return self._get_anthropic_completion(prompt, max_tokens, temperature, system_prompt)
+            return self._get_anthropic_completion(
+                prompt, max_tokens, temperature, system_prompt, cache_system_prompt, json_schema
+            )
 
     def _get_groq_completion(
         self,
         prompt: str,
         max_tokens: int,
         temperature: Optional[float],
-        system_prompt: Optional[str]
+        system_prompt: Optional[SystemPrompt],
+        cache_system_prompt: bool = False,
+        json_schema: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """Get completion from Groq (Llama 3.3 70B)."""
 
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": prompt})
-
         try:
             response = self.groq_client.chat.completions.create(
-                model=settings.GROQ_MODEL,
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature if temperature is not None else settings.GROQ_TEMPERATURE
+                **self._groq_kwargs(prompt, max_tokens, temperature, system_prompt, json_schema)
             )
-
-            usage = response.usage
-            input_cost = (usage.prompt_tokens / 1_000_000) * settings.GROQ_LLAMA_INPUT_COST
-            output_cost = (usage.completion_tokens / 1_000_000) * settings.GROQ_LLAMA_OUTPUT_COST
-            total_cost = round(input_cost + output_cost, 6)
-
-            return {
-                "text": response.choices[0].message.content,
-                "usage": {
-                    "input_tokens": usage.prompt_tokens,
-                    "output_tokens": usage.completion_tokens,
-                    "cost_usd": total_cost
-                },
-                "provider": "groq"
-            }
+            return self._groq_result(response)
 
         except Exception as e:
             logger.error(f"Groq API error: {str(e)}")
             # Fallback to Anthropic
             logger.info("Falling back to Anthropic due to Groq error")
-            return self._get_anthropic_completion(prompt, max_tokens, temperature, system_prompt)
+            return self._get_anthropic_completion(
+                prompt, max_tokens, temperature, system_prompt, cache_system_prompt, json_schema
+            )
 
     def _get_anthropic_completion(
         self,
         prompt: str,
         max_tokens: int,
         temperature: Optional[float],
-        system_prompt: Optional[str]
+        system_prompt: Optional[SystemPrompt],
+        cache_system_prompt: bool = False,
+        json_schema: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """Get completion from Anthropic (Claude Haiku)."""
 
         try:
-            kwargs = {
-                "model": settings.CLAUDE_MODEL,
-                "max_tokens": max_tokens,
-                "temperature": temperature if temperature is not None else settings.CLAUDE_TEMPERATURE,
-                "messages": [{"role": "user", "content": prompt}]
-            }
+            response = self.anthropic_client.messages.create(
+                **self._anthropic_kwargs(
+                    prompt, max_tokens, temperature, system_prompt, cache_system_prompt, json_schema
+                )
+            )
+            return self._anthropic_result(response)
 
-            if system_prompt:
-                kwargs["system"] = system_prompt
+        except Exception as e:
+            logger.error(f"Anthropic API error: {str(e)}")
+            raise
 
-            response = self.anthropic_client.messages.create(**kwargs)
+    async def aget_completion(
+        self,
+        task_type: str,
+        prompt: str,
+        max_tokens: int = 1000,
+        temperature: float = None,
+        system_prompt: Optional[SystemPrompt] = None,
+        cache_system_prompt: bool = False,
+        json_schema: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Async version of get_completion() using the AsyncGroq/AsyncAnthropic clients.
+        Use this to fan out many independent completions with asyncio.gather.
+        """
 
-            usage = response.usage
-            input_cost = (usage.input_tokens / 1_000_000) * settings.CLAUDE_HAIKU_INPUT_COST
-            output_cost = (usage.output_tokens / 1_000_000) * settings.CLAUDE_HAIKU_OUTPUT_COST
-            total_cost = round(input_cost + output_cost, 6)
+        provider = self.provider_map.get(task_type, 'anthropic')
 
-            return {
-                "text": response.content[0].text,
-                "usage": {
-                    "input_tokens": usage.input_tokens,
-                    "output_tokens": usage.output_tokens,
-                    "cost_usd": total_cost
-                },
-                "provider": "anthropic"
-            }
+        if provider == 'deterministic':
+            raise ValueError(f"Task type '{task_type}' should use deterministic code, not LLM")
+
+        if provider == 'groq' and self.async_groq_client:
+            try:
+                response = await self.async_groq_client.chat.completions.create(
+                    **self._groq_kwargs(prompt, max_tokens, temperature, system_prompt, json_schema)
+                )
+                return self._groq_result(response)
+            except Exception as e:
+                logger.error(f"Groq API error: {str(e)}")
+                logger.info("Falling back to Anthropic due to Groq error")
+
+        try:
+            response = await self.async_anthropic_client.messages.create(
+                **self._anthropic_kwargs(
+                    prompt, max_tokens, temperature, system_prompt, cache_system_prompt, json_schema
+                )
+            )
+            return self._anthropic_result(response)
 
         except Exception as e:
             logger.error(f"Anthropic API error: {str(e)}")
             raise
 
+    @staticmethod
+    def _groq_kwargs(
+        prompt: str,
+        max_tokens: int,
+        temperature: Optional[float],
+        system_prompt: Optional[SystemPrompt],
+        json_schema: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Build chat.completions.create() arguments for Groq."""
+        messages = []
+        if isinstance(system_prompt, list):
+            system_prompt = "\n\n".join(block["text"] for block in system_prompt)
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+
+        kwargs = {
+            "model": settings.GROQ_MODEL,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature if temperature is not None else settings.GROQ_TEMPERATURE
+        }
+
+        if json_schema:
+            # Groq JSON mode guarantees valid JSON; field names come from the prompt
+            kwargs["response_format"] = {"type": "json_object"}
+
+        return kwargs
+
+    @staticmethod
+    def _groq_result(response) -> Dict[str, Any]:
+        """Convert a Groq response into the provider-neutral result dict."""
+        usage = response.usage
+        input_cost = (usage.prompt_tokens / 1_000_000) * settings.GROQ_LLAMA_INPUT_COST
+        output_cost = (usage.completion_tokens / 1_000_000) * settings.GROQ_LLAMA_OUTPUT_COST
+        total_cost = round(input_cost + output_cost, 6)
+
+        return {
+            "text": response.choices[0].message.content,
+            "usage": {
+                "input_tokens": usage.prompt_tokens,
+                "output_tokens": usage.completion_tokens,
+                "cost_usd": total_cost
+            },
+            "provider": "groq"
+        }
+
+    @staticmethod
+    def _anthropic_kwargs(
+        prompt: str,
+        max_tokens: int,
+        temperature: Optional[float],
+        system_prompt: Optional[SystemPrompt],
+        cache_system_prompt: bool = False,
+        json_schema: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Build messages.create() arguments for Anthropic."""
+        kwargs = {
+            "model": settings.CLAUDE_MODEL,
+            "max_tokens": max_tokens,
+            "temperature": temperature if temperature is not None else settings.CLAUDE_TEMPERATURE,
+            "messages": [{"role": "user", "content": prompt}]
+        }
+
+        if isinstance(system_prompt, list):
+            kwargs["system"] = system_prompt
+        elif system_prompt and cache_system_prompt:
+            kwargs["system"] = [{
+                "type": "text",
+                "text": system_prompt,
+                "cache_control": {"type": "ephemeral"}
+            }]
+        elif system_prompt:
+            kwargs["system"] = system_prompt
+
+        if json_schema:
+            # Forced tool call: the tool input is schema-validated structured output
+            kwargs["tools"] = [{
+                "name": STRUCTURED_OUTPUT_TOOL,
+                "description": "Record the response in the required format.",
+                "input_schema": json_schema
+            }]
+            kwargs["tool_choice"] = {"type": "tool", "name": STRUCTURED_OUTPUT_TOOL}
+
+        return kwargs
+
+    @staticmethod
+    def _anthropic_text(message) -> str:
+        """Get the response text, serializing structured-output tool input to JSON."""
+        for block in message.content:
+            if block.type == "tool_use" and block.name == STRUCTURED_OUTPUT_TOOL:
+                return json.dumps(block.input)
+        return message.content[0].text
+
+    def _anthropic_result(self, response) -> Dict[str, Any]:
+        """Convert an Anthropic response into the provider-neutral result dict."""
+        return {
+            "text": self._anthropic_text(response),
+            "usage": self._anthropic_usage(response.usage),
+            "provider": "anthropic"
+        }
+
+    def get_batch_completions(
+        self,
+        prompts: Dict[str, str],
+        max_tokens: int = 1000,
+        temperature: float = None,
+        system_prompt: Optional[str] = None,
+        cache_system_prompt: bool = False,
+        json_schema: Optional[Dict[str, Any]] = None,
+        poll_interval_seconds: float = 30.0
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Run many prompts through the Anthropic Message Batches API.
+        Batches are billed at 50% of the live price but may take up to 24h,
+        so only use this for offline/back-office work. Blocks until the batch ends.
+
+        Args:
+            prompts: Mapping of custom_id -> user prompt
+            max_tokens: Maximum tokens to generate per prompt
+            temperature: Temperature for sampling (None = use provider default)
+            system_prompt: Optional system prompt shared by every request
+            cache_system_prompt: Mark the shared system prompt as a cacheable prefix
+            json_schema: Optional JSON schema every response must follow
+            poll_interval_seconds: Delay between batch status checks
+
+        Returns:
+            Mapping of custom_id -> same format as get_completion(),
+            or None for requests that errored, expired or were canceled
+        """
+
+        batch = self.anthropic_client.messages.batches.create(
+            requests=[
+                {
+                    "custom_id": custom_id,
+                    "params": self._anthropic_kwargs(
+                        prompt, max_tokens, temperature, system_prompt, cache_system_prompt, json_schema
+                    )
+                }
+                for custom_id, prompt in prompts.items()
+            ]
+        )
+        logger.info(f"Submitted message batch {batch.id} with {len(prompts)} requests")
+
+        while batch.processing_status != "ended":
+            time.sleep(poll_interval_seconds)
+            batch = self.anthropic_client.messages.batches.retrieve(batch.id)
+
+        results: Dict[str, Optional[Dict[str, Any]]] = {custom_id: None for custom_id in prompts}
+        for entry in self.anthropic_client.messages.batches.results(batch.id):
+            if entry.result.type != "succeeded":
+                logger.warning(f"Batch request {entry.custom_id} {entry.result.type}")
+                continue
+
+            message = entry.result.message
+            usage = self._anthropic_usage(message.usage)
+            usage["cost_usd"] = round(usage["cost_usd"] * settings.CLAUDE_BATCH_DISCOUNT, 6)
+
+            results[entry.custom_id] = {
+                "text": self._anthropic_text(message),
+                "usage": usage,
+                "provider": "anthropic_batch"
+            }
+
+        return results
+
+    @staticmethod
+    def _anthropic_usage(usage) -> Dict[str, Any]:
+        """Build the usage dict for an Anthropic response, pricing prompt cache reads/writes."""
+        cache_creation = getattr(usage, "cache_creation_input_tokens", None) or 0
+        cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+        # 1h-TTL writes are billed higher than 5m ones; the breakdown is optional,
+        # and SDKs that predate its model return it as a plain dict
+        breakdown = getattr(usage, "cache_creation", None)
+        if isinstance(breakdown, dict):
+            cache_creation_1h = breakdown.get("ephemeral_1h_input_tokens") or 0
+        else:
+            cache_creation_1h = getattr(breakdown, "ephemeral_1h_input_tokens", None) or 0
+
+        input_cost = (usage.input_tokens / 1_000_000) * settings.CLAUDE_HAIKU_INPUT_COST
+        cache_write_cost = (
+            (cache_creation - cache_creation_1h) * settings.CLAUDE_HAIKU_CACHE_WRITE_COST
+            + cache_creation_1h * settings.CLAUDE_HAIKU_CACHE_WRITE_1H_COST
+        ) / 1_000_000
+        cache_read_cost = (cache_read / 1_000_000) * settings.CLAUDE_HAIKU_CACHE_READ_COST
+        output_cost = (usage.output_tokens / 1_000_000) * settings.CLAUDE_HAIKU_OUTPUT_COST
+        total_cost = round(input_cost + cache_write_cost + cache_read_cost + output_cost, 6)
+
+        return {
+            "input_tokens": usage.input_tokens,
+            "output_tokens": usage.output_tokens,
+            "cache_creation_input_tokens": cache_creation,
+            "cache_read_input_tokens": cache_read,
+            "cost_usd": total_cost
+        }
+
     def get_conversational_completion(
         self,
         messages: List[Dict[str, str]],
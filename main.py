@@ -1,11 +1,13 @@
 """FastAPI application entry point for PARA Autopilot."""
 
 from fastapi import FastAPI, Depends, Request
+from fastapi.security import HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from auth import get_current_user
+from auth import get_current_user, invalidate_token, security
 from config import settings
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 
 # Import routers
@@ -14,6 +16,10 @@ from routers import para, tasks, weekly_review, search, integrations, beta, file
 # Import background jobs
 from jobs.scheduler import start_scheduler, shutdown_scheduler
 
+# Import cache
+from cache.redis_client import cache
+from database import supabase, connect_pg_pool, close_pg_pool
+
 # Import monitoring
 from monitoring.sentry_config import init_sentry, capture_exception
 
@@ -38,6 +44,17 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Failed to start scheduler: {str(e)}")
 
+    try:
+        await cache.connect()
+        await cache.client.ping()
+        logger.info("Redis cache connected")
+    except Exception as e:
+        # Caching is optional - every cache call is a no-op without a client
+        logger.warning(f"Redis unavailable, running without cache: {str(e)}")
+        cache.client = None
+
+    await connect_pg_pool()
+
     yield
 
     # Shutdown
@@ -48,6 +65,9 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Failed to stop scheduler: {str(e)}")
 
+    await cache.disconnect()
+    await close_pg_pool()
+
 app = FastAPI(
     title="PARA Autopilot API",
     description="AI-powered personal productivity system using the PARA method",
@@ -130,6 +150,18 @@ async def get_current_user_info(user: dict = Depends(get_current_user)):
     }
 
 
+@app.post("/api/logout")
+async def logout(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Revoke the session and drop its cached token verification."""
+    token = credentials.credentials
+    try:
+        await asyncio.to_thread(supabase.auth.admin.sign_out, token)
+    except Exception as e:
+        logger.warning(f"Supabase sign-out failed: {str(e)}")
+    await invalidate_token(token)
+    return {"success": True}
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
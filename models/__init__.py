@@ -19,6 +19,10 @@ from .task import (
     TaskCreate,
     TaskUpdate,
     ScheduledBlock,
+    ScheduleProposal,
+    RolloverRecommendation,
+    TaskRolloverRecommendation,
+    RolloverRecommendationBatch,
     AutoScheduleRequest,
     AutoScheduleResponse
 )
@@ -51,6 +55,10 @@ __all__ = [
     "TaskCreate",
     "TaskUpdate",
     "ScheduledBlock",
+    "ScheduleProposal",
+    "RolloverRecommendation",
+    "TaskRolloverRecommendation",
+    "RolloverRecommendationBatch",
     "AutoScheduleRequest",
     "AutoScheduleResponse",
     # Reviews
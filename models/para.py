@@ -73,7 +73,7 @@ class PARAClassificationResult(BaseModel):
     confidence: float = Field(..., ge=0.0, le=1.0)
     reasoning: str
     suggested_next_actions: List[str] = Field(default_factory=list)
-    estimated_duration_weeks: Optional[int] = None
+    estimated_duration_weeks: Optional[float] = None
 
 
 class PARAClassificationResponse(BaseModel):
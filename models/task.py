@@ -83,6 +83,31 @@ class ScheduledBlock(BaseModel):
     reasoning: str
 
 
+class ScheduleProposal(BaseModel):
+    """The LLM's scheduling answer: a wrapper object so JSON mode can produce it."""
+    scheduled_blocks: List[ScheduledBlock]
+
+
+class RolloverRecommendation(BaseModel):
+    """The LLM's suggestion for a task that keeps getting rolled over."""
+    recommendation: str  # break_down | archive | reschedule | adjust_duration
+    reasoning: str
+    suggested_subtasks: Optional[List[str]] = None
+    suggested_new_date: Optional[str] = None
+    new_estimated_duration: Optional[float] = None
+    message_to_user: str
+
+
+class TaskRolloverRecommendation(RolloverRecommendation):
+    """A rollover recommendation from a batched request, tagged with its task."""
+    task_id: str
+
+
+class RolloverRecommendationBatch(BaseModel):
+    """The LLM's answer to a batched rollover request."""
+    recommendations: List[TaskRolloverRecommendation]
+
+
 class AutoScheduleRequest(BaseModel):
     """Request for auto-scheduling tasks."""
     task_ids: Optional[List[str]] = None  # If None, schedule all unscheduled tasks
@@ -92,5 +117,5 @@ class AutoScheduleRequest(BaseModel):
 class AutoScheduleResponse(BaseModel):
     """Response from auto-scheduling."""
     scheduled_blocks: List[ScheduledBlock]
-    approval_id: str
+    approval_id: Optional[str] = None  # None when there was nothing to schedule
     usage: Dict[str, Any]
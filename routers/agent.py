@@ -1,12 +1,14 @@
 """API router for conversational AI agent."""
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Optional, Dict, Any
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, List, Optional, Dict, Any, Tuple
 from datetime import datetime
 from pydantic import BaseModel
+import orjson
 from auth import get_current_user_id
 from database import supabase
-from agents.conversational_agent import ConversationalAgent
+from agents.conversational_agent import conversational_agent
 
 router = APIRouter()
 
@@ -47,47 +49,9 @@ class ConfirmationRequest(BaseModel):
     modifications: Optional[Dict[str, Any]] = None  # For editing email drafts, etc.
 
 
-@router.post("/chat", response_model=ChatResponse)
-async def chat_with_agent(
-    request: ChatRequest,
-    user_id: str = Depends(get_current_user_id)
-):
-    """
-    Chat with the AI agent.
-    Automatically loads conversation history if conversation_id provided.
-    Creates new conversation if not.
-    """
-
-    # Initialize agent
-    agent = ConversationalAgent()
-
-    # Load conversation history if continuing existing conversation
-    conversation_history = []
-    conversation_id = request.conversation_id
-
-    if conversation_id:
-        # Load existing conversation
-        messages_result = supabase.table("conversation_messages")\
-            .select("*")\
-            .eq("conversation_id", conversation_id)\
-            .order("created_at")\
-            .execute()
-
-        if not messages_result.data:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Conversation not found"
-            )
-
-        # Convert to Claude format
-        conversation_history = [
-            {
-                "role": msg["role"],
-                "content": msg["content"]
-            }
-            for msg in messages_result.data
-        ]
-    else:
+def _load_conversation(user_id: str, conversation_id: Optional[str]) -> Tuple[str, List[Dict[str, str]]]:
+    """Return (conversation_id, history in Claude format), creating the conversation if needed."""
+    if not conversation_id:
         # Create new conversation
         conversation_result = supabase.table("conversations")\
             .insert({
@@ -96,23 +60,47 @@ async def chat_with_agent(
             })\
             .execute()
 
-        conversation_id = conversation_result.data[0]["id"]
+        return conversation_result.data[0]["id"], []
+
+    # Load existing conversation
+    messages_result = supabase.table("conversation_messages")\
+        .select("*")\
+        .eq("conversation_id", conversation_id)\
+        .order("created_at")\
+        .execute()
+
+    if not messages_result.data:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Conversation not found"
+        )
 
-    # Save user message to database
+    # Convert to Claude format
+    return conversation_id, [
+        {
+            "role": msg["role"],
+            "content": msg["content"]
+        }
+        for msg in messages_result.data
+    ]
+
+
+def _save_user_message(conversation_id: str, message: str) -> None:
     supabase.table("conversation_messages")\
         .insert({
             "conversation_id": conversation_id,
             "role": "user",
-            "content": request.message
+            "content": message
         })\
         .execute()
 
-    # Get agent response
-    response = await agent.chat(
-        user_id=user_id,
-        message=request.message,
-        conversation_history=conversation_history
-    )
+
+def _save_reply(conversation_id: str, user_id: str, response: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Save the assistant message and its pending confirmations; returns the saved confirmations."""
+    # A merged follow-up shares its reply with the request that sent the turn,
+    # which already saves it and its confirmations
+    if (response.get("metadata") or {}).get("merged_follow_up", False):
+        return []
 
     # Save assistant message to database
     supabase.table("conversation_messages")\
@@ -127,19 +115,48 @@ async def chat_with_agent(
 
     # Save any pending confirmations
     pending_confirmations = []
-    if response.get("pending_confirmations"):
-        for confirmation in response["pending_confirmations"]:
-            confirmation_result = supabase.table("agent_confirmations")\
-                .insert({
-                    "conversation_id": conversation_id,
-                    "user_id": user_id,
-                    "action_type": confirmation["action_type"],
-                    "action_data": confirmation["action_data"],
-                    "status": "pending"
-                })\
-                .execute()
+    for confirmation in response.get("pending_confirmations") or []:
+        confirmation_result = supabase.table("agent_confirmations")\
+            .insert({
+                "conversation_id": conversation_id,
+                "user_id": user_id,
+                "action_type": confirmation["action_type"],
+                "action_data": confirmation["action_data"],
+                "status": "pending"
+            })\
+            .execute()
+
+        pending_confirmations.append(confirmation_result.data[0])
+
+    return pending_confirmations
+
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat_with_agent(
+    request: ChatRequest,
+    user_id: str = Depends(get_current_user_id)
+):
+    """
+    Chat with the AI agent.
+    Automatically loads conversation history if conversation_id provided.
+    Creates new conversation if not.
+    """
+
+    # Shared instance so the per-user context cache survives across requests
+    agent = conversational_agent
+
+    conversation_id, conversation_history = _load_conversation(user_id, request.conversation_id)
+    _save_user_message(conversation_id, request.message)
+
+    # Get agent response
+    response = await agent.chat(
+        user_id=user_id,
+        message=request.message,
+        conversation_history=conversation_history,
+        conversation_id=conversation_id
+    )
 
-            pending_confirmations.append(confirmation_result.data[0])
+    pending_confirmations = _save_reply(conversation_id, user_id, response)
 
     return ChatResponse(
         conversation_id=conversation_id,
@@ -150,6 +167,41 @@ async def chat_with_agent(
     )
 
 
+@router.post("/chat/stream")
+async def stream_chat_with_agent(
+    request: ChatRequest,
+    user_id: str = Depends(get_current_user_id)
+):
+    """
+    Chat with the AI agent, streaming the reply as Server-Sent Events.
+
+    Each event's data is JSON: {"message_delta": "..."} while Claude writes,
+    then a final {"done": true, ...} shaped like the /chat response.
+    """
+    conversation_id, conversation_history = _load_conversation(user_id, request.conversation_id)
+    _save_user_message(conversation_id, request.message)
+
+    async def events() -> AsyncIterator[bytes]:
+        async for event in conversational_agent.chat_stream(
+            user_id=user_id,
+            message=request.message,
+            conversation_history=conversation_history
+        ):
+            if event.get("done"):
+                event = {
+                    **event,
+                    "conversation_id": conversation_id,
+                    "pending_confirmations": _save_reply(conversation_id, user_id, event)
+                }
+            yield b"data: " + orjson.dumps(event, default=str) + b"\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/conversations", response_model=List[ConversationSummary])
 async def get_conversations(
     user_id: str = Depends(get_current_user_id),
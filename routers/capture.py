@@ -69,9 +69,9 @@ async def quick_capture(
         logger.info(f"Parsed result: {parsed}")
 
         # Step 2: Classify into PARA
-        from agents.classifier import classify_item
+        from agents.classifier import aclassify_item
 
-        classification = classify_item(
+        classification = await aclassify_item(
             title=parsed['title'],
             description=parsed.get('description', '') or request.input,
             context=request.context or f"keywords: {', '.join(parsed.get('keywords', []))}"
@@ -8,7 +8,7 @@ from config import settings
 from utils.pdf_extractor import PDFExtractor
 from utils.ocr_extractor import OCRExtractor
 from utils.web_archiver import WebArchiver
-from agents.classifier import classify_item
+from agents.classifier import aclassify_item
 import uuid
 import os
 import tempfile
@@ -202,7 +202,7 @@ async def process_pdf(file_id: str, user_id: str, content: bytes, filename: str)
 
         # AI Classification
         logger.info(f"Classifying PDF with AI: {title}")
-        classification = classify_item(
+        classification = await aclassify_item(
             title=title,
             description=extracted_text[:500],  # First 500 chars for classification
             context=f"file_type: pdf, page_count: {page_count}"
@@ -320,14 +320,14 @@ async def process_image(file_id: str, user_id: str, content: bytes, filename: st
 
         if ocr_text and len(ocr_text.strip()) > 50:
             # Use OCR text for classification
-            classification = classify_item(
+            classification = await aclassify_item(
                 title=title,
                 description=ocr_text[:500],
                 context=classification_context
             )
         else:
             # Minimal text - classify based on filename
-            classification = classify_item(
+            classification = await aclassify_item(
                 title=title,
                 description=f"Image file: {filename}",
                 context=classification_context
@@ -484,7 +484,7 @@ async def process_link(file_id: str, user_id: str, url: str):
 
         # AI Classification
         logger.info(f"Classifying link with AI: {title}")
-        classification = classify_item(
+        classification = await aclassify_item(
             title=title,
             description=description or content_text[:500],
             context=f"file_type: link, url: {url}, word_count: {word_count}, site_name: {metadata.get('site_name')}"
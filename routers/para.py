@@ -4,6 +4,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from typing import List, Optional
 from auth import get_current_user_id
 from database import db
+from agents.embeddings import invalidate_user_search
 from models.para import (
     PARAItem,
     PARAItemCreate,
@@ -74,6 +75,7 @@ async def create_para_item(
     item_data["user_id"] = user_id
 
     created_item = db.insert_record("para_items", item_data)
+    invalidate_user_search(user_id)
     return created_item
 
 
@@ -95,6 +97,7 @@ async def update_para_item(
     # Update only provided fields
     update_data = item.model_dump(exclude_unset=True)
     updated_item = db.update_record("para_items", item_id, update_data)
+    invalidate_user_search(user_id)
 
     return updated_item
 
@@ -119,6 +122,7 @@ async def delete_para_item(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to delete item"
         )
+    invalidate_user_search(user_id)
 
 
 @router.post("/classify", response_model=PARAClassificationResponse)
@@ -127,10 +131,10 @@ async def classify_item(
     user_id: str = Depends(get_current_user_id)
 ):
     """Classify an item into PARA categories using AI."""
-    from agents.classifier import classify_item as ai_classify
+    from agents.classifier import aclassify_item as ai_classify
 
     # Call AI classification
-    result = ai_classify(
+    result = await ai_classify(
         title=request.title,
         description=request.description or "",
         context=request.context or ""
@@ -4,7 +4,7 @@ from fastapi import APIRouter, Depends, Query
 from typing import List, Optional
 from auth import get_current_user_id
 from agents.embeddings import (
-    find_similar_para_items,
+    afind_similar_para_items,
     semantic_search_across_all,
     batch_embed_para_items,
     batch_embed_tasks
@@ -28,7 +28,7 @@ async def search_similar_items(
     Example: "side projects I want to learn from" might match Resources
     about learning and Projects marked as learning-focused.
     """
-    results = find_similar_para_items(
+    results = await afind_similar_para_items(
         query=query,
         user_id=user_id,
         limit=limit,
@@ -49,7 +49,7 @@ async def search_all(
     user_id: str = Depends(get_current_user_id)
 ):
     """Search across all PARA items and tasks using semantic search."""
-    results = semantic_search_across_all(
+    results = await semantic_search_across_all(
         query=query,
         user_id=user_id,
         limit=limit
@@ -69,7 +69,7 @@ async def embed_all_para_items(
     - Backfilling embeddings for existing items
     - After bulk item creation
     """
-    result = batch_embed_para_items(user_id)
+    result = await batch_embed_para_items(user_id)
 
     return {
         "message": f"Embedded {result['success']} of {result['total']} items",
@@ -84,7 +84,7 @@ async def embed_all_tasks(
     user_id: str = Depends(get_current_user_id)
 ):
     """Generate embeddings for all tasks that don't have them yet."""
-    result = batch_embed_tasks(user_id)
+    result = await batch_embed_tasks(user_id)
 
     return {
         "message": f"Embedded {result['success']} of {result['total']} tasks",
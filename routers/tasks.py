@@ -4,7 +4,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from typing import List, Optional
 from datetime import datetime
 from auth import get_current_user_id
-from database import db, supabase
+from database import db, supabase, get_user_profile
 from models.task import (
     Task,
     TaskCreate,
@@ -169,21 +169,20 @@ async def auto_schedule_tasks(
     calendar_events = result.data
 
     # Get user preferences
-    profile = supabase.table("user_profiles")\
-        .select("para_preferences")\
-        .eq("id", user_id)\
-        .execute()
-    preferences = profile.data[0]["para_preferences"] if profile.data else {}
+    profile = await get_user_profile(user_id)
+    preferences = profile.get("para_preferences") or {}
 
     # Merge with request preferences
     final_preferences = {**preferences, **request.preferences}
 
     # Call AI scheduler
-    result = ai_schedule(
+    result = await ai_schedule(
         tasks=tasks,
         calendar_events=calendar_events,
         user_preferences=final_preferences,
-        user_id=user_id
+        user_id=user_id,
+        # Explicitly picked tasks get moved even if they already have a block
+        reschedule=bool(request.task_ids)
     )
 
     # Log the action
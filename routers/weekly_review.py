@@ -91,7 +91,7 @@ async def generate_weekly_review(
 
     # Generate review using AI
     week_start = datetime.combine(request.week_start_date, datetime.min.time())
-    result = ai_review(user_id, week_start)
+    result = await ai_review(user_id, week_start)
 
     # Log the action
     db.log_agent_action(
@@ -0,0 +1,317 @@
+-- Performance: RPC functions and indexes for hot read paths
+-- Run after schema.sql
+
+-- Context-aware suggestions: everything get_suggestions needs in one round trip
+-- (upcoming events with their linked task, quick wins, today's tasks, weekly review status)
+CREATE OR REPLACE FUNCTION get_context_bundle(
+  p_user_id uuid,
+  p_now timestamptz,
+  p_day_start timestamptz,
+  p_day_end timestamptz,
+  p_week_start date
+)
+RETURNS jsonb
+LANGUAGE sql STABLE
+AS $$
+  SELECT jsonb_build_object(
+    'events', COALESCE((
+      SELECT jsonb_agg(jsonb_build_object(
+        'id', e.id,
+        'title', e.title,
+        'start_time', e.start_time,
+        'linked_task_id', e.linked_task_id,
+        'linked_task', CASE WHEN t.id IS NULL THEN NULL ELSE jsonb_build_object(
+          'id', t.id,
+          'title', t.title,
+          'para_item_id', t.para_item_id
+        ) END
+      ))
+      FROM calendar_events e
+      LEFT JOIN tasks t ON t.id = e.linked_task_id
+      WHERE e.user_id = p_user_id
+        AND e.start_time >= p_now
+        AND e.start_time <= p_now + interval '1 hour'
+    ), '[]'::jsonb),
+
+    'quick_tasks', COALESCE((
+      SELECT jsonb_agg(q)
+      FROM (
+        SELECT id, title, estimated_duration_minutes, priority
+        FROM tasks
+        WHERE user_id = p_user_id
+          AND status = 'pending'
+          AND estimated_duration_minutes <= 15
+        ORDER BY priority DESC
+        LIMIT 5
+      ) q
+    ), '[]'::jsonb),
+
+    'today_tasks', COALESCE((
+      SELECT jsonb_agg(d)
+      FROM (
+        SELECT id, title, priority, due_date
+        FROM tasks
+        WHERE user_id = p_user_id
+          AND status <> 'completed'
+          AND due_date >= p_day_start
+          AND due_date <= p_day_end
+      ) d
+    ), '[]'::jsonb),
+
+    'weekly_review_exists', EXISTS (
+      SELECT 1
+      FROM weekly_reviews
+      WHERE user_id = p_user_id
+        AND week_start_date = p_week_start
+    )
+  );
+$$;
+
+-- Conversational agent context reads (_get_user_context)
+-- Pending/in-progress tasks ordered by due date; partial so completed tasks stay out of the index,
+-- INCLUDE columns let the projected read be served as an index-only scan
+CREATE INDEX IF NOT EXISTS idx_tasks_user_open_due
+  ON tasks(user_id, status, due_date)
+  INCLUDE (title, priority, para_item_id)
+  WHERE status IN ('pending', 'in_progress');
+
+-- Active projects; supersedes idx_para_items_user_type for the (user, type, status) filter
+CREATE INDEX IF NOT EXISTS idx_para_items_user_type_status
+  ON para_items(user_id, para_type, status)
+  INCLUDE (title, due_date);
+
+-- calendar_events(user_id, start_time) is already covered by idx_calendar_events_user_time in schema.sql
+
+-- Bulk embedding writes: one request updates a whole batch of rows.
+-- p_rows is a JSON array of {"id": uuid, "embedding": [floats]}. A PostgREST
+-- upsert can't be used here because the partial rows fail the tables'
+-- NOT NULL checks before ON CONFLICT applies.
+CREATE OR REPLACE FUNCTION set_para_item_embeddings(p_rows jsonb)
+RETURNS integer
+LANGUAGE sql
+AS $$
+  WITH updated AS (
+    UPDATE para_items p
+    SET embedding = (r->>'embedding')::vector
+    FROM jsonb_array_elements(p_rows) r
+    WHERE p.id = (r->>'id')::uuid
+    RETURNING 1
+  )
+  SELECT count(*)::integer FROM updated;
+$$;
+
+CREATE OR REPLACE FUNCTION set_task_embeddings(p_rows jsonb)
+RETURNS integer
+LANGUAGE sql
+AS $$
+  WITH updated AS (
+    UPDATE tasks t
+    SET embedding = (r->>'embedding')::vector
+    FROM jsonb_array_elements(p_rows) r
+    WHERE t.id = (r->>'id')::uuid
+    RETURNING 1
+  )
+  SELECT count(*)::integer FROM updated;
+$$;
+
+-- Persistent embedding cache shared by all workers: identical text (sha256 of
+-- the normalized string) is embedded once, then read back instead of re-requested
+CREATE TABLE IF NOT EXISTS embedding_cache (
+  content_hash TEXT PRIMARY KEY,
+  embedding vector(1536) NOT NULL,
+  created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Only the backend (service role, which bypasses RLS) reads or writes the cache;
+-- no policies, so anon and authenticated clients can't touch it
+ALTER TABLE embedding_cache ENABLE ROW LEVEL SECURITY;
+
+-- Insights: completion counts aggregated in the database instead of shipping
+-- every task row to the app. Both count tasks created since p_since, in UTC.
+CREATE OR REPLACE FUNCTION completion_by_day(p_user_id uuid, p_since timestamptz)
+RETURNS TABLE (isodow integer, completed integer)
+LANGUAGE sql STABLE
+AS $$
+  SELECT extract(isodow FROM completed_at AT TIME ZONE 'UTC')::integer, count(*)::integer
+  FROM tasks
+  WHERE user_id = p_user_id
+    AND status = 'completed'
+    AND completed_at IS NOT NULL
+    AND created_at >= p_since
+  GROUP BY 1;
+$$;
+
+CREATE OR REPLACE FUNCTION completion_by_hour(p_user_id uuid, p_since timestamptz)
+RETURNS TABLE (hour integer, completed integer)
+LANGUAGE sql STABLE
+AS $$
+  SELECT extract(hour FROM completed_at AT TIME ZONE 'UTC')::integer, count(*)::integer
+  FROM tasks
+  WHERE user_id = p_user_id
+    AND status = 'completed'
+    AND completed_at IS NOT NULL
+    AND created_at >= p_since
+  GROUP BY 1;
+$$;
+
+-- Index-only scan for the two aggregates above
+CREATE INDEX IF NOT EXISTS idx_tasks_user_status_created
+  ON tasks(user_id, status, created_at)
+  INCLUDE (completed_at);
+
+-- Everything analyze_patterns needs in one round trip: the two completion
+-- aggregates plus the stale-project and rollover-task blocker candidates
+CREATE OR REPLACE FUNCTION user_insights_snapshot(
+  p_user_id uuid,
+  p_since timestamptz,
+  p_stale_before timestamptz,
+  p_now timestamptz
+)
+RETURNS jsonb
+LANGUAGE sql STABLE
+AS $$
+  SELECT jsonb_build_object(
+    'completion_by_day', COALESCE((
+      SELECT jsonb_agg(to_jsonb(d)) FROM completion_by_day(p_user_id, p_since) d
+    ), '[]'::jsonb),
+    'completion_by_hour', COALESCE((
+      SELECT jsonb_agg(to_jsonb(h)) FROM completion_by_hour(p_user_id, p_since) h
+    ), '[]'::jsonb),
+    'stale_projects', COALESCE((
+      SELECT jsonb_agg(jsonb_build_object('title', p.title, 'updated_at', p.updated_at))
+      FROM para_items p
+      WHERE p.user_id = p_user_id
+        AND p.para_type = 'project'
+        AND p.status = 'active'
+        AND p.updated_at < p_stale_before
+    ), '[]'::jsonb),
+    'rollover_tasks', COALESCE((
+      SELECT jsonb_agg(jsonb_build_object('id', t.id, 'title', t.title, 'due_date', t.due_date))
+      FROM tasks t
+      WHERE t.user_id = p_user_id
+        AND t.status = 'pending'
+        AND t.due_date < p_now
+    ), '[]'::jsonb)
+  );
+$$;
+
+-- Task capture links new tasks to active PARA items whose title contains a
+-- keyword (title ILIKE '%word%'); a trigram index lets those ILIKEs use an index
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_para_items_title_trgm
+  ON para_items USING gin (title gin_trgm_ops);
+
+-- Approximate nearest-neighbour search for match_para_items. Stored embeddings
+-- are unit length (normalized before every write), so cosine similarity is the
+-- inner product and the index can use the cheaper vector_ip_ops operator class.
+CREATE INDEX IF NOT EXISTS idx_para_items_embedding_hnsw
+  ON para_items USING hnsw (embedding vector_ip_ops)
+  WITH (m = 16, ef_construction = 64);
+
+-- Replaces the exact-scan version in schema.sql: ranks by negative inner
+-- product (<#>) through the HNSW index. iterative_scan keeps walking the graph
+-- when the user_id filter discards candidates (pgvector >= 0.8), and the outer
+-- ORDER BY restores exact order over the relaxed index results.
+CREATE OR REPLACE FUNCTION match_para_items(
+  query_embedding vector(1536),
+  match_threshold float,
+  match_count int,
+  filter_user_id uuid
+)
+RETURNS TABLE (
+  id uuid,
+  title text,
+  para_type text,
+  similarity float
+)
+LANGUAGE sql STABLE
+SET hnsw.ef_search = 40
+SET hnsw.iterative_scan = relaxed_order
+AS $$
+  SELECT id, title, para_type, similarity
+  FROM (
+    SELECT
+      id,
+      title,
+      para_type,
+      -(embedding <#> query_embedding) AS similarity
+    FROM para_items
+    WHERE user_id = filter_user_id
+    ORDER BY embedding <#> query_embedding
+    LIMIT match_count
+  ) nearest
+  WHERE similarity > match_threshold
+  ORDER BY similarity DESC;
+$$;
+
+-- Weekly review: completion aggregates for the week plus the highest-priority
+-- completed tasks (the template shows the top 5), instead of every task row
+CREATE OR REPLACE FUNCTION weekly_task_summary(
+  p_user_id uuid,
+  p_start timestamptz,
+  p_end timestamptz
+)
+RETURNS jsonb
+LANGUAGE sql STABLE
+AS $$
+  WITH completed AS (
+    SELECT id, title, priority, completed_at
+    FROM tasks
+    WHERE user_id = p_user_id
+      AND status = 'completed'
+      AND completed_at >= p_start
+      AND completed_at <= p_end
+  )
+  SELECT jsonb_build_object(
+    'count', (SELECT count(*) FROM completed),
+    'by_day', COALESCE((
+      SELECT jsonb_agg(jsonb_build_object('isodow', isodow, 'completed', completed) ORDER BY isodow)
+      FROM (
+        SELECT extract(isodow FROM completed_at AT TIME ZONE 'UTC')::integer AS isodow, count(*) AS completed
+        FROM completed GROUP BY 1
+      ) d
+    ), '[]'::jsonb),
+    'by_hour', COALESCE((
+      SELECT jsonb_agg(jsonb_build_object('hour', hour, 'completed', completed) ORDER BY hour)
+      FROM (
+        SELECT extract(hour FROM completed_at AT TIME ZONE 'UTC')::integer AS hour, count(*) AS completed
+        FROM completed GROUP BY 1
+      ) h
+    ), '[]'::jsonb),
+    'top_tasks', COALESCE((
+      SELECT jsonb_agg(to_jsonb(t))
+      FROM (
+        SELECT id, title, priority, completed_at
+        FROM completed
+        ORDER BY CASE priority
+                   WHEN 'urgent' THEN 4 WHEN 'high' THEN 3 WHEN 'low' THEN 1 ELSE 2
+                 END DESC,
+                 completed_at DESC
+        LIMIT 20
+      ) t
+    ), '[]'::jsonb)
+  );
+$$;
+
+-- Apply an approved schedule in one statement instead of one UPDATE per block.
+-- Returns the number of the user's tasks that were updated.
+CREATE OR REPLACE FUNCTION apply_task_schedule(
+  p_user_id uuid,
+  p_blocks jsonb
+)
+RETURNS integer
+LANGUAGE sql
+AS $$
+  WITH updated AS (
+    UPDATE tasks t
+    SET scheduled_start = b.start_time,
+        scheduled_end = b.end_time,
+        updated_at = now()
+    FROM jsonb_to_recordset(p_blocks) AS b(task_id uuid, start_time timestamptz, end_time timestamptz)
+    WHERE t.id = b.task_id
+      AND t.user_id = p_user_id
+    RETURNING t.id
+  )
+  SELECT count(*)::integer FROM updated;
+$$;
@@ -5,7 +5,7 @@ Cost-optimized: $0 vs $0.10/week per user.
 
 from jinja2 import Environment, FileSystemLoader
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import os
 
 
@@ -22,15 +22,20 @@ def generate_weekly_review(
     active_areas: List[Dict[str, Any]],
     rollovers: List[Dict[str, Any]],
     completion_by_day: Dict[str, int],
-    completion_by_hour: Dict[str, int]
+    completion_by_hour: Dict[str, int],
+    completed_count: Optional[int] = None
 ) -> Dict[str, Any]:
     """
     Generate weekly review using Jinja2 template.
     Replaces LLM-generated prose with data-driven templates.
+
+    completed_tasks may be just the highest-priority subset when
+    completed_count carries the full total.
     """
 
     # Calculate metrics
-    completed_count = len(completed_tasks)
+    if completed_count is None:
+        completed_count = len(completed_tasks)
 
     # Top wins (highest priority completed tasks)
     top_wins = sorted(
@@ -1,7 +1,7 @@
 """Test suite for PARA classification logic"""
 
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from agents.classifier import classify_item
 
 @patch('agents.classifier.Anthropic')
@@ -73,3 +73,89 @@ def test_valid_para_types(para_type):
     """Test all valid PARA types are recognized"""
     valid_types = ["project", "area", "resource", "archive"]
     assert para_type in valid_types
+
+@patch('agents.classifier.llm_provider')
+def test_batch_classify_single_call_per_chunk(mock_provider):
+    """Test batch classification sends one LLM call per chunk and maps results back by index"""
+    from agents.classifier import batch_classify_items
+
+    mock_provider.aget_completion = AsyncMock(return_value={
+        "text": '{"results": [{"index": 2, "para_type": "area", "confidence": 0.9, "reasoning": "Ongoing", "suggested_next_actions": [], "estimated_duration_weeks": null}, {"index": 1, "para_type": "project", "confidence": 0.9, "reasoning": "Deadline", "suggested_next_actions": [], "estimated_duration_weeks": 2}]}',
+        "usage": {"input_tokens": 600, "output_tokens": 200, "cost_usd": 0.002},
+        "provider": "groq"
+    })
+
+    results = batch_classify_items([
+        {"id": "a", "title": "Kubernetes migration", "description": "Move services off VMs"},
+        {"id": "b", "title": "Open source maintenance", "description": "Keep my libraries up to date"}
+    ])
+
+    assert mock_provider.aget_completion.await_count == 1
+    assert [r["item_id"] for r in results] == ["a", "b"]
+    assert results[0]["classification"]["para_type"] == "project"
+    assert results[1]["classification"]["para_type"] == "area"
+    assert results[0]["classification"]["usage"]["cost_usd"] == 0.001
+
+@patch('agents.classifier.llm_provider')
+def test_classify_item_memoizes_identical_inputs(mock_provider):
+    """Test repeated classification of the same item only calls the LLM once"""
+    mock_provider.get_completion.return_value = {
+        "text": '{"para_type": "resource", "confidence": 0.9, "reasoning": "Reference", "suggested_next_actions": [], "estimated_duration_weeks": null}',
+        "usage": {"input_tokens": 100, "output_tokens": 50, "cost_usd": 0.0003},
+        "provider": "groq"
+    }
+
+    first = classify_item(title="Rust ownership notes", description="Borrow checker examples")
+    second = classify_item(title="  rust ownership NOTES ", description="Borrow checker examples")
+
+    assert mock_provider.get_completion.call_count == 1
+    assert second["para_type"] == first["para_type"]
+    assert second["usage"]["cost_usd"] == 0.0
+
+@patch('agents.classifier.llm_provider')
+def test_classify_item_rule_match_skips_llm(mock_provider):
+    """Test unambiguous keyword matches are classified without an LLM call"""
+    result = classify_item(title="Python tutorials", description="Collection of links to read later")
+
+    mock_provider.get_completion.assert_not_called()
+    assert result["para_type"] == "resource"
+    assert result["reasoning"].startswith("rule-matched")
+
+def test_local_classifier_predicts_from_history():
+    """Test the local Naive Bayes model learns PARA types from past classifications"""
+    from agents.local_classifier import LocalPARAClassifier
+
+    model = LocalPARAClassifier().fit([
+        {"title": "Launch website", "description": "Ship the redesign", "para_type": "project"},
+        {"title": "Launch podcast", "description": "Ship first episode", "para_type": "project"},
+        {"title": "Health", "description": "Exercise and sleep routine", "para_type": "area"},
+        {"title": "Fitness", "description": "Weekly exercise routine", "para_type": "area"},
+    ])
+
+    label, probability = model.predict("Launch newsletter", "Ship the first issue")
+    assert label == "project"
+    assert 0.5 < probability <= 1.0
+    assert model.predict("", "") is None
+
+@patch('agents.classifier.llm_provider')
+def test_fractional_duration_is_a_valid_classification(mock_provider):
+    """Test a fractional estimated_duration_weeks (allowed by PARA_SCHEMA) isn't turned into an error"""
+    from agents.classifier import batch_classify_items
+
+    mock_provider.get_completion.return_value = {
+        "text": '{"para_type": "project", "confidence": 0.9, "reasoning": "Has an end date", "suggested_next_actions": [], "estimated_duration_weeks": 2.5}',
+        "usage": {"input_tokens": 100, "output_tokens": 50, "cost_usd": 0.0003},
+        "provider": "groq"
+    }
+    mock_provider.aget_completion = AsyncMock(return_value={
+        "text": '{"results": [{"index": 1, "para_type": "project", "confidence": 0.9, "reasoning": "Has an end date", "suggested_next_actions": [], "estimated_duration_weeks": 1.5}]}',
+        "usage": {"input_tokens": 300, "output_tokens": 100, "cost_usd": 0.001},
+        "provider": "groq"
+    })
+
+    single = classify_item(title="Garden shed rebuild", description="Replace the roof and floor")
+    batch = batch_classify_items([{"id": "a", "title": "Kitchen repaint", "description": "Two coats, all walls"}])
+
+    assert single["estimated_duration_weeks"] == 2.5
+    assert batch[0]["classification"]["estimated_duration_weeks"] == 1.5
+    assert mock_provider.aget_completion.await_count == 1
@@ -0,0 +1,157 @@
+"""Test suite for the conversational agent's history trimming and follow-up merging"""
+
+import asyncio
+import pytest
+from agents.conversational_agent import ConversationalAgent, MAX_HISTORY_TOKENS, _trim_history
+
+
+class ScriptedAgent(ConversationalAgent):
+    """Agent whose turns wait on per-test gates instead of calling Claude"""
+
+    def __init__(self):
+        super().__init__()
+        self.turns = []
+        self.gates = []
+
+    async def _chat_turn(self, user_id, message, conversation_history=None):
+        self.turns.append(message)
+        gate = asyncio.get_running_loop().create_future()
+        self.gates.append(gate)
+        outcome = await gate
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return {"message": outcome, "metadata": {}}
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def test_follow_ups_share_one_merged_turn():
+    """Test messages sent during a turn are merged into one follow-up whose result every sender gets"""
+    agent = ScriptedAgent()
+    first = asyncio.create_task(agent.chat("user-1", "Plan my week", conversation_id="c1"))
+    await _settle()
+    second = asyncio.create_task(agent.chat("user-1", "Add gym on Monday", conversation_id="c1"))
+    third = asyncio.create_task(agent.chat("user-1", "And reading on Friday", conversation_id="c1"))
+    await _settle()
+
+    agent.gates[0].set_result("Here's your week")
+    await _settle()
+    assert agent.turns == ["Plan my week", "Add gym on Monday\n\nAnd reading on Friday"]
+
+    agent.gates[1].set_result("Added both")
+    assert (await first)["message"] == "Here's your week"
+    assert (await second)["message"] == "Added both"
+    rider = await third
+    assert rider["message"] == "Added both"
+    assert rider["metadata"]["merged_follow_up"] is True
+
+
+async def test_other_conversations_are_not_merged():
+    """Test a message in a different conversation starts its own turn"""
+    agent = ScriptedAgent()
+    first = asyncio.create_task(agent.chat("user-1", "Plan my week", conversation_id="c1"))
+    await _settle()
+    other = asyncio.create_task(agent.chat("user-1", "Draft an email", conversation_id="c2"))
+    await _settle()
+
+    assert agent.turns == ["Plan my week", "Draft an email"]
+    agent.gates[0].set_result("Planned")
+    agent.gates[1].set_result("Drafted")
+    assert (await first)["message"] == "Planned"
+    assert (await other)["message"] == "Drafted"
+
+
+@pytest.mark.parametrize("failure", [RuntimeError("Claude unavailable"), asyncio.CancelledError()])
+async def test_riders_are_woken_when_the_merged_turn_fails(failure):
+    """Test riders get an exception instead of hanging when the merged turn errors or is cancelled"""
+    agent = ScriptedAgent()
+    first = asyncio.create_task(agent.chat("user-1", "Plan my week", conversation_id="c1"))
+    await _settle()
+    leader = asyncio.create_task(agent.chat("user-1", "Add gym", conversation_id="c1"))
+    rider = asyncio.create_task(agent.chat("user-1", "Add reading", conversation_id="c1"))
+    await _settle()
+
+    agent.gates[0].set_result("Planned")
+    await _settle()
+    if isinstance(failure, asyncio.CancelledError):
+        leader.cancel()
+    else:
+        agent.gates[1].set_result(failure)
+
+    await first
+    with pytest.raises(BaseException):
+        await leader
+    with pytest.raises(RuntimeError):
+        await asyncio.wait_for(rider, timeout=1)
+
+
+async def test_message_during_merged_turn_starts_a_new_batch():
+    """Test a message arriving while the merged turn runs waits for it and goes out as the next turn"""
+    agent = ScriptedAgent()
+    first = asyncio.create_task(agent.chat("user-1", "Plan my week", conversation_id="c1"))
+    await _settle()
+    second = asyncio.create_task(agent.chat("user-1", "Add gym", conversation_id="c1"))
+    await _settle()
+    agent.gates[0].set_result("Planned")
+    await _settle()
+
+    late = asyncio.create_task(agent.chat("user-1", "Actually make it Tuesday", conversation_id="c1"))
+    await _settle()
+    assert agent.turns == ["Plan my week", "Add gym"]
+
+    agent.gates[1].set_result("Gym added")
+    await _settle()
+    assert agent.turns[-1] == "Actually make it Tuesday"
+
+    agent.gates[2].set_result("Moved to Tuesday")
+    await first
+    assert (await second)["message"] == "Gym added"
+    late_result = await late
+    assert late_result["message"] == "Moved to Tuesday"
+    assert "merged_follow_up" not in late_result["metadata"]
+
+
+def _exchange(user_text, assistant_text):
+    return [{"role": "user", "content": user_text}, {"role": "assistant", "content": assistant_text}]
+
+
+def test_trim_history_keeps_short_history():
+    """Test history under the budget is passed through unchanged"""
+    history = _exchange("Hi", "Hello!")
+    assert _trim_history(history) == history
+
+
+def test_trim_history_starts_on_user_and_alternates():
+    """Test trimming drops whole exchanges so the window opens on a user message and roles alternate"""
+    filler = "x" * (MAX_HISTORY_TOKENS * 4 + 4)  # ~4 chars per token, just over budget alone
+    history = (
+        _exchange("Email sam@example.com on friday", filler)
+        + _exchange("Budget is 2500 for 2025-11-03", "Noted")
+        + _exchange("What did I say?", "Let me check")
+    )
+
+    trimmed = _trim_history(history)
+
+    assert len(trimmed) == 4
+    assert trimmed[0]["role"] == "user"
+    assert [m["role"] for m in trimmed] == ["user", "assistant"] * 2
+    assert trimmed[-1] == history[-1]
+    assert history[2]["content"] == "Budget is 2500 for 2025-11-03"  # input not mutated
+
+
+def test_trim_history_carries_entities_from_dropped_messages():
+    """Test dates, numbers and emails from dropped messages are kept in a note on the first kept message"""
+    filler = "x" * (MAX_HISTORY_TOKENS * 4 + 4)  # ~4 chars per token, just over budget alone
+    history = _exchange("Email sam@example.com on friday about 2500", filler) + _exchange("Send it", "Done")
+
+    trimmed = _trim_history(history)
+
+    assert len(trimmed) == 2
+    note, _, message = trimmed[0]["content"].partition("\n\n")
+    assert message == "Send it"
+    assert note.startswith("[2 earlier messages omitted.")
+    for entity in ("sam@example.com", "friday", "2500"):
+        assert entity in note
@@ -1,7 +1,7 @@
 """Test suite for task scheduling logic"""
 
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from datetime import datetime, timedelta
 from agents.scheduler import auto_schedule_tasks
 
@@ -136,3 +136,79 @@ def test_schedule_respects_working_hours():
     # This would test that tasks aren't scheduled before 8am or after 6pm
     # Implementation depends on scheduler logic
     pass  # Placeholder for future implementation
+
+@patch('agents.rollover.execute_async', new_callable=AsyncMock)
+@patch('agents.rollover.llm_provider')
+async def test_rollover_batch_skips_only_invalid_entries(mock_provider, mock_execute):
+    """Test one malformed recommendation doesn't discard the rest of its batch"""
+    from agents.rollover import SmartRolloverAgent
+
+    mock_provider.aget_completion = AsyncMock(return_value={
+        "text": '{"recommendations": ['
+                '{"task_id": "task-1", "recommendation": "adjust_duration", "reasoning": "Too short", "new_estimated_duration": 90.5, "message_to_user": "Give it more time"}, '
+                '{"task_id": "task-2", "recommendation": "archive"}, '
+                '{"task_id": "task-3", "recommendation": "reschedule", "reasoning": "Busy week", "suggested_new_date": "2025-11-03", "message_to_user": "Try next month"}]}',
+        "usage": {"input_tokens": 300, "output_tokens": 200, "cost_usd": 0.001},
+        "provider": "anthropic"
+    })
+
+    analyses = await SmartRolloverAgent().analyze_rollover_tasks_batch(
+        [{"id": f"task-{i}", "title": f"Task {i}"} for i in (1, 2, 3)],
+        user_id="test-user",
+        recent_titles=[]
+    )
+
+    assert [a["task_id"] for a in analyses] == ["task-1", "task-3"]
+    assert analyses[0]["new_estimated_duration"] == 90.5
+    mock_execute.assert_awaited_once()  # one multi-row approvals insert
+
+@pytest.fixture
+def schedule_mocks():
+    """Mocked cache, approval lookup, LLM and approval creation for auto_schedule_tasks"""
+    from datetime import timezone
+
+    with patch('agents.scheduler.cache') as mock_cache, \
+            patch('agents.scheduler.execute_async', new_callable=AsyncMock) as mock_execute, \
+            patch('agents.scheduler.llm_provider') as mock_provider, \
+            patch('agents.scheduler.create_pending_approval', new_callable=AsyncMock) as mock_create:
+        mock_cache.get = AsyncMock(return_value={
+            "scheduled_blocks": [{"task_id": "task-1", "start_time": "2025-10-23T10:00:00", "end_time": "2025-10-23T11:00:00", "reasoning": "Morning slot"}],
+            "approval_id": "approval-old"
+        })
+        mock_cache.set = AsyncMock()
+        mock_cache.delete = AsyncMock()
+        mock_provider.aget_completion = AsyncMock(return_value={
+            "text": '{"scheduled_blocks": [{"task_id": "task-1", "start_time": "2025-10-24T09:00:00", "end_time": "2025-10-24T10:00:00", "reasoning": "Fresh slot"}]}',
+            "usage": {"input_tokens": 200, "output_tokens": 100, "cost_usd": 0.001},
+            "provider": "groq"
+        })
+        mock_create.return_value = {"id": "approval-new"}
+
+        def approval(status, expires_in_hours=24):
+            expires_at = datetime.now(timezone.utc) + timedelta(hours=expires_in_hours)
+            mock_execute.return_value = MagicMock(data=[{"status": status, "expires_at": expires_at.isoformat()}])
+
+        yield {"cache": mock_cache, "provider": mock_provider, "approval": approval}
+
+async def test_cached_schedule_reuses_pending_approval(schedule_mocks, sample_tasks):
+    """Test an identical request returns the stored proposal while its approval is still pending"""
+    schedule_mocks["approval"]("pending")
+
+    result = await auto_schedule_tasks(sample_tasks, [], {}, user_id="test-user")
+
+    assert result["approval_id"] == "approval-old"
+    assert result["usage"]["cost_usd"] == 0.0
+    schedule_mocks["provider"].aget_completion.assert_not_awaited()
+    schedule_mocks["cache"].delete.assert_not_awaited()
+
+@pytest.mark.parametrize("status, expires_in_hours", [("approved", 24), ("rejected", 24), ("pending", -1)])
+async def test_cached_schedule_dropped_once_approval_answered_or_expired(schedule_mocks, sample_tasks, status, expires_in_hours):
+    """Test an answered or expired approval drops the cached schedule and creates a new proposal"""
+    schedule_mocks["approval"](status, expires_in_hours)
+
+    result = await auto_schedule_tasks(sample_tasks, [], {}, user_id="test-user")
+
+    assert result["approval_id"] == "approval-new"
+    schedule_mocks["cache"].delete.assert_awaited_once()
+    schedule_mocks["provider"].aget_completion.assert_awaited_once()
+    schedule_mocks["cache"].set.assert_awaited_once()